@@ -1,2 +1,105 @@
+import argparse
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def backfill(args):
+    from logic.backfill import Backfill
+    from logic.ethc_miner import ETHCMiner
+    from logic.miner_index import MinerIndex
+
+    miner = ETHCMiner(None)
+    index = MinerIndex(miner, confirmations=args.confirmations)
+    kwargs = {
+        'to_block': args.to_block,
+        'concurrency': args.concurrency,
+        'rate_limit': args.rate_limit,
+        'chunk_size': args.chunk_size,
+    }
+    if args.from_block is not None:
+        kwargs['from_block'] = args.from_block
+    await Backfill(index, **kwargs).run()
+
+async def archive(args):
+    from logic.ethc_miner import ETHCMiner
+    from logic.history_archive import HistoryArchive
+
+    miner = ETHCMiner(None)
+    history = HistoryArchive(path=args.path, confirmations=args.confirmations)
+    archived = await history.sync(miner, from_block=args.from_block, to_block=args.to_block)
+    filled = await history.fill_blocks(miner)
+    logger.info(f"Archived {archived} logs, filled {filled} block winners")
+
+async def backtest(args):
+    from logic.backtester import Backtester, EVStrategy, fetch_gas_prices, load_history
+    from logic.ethc_miner import ETHCMiner
+    from logic.history_archive import HistoryArchive
+
+    history_archive = HistoryArchive(path=args.path)
+    if args.gas_price is not None:
+        gas_prices = args.gas_price * 10 ** 9
+    else:
+        gas_prices = await fetch_gas_prices(ETHCMiner(None), history_archive.blocks(args.start, args.stop)['eth_block'])
+    kwargs = {'exclude': args.exclude, 'gas_prices': gas_prices}
+    if args.ethc_price is not None:
+        kwargs['ethc_price'] = args.ethc_price
+    history = load_history(history_archive, args.start, args.stop, **kwargs)
+    strategies = [EVStrategy(max_mine_count=args.max_mine_count, margin=margin, price_factor=factor)
+                  for margin in args.margins for factor in args.price_factors]
+    results = Backtester(history, trials=args.trials, workers=args.workers).sweep(strategies)
+    for result in sorted(results, key=lambda result: result.expected_profit, reverse=True):
+        logger.info(f"{result.config}: EV {result.expected_profit / 1e18:.4f} ETH, "
+                    f"std {result.variance ** 0.5 / 1e18:.4f} ETH, ROI {result.roi:.1%}, "
+                    f"max drawdown {result.max_drawdown / 1e18:.4f} ETH (p95 {result.drawdown_p95 / 1e18:.4f}), "
+                    f"{result.blocks_entered}/{result.blocks} blocks")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='ETHC miner')
+    commands = parser.add_subparsers(dest='command')
+
+    backfill_parser = commands.add_parser('backfill', help='Rebuild mining history from contract logs')
+    backfill_parser.add_argument('--from-block', type=int, help='First Ethereum block (default ETHC_DEPLOY_BLOCK)')
+    backfill_parser.add_argument('--to-block', type=int, help='Last Ethereum block (default where live sync starts)')
+    backfill_parser.add_argument('--concurrency', type=int, default=4)
+    backfill_parser.add_argument('--rate-limit', type=float, default=10, help='Max eth_getLogs requests per second')
+    backfill_parser.add_argument('--chunk-size', type=int, default=2000, help='Initial blocks per request')
+    backfill_parser.add_argument('--confirmations', type=int, default=12)
+    backfill_parser.set_defaults(handler=backfill)
+
+    archive_parser = commands.add_parser('archive', help='Update the columnar mining history archive')
+    archive_parser.add_argument('--path', help='Archive directory (default DATA_DIR/history)')
+    archive_parser.add_argument('--from-block', type=int, help='First Ethereum block of a new archive (default ETHC_DEPLOY_BLOCK)')
+    archive_parser.add_argument('--to-block', type=int, help='Last Ethereum block (default the confirmed head)')
+    archive_parser.add_argument('--confirmations', type=int, default=12)
+    archive_parser.set_defaults(handler=archive)
+
+    backtest_parser = commands.add_parser('backtest', help='Sweep strategy settings over the history archive')
+    backtest_parser.add_argument('--path', help='Archive directory (default DATA_DIR/history)')
+    backtest_parser.add_argument('--start', type=int, help='First ETHC block')
+    backtest_parser.add_argument('--stop', type=int, help='ETHC block to stop before')
+    backtest_parser.add_argument('--exclude', nargs='*', default=[], help='Our own addresses, left out of the competition')
+    backtest_parser.add_argument('--ethc-price', type=float, help='ETHC price in ETH (default ETHC_PRICE_ETH)')
+    backtest_parser.add_argument('--gas-price', type=float, help='Flat gas price in gwei (default read from fee history)')
+    backtest_parser.add_argument('--margins', type=float, nargs='+', default=[0, 0.1, 0.25, 0.5])
+    backtest_parser.add_argument('--price-factors', type=float, nargs='+', default=[0.5, 0.8, 1, 1.25])
+    backtest_parser.add_argument('--max-mine-count', type=int, default=1000)
+    backtest_parser.add_argument('--trials', type=int, default=200)
+    backtest_parser.add_argument('--workers', type=int, help='Sweep processes (default BACKTEST_WORKERS or CPU count)')
+    backtest_parser.set_defaults(handler=backtest)
+    return parser
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args()
+    from config.constants import METRICS_HOST, METRICS_PORT
+    from util.metrics import metrics
+    if metrics.enabled:
+        metrics.serve(METRICS_HOST, METRICS_PORT)
+    if args.command is None:
+        print('Starting base app')
+        return
+    asyncio.run(args.handler(args))
+
 if __name__ == "__main__":
-    print('Starting base app')
\ No newline at end of file
+    main()
@@ -1,3 +1,4 @@
+import functools
 import json
 import os
 from dotenv import load_dotenv
@@ -10,21 +11,87 @@ DATABASE_URL = os.getenv('DATABASE_URL')
 
 ALCHEMY_API_KEY = os.getenv('ALCHEMY_API_KEY')
 
-# Load all wallet configurations from environment
-WALLETS = {}
-for key, value in os.environ.items():
-    if key.startswith('WALLET_'):
-        try:
-            WALLETS[key] = json.loads(value)
-        except json.JSONDecodeError:
-            print(f"Warning: Invalid JSON in {key}")
+# 'async' runs ETHCMiner and WalletManager on AsyncWeb3, 'sync' keeps the blocking client
+WEB3_BACKEND = os.getenv('WEB3_BACKEND', 'async')
+# Max concurrent HTTP connections shared by all async RPC requests
+RPC_POOL_SIZE = int(os.getenv('RPC_POOL_SIZE', '20'))
+RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', '10'))
+# Extra JSON-RPC endpoints, comma separated; with any set, async reads are routed across all of them
+RPC_ENDPOINTS = [url.strip() for url in os.getenv('RPC_ENDPOINTS', '').split(',') if url.strip()]
+# Seconds a read may take before it is also sent to a second endpoint
+RPC_HEDGE_AFTER = float(os.getenv('RPC_HEDGE_AFTER', '0.3'))
 
 ETHC_CONTRACT_ADDRESS=os.getenv('ETHC_CONTRACT_ADDRESS')
+# Ethereum block the ETHC contract was deployed in, where history backfills start
+ETHC_DEPLOY_BLOCK = int(os.getenv('ETHC_DEPLOY_BLOCK', '0'))
 
-# Load ABI from JSON file
-abi_path = Path(__file__).parent / 'abi' / 'ethc_contract.json'
-with open(abi_path) as f:
-    ETHC_CONTRACT_ABI = json.load(f)['abi']
+# Multicall3 is deployed at the same address on mainnet and most EVM chains
+MULTICALL3_ADDRESS = os.getenv('MULTICALL3_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11')
+
+# Local state (cursors, checkpoints, models) lives here
+DATA_DIR = Path(os.getenv('DATA_DIR', Path(__file__).parent.parent / 'data'))
+
+# Optional websocket endpoint used to wake the block watcher on new heads
+ALCHEMY_WS_URL = os.getenv('ALCHEMY_WS_URL')
+# Max Ethereum blocks per eth_getLogs request
+LOG_CHUNK_SIZE = int(os.getenv('LOG_CHUNK_SIZE', '2000'))
+# Where the mempool watcher reads competitor mines from: pending (eth_getBlockByNumber) or txpool (txpool_content)
+MEMPOOL_SOURCE = os.getenv('MEMPOOL_SOURCE', 'pending')
+MEMPOOL_POLL_INTERVAL = float(os.getenv('MEMPOOL_POLL_INTERVAL', '1.0'))
+# Seconds a pending mine is counted without being seen again
+MEMPOOL_MAX_AGE = float(os.getenv('MEMPOOL_MAX_AGE', '60'))
+# Seconds before the last Ethereum slot of an ETHC window that the block scheduler wakes the mining task
+MINE_LEAD_TIME = float(os.getenv('MINE_LEAD_TIME', '3.0'))
+# Fee oracle urgency profile for mines: cheap, normal or urgent
+FEE_URGENCY = os.getenv('FEE_URGENCY', 'normal')
+# ETHC price in ETH used to value the block reward, until it is read from a DEX. There is
+# no default: mine count decisions refuse to run without it rather than value rewards at 0
+ETHC_PRICE_ETH = float(os.getenv('ETHC_PRICE_ETH')) if os.getenv('ETHC_PRICE_ETH') else None
+# Processes used to sign large batches of transactions, 0 for one per CPU core
+SIGNING_WORKERS = int(os.getenv('SIGNING_WORKERS', '0'))
+# Per-RPC latency histograms and mine() phase timings, served in Prometheus format
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+# Processes used for backtest parameter sweeps, 0 for one per CPU core
+BACKTEST_WORKERS = int(os.getenv('BACKTEST_WORKERS', '0'))
 
 SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
-DEV_EMAIL = os.getenv('DEV_EMAIL')
\ No newline at end of file
+SENDGRID_HOST = os.getenv('SENDGRID_HOST', 'https://api.sendgrid.com')
+# Admin alerts raised within this many seconds of the first go out as one digest email
+NOTIFY_DIGEST_WINDOW = float(os.getenv('NOTIFY_DIGEST_WINDOW', '60'))
+DEV_EMAIL = os.getenv('DEV_EMAIL')
+
+# Wallets and ABIs are only loaded when first used, so commands that need
+# neither start without parsing them. WALLETS, ETHC_CONTRACT_ABI and
+# MULTICALL3_ABI still resolve as module attributes through __getattr__.
+ABI_DIR = Path(__file__).parent / 'abi'
+
+@functools.cache
+def get_wallets():
+    """Wallet configurations from every WALLET_* environment variable"""
+    wallets = {}
+    for key, value in os.environ.items():
+        if key.startswith('WALLET_'):
+            try:
+                wallets[key] = json.loads(value)
+            except json.JSONDecodeError:
+                print(f"Warning: Invalid JSON in {key}")
+    return wallets
+
+@functools.cache
+def load_abi(name):
+    """ABI list from config/abi/<name>.json"""
+    with open(ABI_DIR / f'{name}.json') as f:
+        return json.load(f)['abi']
+
+_LAZY = {
+    'WALLETS': get_wallets,
+    'ETHC_CONTRACT_ABI': lambda: load_abi('ethc_contract'),
+    'MULTICALL3_ABI': lambda: load_abi('multicall3'),
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,39 @@
+import logging
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config.constants import DATABASE_URL, DATA_DIR
+from database.db_models import Base
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+_session_factory = None
+
+def database_url():
+    """DATABASE_URL from env, or a SQLite file in DATA_DIR for local runs"""
+    if DATABASE_URL:
+        # Heroku still hands out the deprecated postgres:// scheme
+        return DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return f"sqlite:///{os.path.join(DATA_DIR, 'ethc.db')}"
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(database_url())
+        Base.metadata.create_all(_engine)
+        logger.info(f"Connected to database {_engine.url.render_as_string(hide_password=True)}")
+    return _engine
+
+def get_session_factory():
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(bind=get_engine())
+    return _session_factory
+
+def create_session_factory(url):
+    """Session factory for an explicit database URL, creating tables if needed"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
@@ -1,9 +1,91 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import BigInteger, Column, DateTime, Integer, Numeric, String, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+class MinerParticipation(Base):
+    """Total mines per (ETHC block, miner), aggregated from confirmed Mine logs"""
+    __tablename__ = 'miner_participation'
+
+    ethc_block = Column(BigInteger, primary_key=True)
+    miner = Column(String(42), primary_key=True)
+    mine_count = Column(BigInteger, nullable=False, default=0)
+    last_eth_block = Column(BigInteger, nullable=False)
+
+class EthcBlock(Base):
+    """Ethereum block and transaction of the NewETHCBlock log that opened each ETHC block"""
+    __tablename__ = 'ethc_blocks'
+
+    ethc_block = Column(BigInteger, primary_key=True)
+    eth_block = Column(BigInteger, nullable=False, index=True)
+    tx_hash = Column(String(66), nullable=False)
+
+class BackfillRange(Base):
+    """Ethereum block range whose logs a backfill has already written"""
+    __tablename__ = 'backfill_ranges'
+
+    name = Column(String(64), primary_key=True)
+    from_block = Column(BigInteger, primary_key=True)
+    to_block = Column(BigInteger, nullable=False)
+
+class SyncCursor(Base):
+    """Last Ethereum block whose logs have been committed, per log consumer"""
+    __tablename__ = 'sync_cursors'
+
+    name = Column(String(64), primary_key=True)
+    last_block = Column(BigInteger, nullable=False)
+    # First ETHC block whose Mine logs are all in the index
+    first_complete_block = Column(BigInteger)
+
+class MineTransaction(Base):
+    """One mine() transaction we sent, from submission through receipt to the block outcome"""
+    __tablename__ = 'mine_transactions'
+
+    tx_hash = Column(String(66), primary_key=True)
+    wallet = Column(String(42), nullable=False, index=True)
+    wallet_name = Column(String(64))
+    # ETHC block open at submission, replaced by the block in the Mine log once confirmed
+    ethc_block = Column(BigInteger, nullable=False, index=True)
+    mine_count = Column(Integer, nullable=False)
+    nonce = Column(BigInteger, nullable=False)
+    value = Column(Numeric(38, 0), nullable=False)  # mineCost paid, wei
+    # pending, confirmed, failed or dropped
+    status = Column(String(16), nullable=False, default='pending', index=True)
+    eth_block = Column(BigInteger)
+    gas_used = Column(BigInteger)
+    gas_paid = Column(Numeric(38, 0))  # gasUsed * effectiveGasPrice, wei
+    # won or lost once the block's winner is known
+    outcome = Column(String(8))
+    # ETHC won, on one transaction of the winning wallet per block
+    reward = Column(Numeric(38, 0))
+    submitted_at = Column(DateTime, nullable=False)
+    resolved_at = Column(DateTime)
+
+class HourlyRollup(Base):
+    """Mining totals per UTC hour, kept up to date by MineTracker as transactions move
+
+    Each figure lands in the hour its event happened: mines and mineCost when
+    sent, gas when the receipt arrives, wins and rewards when the block is
+    decided. net_profit is rewards valued at ETHC_PRICE_ETH (left out while it
+    is unset) less mineCost and gas, all in wei, so a closed hour never changes
+    again.
+    """
+    __tablename__ = 'hourly_rollups'
+
+    hour = Column(DateTime, primary_key=True)  # start of the hour, naive UTC
+    transactions = Column(Integer, nullable=False, default=0)
+    mine_count = Column(BigInteger, nullable=False, default=0)
+    value = Column(Numeric(38, 0), nullable=False, default=0)  # mineCost paid, wei
+    confirmed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    dropped = Column(Integer, nullable=False, default=0)
+    gas_paid = Column(Numeric(38, 0), nullable=False, default=0)  # wei
+    blocks_entered = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    reward = Column(Numeric(38, 0), nullable=False, default=0)  # ETHC wei
+    net_profit = Column(Numeric(38, 0), nullable=False, default=0)  # wei, may be negative
+
 # class User(Base):
 #     __tablename__ = 'users'
 
@@ -12,4 +94,4 @@ Base = declarative_base()
 #     fullname = Column(String)
 #     nickname = Column(String)
 
-#     addresses = relationship("Address", back_populates="user")
\ No newline at end of file
+#     addresses = relationship("Address", back_populates="user")
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from sqlalchemy import func, select
+from config.constants import ETHC_DEPLOY_BLOCK, LOG_CHUNK_SIZE
+from database.db_models import BackfillRange, EthcBlock
+from util.alchemy_connector import resolve
+from util.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Provider errors that mean the range returned too many logs and must be split
+TOO_MANY_RESULTS_MARKERS = (
+    'more than 10000 results',
+    'query returned more than',
+    'log response size exceeded',
+    'response size exceeded',
+    'too many results',
+    'block range is too wide',
+    'exceed maximum block range',
+)
+
+def is_too_many_results(error):
+    message = str(error).lower()
+    return any(marker in message for marker in TOO_MANY_RESULTS_MARKERS)
+
+class Backfill:
+    """Rebuild ETHC mining history into the miner index from Mine and NewETHCBlock logs
+
+    The block range is split into eth_getLogs chunks that are fetched concurrently
+    under a request rate limit. Chunk size adapts: it halves (and the failing range
+    is split) when the provider reports too many results, and doubles after chunks
+    that come back light. Finished chunks are written to the database in batches,
+    each batch in one transaction with the block ranges it covers, so an interrupted
+    backfill resumes with only the missing ranges and never double counts.
+    """
+
+    def __init__(self, index, from_block=ETHC_DEPLOY_BLOCK, to_block=None, concurrency=4,
+                 rate_limit=10, chunk_size=LOG_CHUNK_SIZE, min_chunk_size=1,
+                 max_chunk_size=100_000, target_results=5000, batch_size=20,
+                 max_retries=5, name='backfill'):
+        self.index = index
+        self.reader = index.reader
+        self.from_block = from_block
+        self.to_block = to_block
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate_limit)
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_results = target_results
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.name = name
+
+        self._gaps = deque()
+        self._retry = deque()
+        self._in_flight = 0
+        self._changed = None
+        self.stats = {'requests': 0, 'splits': 0, 'events': 0, 'chunks': 0}
+
+    async def run(self):
+        """Fetch and store every missing range, then mark the index complete"""
+        started = time.monotonic()
+        if self.to_block is None:
+            head = await resolve(self.index.web3.eth.block_number)
+            self.to_block = head - self.index.confirmations
+        # Stop where live syncing starts so no log is counted twice
+        live_from = self.index.ensure_cursor(self.to_block)
+        if self.to_block > live_from:
+            logger.warning(f"Index already synced from block {live_from}, stopping backfill there")
+            self.to_block = live_from
+
+        self._gaps = deque(self.missing_ranges())
+        remaining = sum(end - start + 1 for start, end in self._gaps)
+        logger.info(f"Backfilling blocks {self.from_block}-{self.to_block}: "
+                    f"{remaining} blocks in {len(self._gaps)} gaps")
+
+        self._changed = asyncio.Condition()
+        results = asyncio.Queue(maxsize=self.concurrency * 4)
+        writer = asyncio.ensure_future(self._writer(results))
+        workers = [asyncio.ensure_future(self._worker(results)) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            # Keep what has been fetched so far; the next run resumes from the gaps
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        finally:
+            await results.put(None)
+            await writer
+
+        if not self.missing_ranges():
+            self.index.mark_complete(self._first_complete_block())
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Backfill finished in {elapsed:.1f}s: {self.stats}")
+        return self.stats
+
+    def missing_ranges(self):
+        """Block ranges between from_block and to_block not yet written by this backfill"""
+        with self.index.session_factory() as session:
+            done = session.execute(
+                select(BackfillRange.from_block, BackfillRange.to_block)
+                .where(BackfillRange.name == self.name)
+                .where(BackfillRange.to_block >= self.from_block)
+                .where(BackfillRange.from_block <= self.to_block)
+                .order_by(BackfillRange.from_block)
+            ).all()
+
+        gaps = []
+        next_block = self.from_block
+        for start, end in done:
+            if start > next_block:
+                gaps.append((next_block, start - 1))
+            next_block = max(next_block, end + 1)
+        if next_block <= self.to_block:
+            gaps.append((next_block, self.to_block))
+        return gaps
+
+    def _first_complete_block(self):
+        if self.from_block <= ETHC_DEPLOY_BLOCK:
+            return 0
+        with self.index.session_factory() as session:
+            first = session.execute(
+                select(func.min(EthcBlock.ethc_block)).where(EthcBlock.eth_block >= self.from_block)
+            ).scalar()
+        if self.index.first_complete_block is not None and first is not None:
+            return min(first, self.index.first_complete_block)
+        return first if first is not None else self.index.first_complete_block
+
+    def _take(self):
+        if self._retry:
+            return self._retry.popleft()
+        if not self._gaps:
+            return None
+        start, end = self._gaps[0]
+        chunk_end = min(start + self.chunk_size - 1, end)
+        if chunk_end == end:
+            self._gaps.popleft()
+        else:
+            self._gaps[0] = (chunk_end + 1, end)
+        return start, chunk_end
+
+    async def _next_range(self):
+        async with self._changed:
+            while True:
+                block_range = self._take()
+                if block_range is not None:
+                    self._in_flight += 1
+                    return block_range
+                if self._in_flight == 0:
+                    return None
+                # Another worker may still split its range into new work
+                await self._changed.wait()
+
+    async def _done(self, retry=None):
+        async with self._changed:
+            self._in_flight -= 1
+            if retry:
+                self._retry.extendleft(reversed(retry))
+            self._changed.notify_all()
+
+    async def _worker(self, results):
+        while True:
+            block_range = await self._next_range()
+            if block_range is None:
+                return
+            try:
+                logs = await self._fetch(*block_range)
+            except Exception as e:
+                start, end = block_range
+                if not is_too_many_results(e) or start == end:
+                    await self._done()
+                    raise
+                middle = (start + end) // 2
+                self.chunk_size = max(self.min_chunk_size, (end - start + 1) // 2)
+                self.stats['splits'] += 1
+                logger.debug(f"Splitting {start}-{end}, chunk size now {self.chunk_size}")
+                await self._done(retry=[(start, middle), (middle + 1, end)])
+                continue
+
+            if len(logs) < self.target_results // 2:
+                self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+            await results.put((block_range, [self.reader.decode_log(log) for log in logs]))
+            await self._done()
+
+    async def _fetch(self, from_block, to_block):
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            self.stats['requests'] += 1
+            try:
+                return await self.reader.get_logs(from_block, to_block)
+            except Exception as e:
+                if is_too_many_results(e) or attempt == self.max_retries:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"eth_getLogs {from_block}-{to_block} failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _writer(self, results):
+        batch = []
+        while True:
+            item = await results.get()
+            if item is not None:
+                batch.append(item)
+            # Write when the batch is full, the queue has drained, or the run is over
+            if batch and (item is None or len(batch) >= self.batch_size or results.empty()):
+                self.stats['events'] += self.index.write_ranges(self.name, batch)
+                self.stats['chunks'] += len(batch)
+                batch = []
+            if item is None:
+                return
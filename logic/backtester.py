@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config.constants import BACKTEST_WORKERS, ETHC_PRICE_ETH
+from util.alchemy_connector import resolve
+from logic.gas_model import DEFAULT_GAS_INTERCEPT, DEFAULT_GAS_SLOPE
+from logic.history_archive import NO_WINNER
+from logic.strategy import MineStrategy
+
+logger = logging.getLogger(__name__)
+
+# One entry per closed ETHC block, every field a float64 array except ethc_block
+BlockHistory = namedtuple('BlockHistory', ['ethc_block', 'others', 'mine_cost', 'mining_reward', 'gas_price', 'ethc_price'])
+
+# Money fields are in wei
+BacktestResult = namedtuple('BacktestResult', [
+    'config', 'blocks', 'blocks_entered', 'mines', 'cost', 'expected_wins',
+    'expected_profit', 'variance', 'roi', 'max_drawdown', 'drawdown_p95'
+])
+
+# Ethereum blocks per eth_feeHistory request, the node maximum
+FEE_HISTORY_SPAN = 1024
+
+# Backtester of the current worker process, set once by _init_worker
+_worker_backtester = None
+
+def _init_worker(history, settings):
+    global _worker_backtester
+    _worker_backtester = Backtester(history, workers=1, **settings)
+
+def _run_worker(strategy):
+    return _worker_backtester.run(strategy)
+
+def load_history(archive, start=None, stop=None, exclude=(), gas_prices=0, ethc_price=ETHC_PRICE_ETH):
+    """BlockHistory of the archived blocks in [start, stop) whose winner has been read
+
+    Args:
+        archive: HistoryArchive to read from
+        exclude: Our own addresses, so `others` is the competition each block faced
+        gas_prices: Effective gas price in wei, a number or a {eth block: price} dict
+            as returned by fetch_gas_prices()
+        ethc_price: ETHC price in ETH, a number or an array aligned with the blocks
+    """
+    if ethc_price is None:
+        raise ValueError("No ETHC price to value block rewards, set ETHC_PRICE_ETH or pass ethc_price")
+    blocks = archive.blocks(start, stop)
+    filled = blocks['winner'] != NO_WINNER
+    ethc_blocks = np.asarray(blocks['ethc_block'][filled])
+    if not len(ethc_blocks):
+        raise ValueError("No archived blocks with a winner in range, run fill_blocks() first")
+    first = int(ethc_blocks[0])
+    totals = archive.block_totals(first, int(ethc_blocks[-1]) + 1, exclude=exclude)
+    if isinstance(gas_prices, dict):
+        gas_price = np.array([gas_prices[int(block)] for block in blocks['eth_block'][filled]], dtype=np.float64)
+    else:
+        gas_price = np.full(len(ethc_blocks), float(gas_prices))
+    return BlockHistory(
+        ethc_block=ethc_blocks,
+        others=totals[ethc_blocks - first].astype(np.float64),
+        mine_cost=blocks['mine_cost'][filled].astype(np.float64),
+        mining_reward=blocks['mining_reward'][filled].astype(np.float64),
+        gas_price=gas_price,
+        ethc_price=np.broadcast_to(np.asarray(ethc_price, dtype=np.float64), ethc_blocks.shape).copy()
+    )
+
+async def fetch_gas_prices(miner, eth_blocks, percentile=50, concurrency=8):
+    """Base fee plus the `percentile` priority fee of each Ethereum block, in wei
+
+    Blocks are read in eth_feeHistory spans, so a year of ETHC blocks costs a few
+    thousand requests rather than one per block.
+
+    Returns:
+        Dict of eth block -> gas price
+    """
+    try:
+        wanted = np.unique(np.asarray(eth_blocks, dtype=np.int64))
+        spans = np.unique(wanted // FEE_HISTORY_SPAN)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def read(span):
+            newest = min(int(span + 1) * FEE_HISTORY_SPAN - 1, int(wanted[-1]))
+            count = newest - int(span) * FEE_HISTORY_SPAN + 1
+            async with semaphore:
+                return await resolve(miner.web3.eth.fee_history(count, newest, [percentile]))
+
+        prices = {}
+        for history in await asyncio.gather(*(read(span) for span in spans)):
+            oldest = history['oldestBlock']
+            for offset in range(len(history['gasUsedRatio'])):
+                prices[oldest + offset] = history['baseFeePerGas'][offset] + history['reward'][offset][0]
+        return {int(block): prices[int(block)] for block in wanted}
+
+    except Exception as e:
+        logger.error(f"Error fetching gas price history: {e}")
+        raise
+
+class EVStrategy:
+    """MineStrategy's expected value rule solved for every block at once
+
+    With `others` competing entries, n mines are worth
+    n / (others + n) * R - n * c - gas_intercept * gas_price, where R is the
+    reward in wei and c the marginal cost of a mine including its gas. That is
+    concave in n with its peak at sqrt(others * R / c) - others, so the best
+    count is one of the two integers around it. A block is entered only when
+    the expected value is above `margin` times what the mines cost.
+
+    price_factor scales the ETHC price the strategy believes in, to test how
+    sensitive a configuration is to a wrong price.
+    """
+
+    def __init__(self, max_mine_count=1000, margin=0.0, price_factor=1.0,
+                 gas_intercept=DEFAULT_GAS_INTERCEPT, gas_slope=DEFAULT_GAS_SLOPE):
+        self.max_mine_count = max_mine_count
+        self.margin = margin
+        self.price_factor = price_factor
+        self.gas_intercept = gas_intercept
+        self.gas_slope = gas_slope
+
+    def __repr__(self):
+        return (f"EVStrategy(max_mine_count={self.max_mine_count}, margin={self.margin}, "
+                f"price_factor={self.price_factor})")
+
+    def mine_counts(self, history):
+        others = history.others
+        reward = history.mining_reward * history.ethc_price * self.price_factor
+        marginal = np.maximum(history.mine_cost + self.gas_slope * history.gas_price, 1.0)
+        fixed = self.gas_intercept * history.gas_price
+
+        peak = np.floor(np.sqrt(others * reward / marginal) - others)
+        below = np.clip(peak, 1, self.max_mine_count)
+        above = np.clip(peak + 1, 1, self.max_mine_count)
+
+        def value(counts):
+            return counts / (others + counts) * reward - counts * marginal - fixed
+
+        counts = np.where(value(above) > value(below), above, below)
+        worth = value(counts) > self.margin * (counts * marginal + fixed)
+        return np.where(worth, counts, 0).astype(np.int64)
+
+class FixedStrategy:
+    """Always send mine_count, skipping blocks with more than max_competition competing entries"""
+
+    def __init__(self, mine_count=1, max_competition=None):
+        self.mine_count = mine_count
+        self.max_competition = max_competition
+
+    def __repr__(self):
+        return f"FixedStrategy(mine_count={self.mine_count}, max_competition={self.max_competition})"
+
+    def mine_counts(self, history):
+        counts = np.full(len(history.others), self.mine_count, dtype=np.int64)
+        if self.max_competition is not None:
+            counts[history.others > self.max_competition] = 0
+        return counts
+
+class SolverStrategy:
+    """Adapter for anything with MineStrategy.solve(), asked block by block
+
+    Far slower than a vectorized strategy; use it to check a new solver against
+    the history before writing its mine_counts().
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver or MineStrategy()
+
+    def __repr__(self):
+        return f"SolverStrategy({type(self.solver).__name__})"
+
+    def mine_counts(self, history):
+        return np.array([
+            self.solver.solve(others, mine_cost, mining_reward, gas_price, ethc_price).mine_count
+            for others, mine_cost, mining_reward, gas_price, ethc_price in zip(
+                history.others, history.mine_cost, history.mining_reward, history.gas_price, history.ethc_price
+            )
+        ], dtype=np.int64)
+
+class Backtester:
+    """Replay a BlockHistory against mining strategies
+
+    A strategy is any picklable object with mine_counts(history), returning how
+    many mines to send in each block. Competitors are assumed to mine what they
+    did historically; our n mines join their entries and the contract draws the
+    winner uniformly from all of them.
+
+    Expected profit and its variance are exact (one Bernoulli draw per block).
+    Drawdown depends on the order of wins and losses, so it is measured over
+    `trials` Monte Carlo replays of the draw. Every configuration sees the same
+    random numbers, which keeps comparisons between configurations from being
+    swamped by noise.
+
+    sweep() spreads configurations over a process pool; the history is handed
+    to each worker once, at start-up.
+    """
+
+    def __init__(self, history, trials=200, seed=0, gas_intercept=DEFAULT_GAS_INTERCEPT,
+                 gas_slope=DEFAULT_GAS_SLOPE, workers=None, chunk_size=4096):
+        """
+        Args:
+            history: BlockHistory to replay
+            trials: Monte Carlo replays used for drawdown
+            gas_intercept, gas_slope: Gas a mine() of n actually uses, intercept + slope * n
+            workers: Sweep processes, defaults to BACKTEST_WORKERS or the CPU count
+        """
+        self.history = history
+        self.trials = trials
+        self.seed = seed
+        self.gas_intercept = gas_intercept
+        self.gas_slope = gas_slope
+        self.workers = workers or BACKTEST_WORKERS or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def run(self, strategy):
+        """BacktestResult of one strategy over the whole history"""
+        try:
+            return self.evaluate(strategy, strategy.mine_counts(self.history))
+        except Exception as e:
+            logger.error(f"Error backtesting {strategy}: {e}")
+            raise
+
+    def evaluate(self, config, mine_counts):
+        """BacktestResult of sending mine_counts[i] mines in block i"""
+        history = self.history
+        counts = np.asarray(mine_counts, dtype=np.float64)
+        entered = counts > 0
+        gas = np.where(entered, self.gas_intercept + self.gas_slope * counts, 0.0)
+        costs = counts * history.mine_cost + gas * history.gas_price
+        totals = history.others + counts
+        probabilities = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        rewards = history.mining_reward * history.ethc_price
+
+        cost = float(costs.sum())
+        expected_profit = float((probabilities * rewards).sum()) - cost
+        drawdowns = self._drawdowns(entered, probabilities, rewards, costs)
+        return BacktestResult(
+            config=config,
+            blocks=len(counts),
+            blocks_entered=int(entered.sum()),
+            mines=int(counts.sum()),
+            cost=cost,
+            expected_wins=float(probabilities.sum()),
+            expected_profit=expected_profit,
+            variance=float((probabilities * (1 - probabilities) * rewards ** 2).sum()),
+            roi=expected_profit / cost if cost else 0.0,
+            max_drawdown=float(drawdowns.mean()),
+            drawdown_p95=float(np.percentile(drawdowns, 95))
+        )
+
+    def sweep(self, strategies, workers=None):
+        """Run every strategy, in parallel when there are several; results in input order"""
+        strategies = list(strategies)
+        workers = min(workers or self.workers, len(strategies))
+        if workers <= 1:
+            return [self.run(strategy) for strategy in strategies]
+        settings = {
+            'trials': self.trials,
+            'seed': self.seed,
+            'gas_intercept': self.gas_intercept,
+            'gas_slope': self.gas_slope,
+            'chunk_size': self.chunk_size,
+        }
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.history, settings)) as pool:
+            chunksize = max(len(strategies) // (workers * 4), 1)
+            results = list(pool.map(_run_worker, strategies, chunksize=chunksize))
+        logger.info(f"Backtested {len(results)} configurations over {len(self.history.others)} blocks "
+                    f"with {workers} workers")
+        return results
+
+    def _drawdowns(self, entered, probabilities, rewards, costs):
+        """Largest peak-to-trough fall of cumulative profit, per Monte Carlo trial"""
+        worst = np.zeros(self.trials)
+        cumulative = np.zeros(self.trials)
+        peak = np.zeros(self.trials)
+        for start in range(0, len(entered), self.chunk_size):
+            stop = start + self.chunk_size
+            # Drawn for every block, entered or not, so all configurations share them
+            draws = np.random.default_rng([self.seed, start]).random((self.trials, min(stop, len(entered)) - start))
+            rows = np.flatnonzero(entered[start:stop])
+            if not len(rows):
+                continue
+            wins = draws[:, rows] < probabilities[start:stop][rows]
+            profit = np.where(wins, rewards[start:stop][rows], 0.0) - costs[start:stop][rows]
+            path = cumulative[:, None] + np.cumsum(profit, axis=1)
+            peaks = np.maximum(peak[:, None], np.maximum.accumulate(path, axis=1))
+            worst = np.maximum(worst, (peaks - path).max(axis=1))
+            cumulative = path[:, -1]
+            peak = peaks[:, -1]
+        return worst
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque, namedtuple
+from config.constants import MINE_LEAD_TIME
+from logic.chain_snapshot import BLOCK_INTERVAL, ETH_BLOCK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# One ETHC window in chain time (seconds since the epoch). last_slot is the Ethereum block
+# expected in the last slot stamped before closes_at, if no slot is missed until then;
+# send_at is the local time.monotonic() at which to wake and send for it
+BlockWindow = namedtuple('BlockWindow', ['ethc_block', 'opens_at', 'closes_at', 'last_slot',
+                                         'last_slot_time', 'send_at'])
+
+class ChainClock:
+    """Offset between local time.monotonic() and Ethereum chain time, learned from block timestamps
+
+    A block stamped T is proposed at the start of its slot, at chain time T, and
+    reaches us some delivery delay later, so T - seen_at underestimates the
+    offset by that delay. The estimate is the largest T - seen_at over the last
+    `window` new heads, i.e. the head that arrived fastest. Heads should be
+    observed as soon as they are seen; a head first read long after it was
+    produced only makes a low sample, which the max ignores.
+    """
+
+    def __init__(self, window=32, slot_time=ETH_BLOCK_INTERVAL):
+        self.slot_time = slot_time
+        self.samples = deque(maxlen=window)
+        self.head = None  # (block number, timestamp) of the newest head
+        self.offset = None
+
+    def observe(self, block_number, timestamp, seen_at=None):
+        """Record a head seen at local monotonic time seen_at; returns False for a head already seen"""
+        if self.head is not None and block_number <= self.head[0]:
+            return False
+        seen_at = time.monotonic() if seen_at is None else seen_at
+        self.head = (block_number, timestamp)
+        self.samples.append(timestamp - seen_at)
+        self.offset = max(self.samples)
+        return True
+
+    @property
+    def ready(self):
+        return self.offset is not None
+
+    def now(self):
+        """Current chain time"""
+        return time.monotonic() + self.offset
+
+    def to_local(self, chain_time):
+        """Local monotonic time at which the chain reaches chain_time"""
+        return chain_time - self.offset
+
+    def slot_at_or_after(self, chain_time):
+        """(Ethereum block number, timestamp) of the first slot stamped at or after chain_time
+
+        Slots are on the 12 second grid through the newest head; the block number
+        assumes no slot is missed in between.
+        """
+        number, timestamp = self.head
+        slots = math.ceil((chain_time - timestamp) / self.slot_time)
+        return number + slots, timestamp + slots * self.slot_time
+
+class BlockScheduler:
+    """Wakes the mining task just before the last Ethereum slot that still counts for the open ETHC block
+
+    A mine counts for the open block when it lands in an Ethereum block stamped
+    before lastBlockTime + 60. The last such slot is found on the slot grid of
+    the newest head, and its start is moved into local time with a ChainClock.
+    wait() returns `lead_time` seconds before it, as late as a transaction can
+    still be signed, broadcast and picked up by that slot's builder, so the
+    decision sees as much of the competition as possible.
+
+    Sleeping is done with asyncio.sleep up to `spin` seconds before the
+    deadline and by yielding to the loop for the rest, which puts wake-ups
+    within about a millisecond. Feed it every snapshot (ETHCMiner does when
+    its scheduler is set); the next window is predicted to open at the first
+    slot at or after the current one closes, when the first mine rolls it over.
+    """
+
+    def __init__(self, clock=None, lead_time=MINE_LEAD_TIME, interval=BLOCK_INTERVAL, spin=0.002):
+        self.clock = clock or ChainClock()
+        self.lead_time = lead_time
+        self.interval = interval
+        self.spin = spin
+        self.ethc_block = None
+        self.last_block_time = None
+
+    def observe(self, snapshot, seen_at=None):
+        """Learn the open ETHC block and the head from a ChainSnapshot"""
+        self.clock.observe(snapshot.eth_block_number, snapshot.timestamp, seen_at)
+        if self.ethc_block is None or snapshot.ethc_block >= self.ethc_block:
+            self.ethc_block = snapshot.ethc_block
+            self.last_block_time = snapshot.last_block_time
+
+    def window(self, lead_time=None, skip_missed=True):
+        """BlockWindow of the open ETHC block
+
+        Args:
+            lead_time: Seconds before the last slot to wake, defaults to the scheduler's
+            skip_missed: Move on to the predicted next window while this one's send time has passed
+        """
+        if self.ethc_block is None or not self.clock.ready:
+            raise ValueError("BlockScheduler needs a snapshot before it can predict a window")
+        lead_time = self.lead_time if lead_time is None else lead_time
+        ethc_block, opens_at = self.ethc_block, self.last_block_time
+        while True:
+            closes_at = opens_at + self.interval
+            next_slot, next_slot_time = self.clock.slot_at_or_after(closes_at)
+            last_slot_time = next_slot_time - self.clock.slot_time
+            window = BlockWindow(ethc_block, opens_at, closes_at, next_slot - 1, last_slot_time,
+                                 self.clock.to_local(last_slot_time) - lead_time)
+            if not skip_missed or window.send_at >= time.monotonic():
+                return window
+            ethc_block, opens_at = ethc_block + 1, next_slot_time
+
+    def next_head_at(self, chain_time):
+        """Local time the first head stamped at or after chain_time is expected to arrive"""
+        return self.clock.to_local(self.clock.slot_at_or_after(chain_time)[1])
+
+    async def wait(self, lead_time=None):
+        """Sleep until the send time of the next window not yet missed, and return that BlockWindow"""
+        window = self.window(lead_time)
+        await self.sleep_until(window.send_at)
+        logger.debug("Woke for ETHC block %s, %.1f ms before slot %s", window.ethc_block,
+                     (self.clock.to_local(window.last_slot_time) - time.monotonic()) * 1000, window.last_slot)
+        return window
+
+    async def sleep_until(self, deadline):
+        """Sleep until local monotonic time deadline"""
+        remaining = deadline - time.monotonic()
+        if remaining > self.spin:
+            await asyncio.sleep(remaining - self.spin)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0)
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import websockets
+from eth_utils import encode_hex
+from config.constants import ALCHEMY_WS_URL, LOG_CHUNK_SIZE
+from util.alchemy_connector import resolve
+from util.checkpoint import Checkpoint
+from logic.log_decoder import LogDecoder, MineEvent, NewBlockEvent
+
+logger = logging.getLogger(__name__)
+
+class BlockWatcher:
+    """Follow the contract's Mine and NewETHCBlock logs and deliver them to async consumers
+
+    Logs are read with an eth_getLogs cursor over every Ethereum block since the last
+    one processed, so nothing is missed across restarts. The cursor is saved to a
+    checkpoint after each range has been handed to every subscriber.
+
+    When ALCHEMY_WS_URL is set the watcher sleeps on an eth_subscribe('newHeads')
+    websocket and reads logs as soon as a block arrives; otherwise it checks the
+    head every poll_interval seconds.
+
+    Each subscriber gets its own bounded queue. A full queue blocks the watcher
+    (and the cursor) until the consumer catches up.
+    """
+
+    def __init__(self, web3, contract, start_block=None, confirmations=0,
+                 chunk_size=LOG_CHUNK_SIZE, poll_interval=2.0, ws_url=ALCHEMY_WS_URL,
+                 head_timeout=30.0, checkpoint_name='block_watcher', data_dir=None):
+        self.web3 = web3
+        self.contract = contract
+        self.confirmations = confirmations
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.ws_url = ws_url
+        self.head_timeout = head_timeout
+
+        # Logs are decoded from raw bytes rather than through web3's process_log
+        self.decoder = LogDecoder()
+        self.mine_topic = self.decoder.mine_topic
+        self.new_block_topic = self.decoder.new_block_topic
+
+        self.checkpoint = Checkpoint(checkpoint_name, data_dir) if checkpoint_name else None
+        state = self.checkpoint.load({}) if self.checkpoint else {}
+        self.last_block = state.get('last_block')
+        if self.last_block is None and start_block is not None:
+            self.last_block = start_block - 1
+
+        self._subscribers = []
+        self._running = False
+        self._ws = None
+
+    def subscribe(self, maxsize=1000):
+        """Return a queue that receives every MineEvent and NewBlockEvent from now on"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    async def run(self):
+        """Deliver events until stop() is called"""
+        logger.info(f"Block watcher started at block {self.last_block}")
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    await self.poll()
+                    await self._wait_for_head()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in block watcher: {e}")
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            await self._close_ws()
+            logger.info(f"Block watcher stopped at block {self.last_block}")
+
+    def stop(self):
+        self._running = False
+
+    async def poll(self):
+        """Read and deliver logs for every block between the cursor and the confirmed head
+
+        Returns:
+            Number of events delivered
+        """
+        head = await resolve(self.web3.eth.block_number) - self.confirmations
+        if self.last_block is None:
+            # Nothing to resume from, start following at the head
+            self._advance(head - 1)
+        if head <= self.last_block:
+            return 0
+
+        delivered = 0
+        from_block = self.last_block + 1
+        while from_block <= head:
+            to_block = min(from_block + self.chunk_size - 1, head)
+            logs = await self.get_logs(from_block, to_block)
+            for log in logs:
+                await self._publish(self.decode_log(log))
+                delivered += 1
+            self._advance(to_block)
+            from_block = to_block + 1
+
+        if delivered:
+            logger.debug("Delivered %s events up to block %s", delivered, head)
+        return delivered
+
+    async def get_logs(self, from_block, to_block):
+        return await resolve(self.web3.eth.get_logs({
+            'address': self.contract.address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': [[encode_hex(self.mine_topic), encode_hex(self.new_block_topic)]]
+        }))
+
+    def decode_log(self, log):
+        return self.decoder.decode(log)
+
+    async def _publish(self, event):
+        for queue in list(self._subscribers):
+            await queue.put(event)
+
+    def _advance(self, block_number):
+        self.last_block = block_number
+        if self.checkpoint:
+            self.checkpoint.save({'last_block': block_number})
+
+    async def _wait_for_head(self):
+        if not self.ws_url:
+            await asyncio.sleep(self.poll_interval)
+            return
+
+        try:
+            if self._ws is None:
+                self._ws = await websockets.connect(self.ws_url)
+                await self._ws.send(json.dumps({
+                    'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newHeads']
+                }))
+                await self._ws.recv()  # subscription id
+                logger.info("Subscribed to new heads over websocket")
+            await asyncio.wait_for(self._ws.recv(), timeout=self.head_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"No new head for {self.head_timeout}s, checking logs anyway")
+        except (websockets.ConnectionClosed, OSError) as e:
+            logger.warning(f"Head subscription lost, polling until it reconnects: {e}")
+            await self._close_ws()
+            await asyncio.sleep(self.poll_interval)
+
+    async def _close_ws(self):
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
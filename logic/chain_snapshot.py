@@ -0,0 +1,41 @@
+BLOCK_INTERVAL = 60  # ETHC blocks are produced once per minute
+ETH_BLOCK_INTERVAL = 12  # Ethereum slot time since the merge
+
+class ChainSnapshot:
+    """ETHC contract state and Ethereum header read together at one Ethereum block"""
+
+    def __init__(self, eth_block_number, timestamp, base_fee, ethc_block,
+                 last_block_time, mine_cost, mining_reward, miner_count):
+        self.eth_block_number = eth_block_number
+        self.timestamp = timestamp
+        # baseFeePerGas of eth_block_number, None when not known
+        self.base_fee = base_fee
+        self.ethc_block = ethc_block
+        self.last_block_time = last_block_time
+        self.mine_cost = mine_cost
+        self.mining_reward = mining_reward
+        # minersOfBlockCount for ethc_block
+        self.miner_count = miner_count
+
+    @property
+    def time_since_last(self):
+        return self.timestamp - self.last_block_time
+
+    @property
+    def blocks_ready(self):
+        return self.time_since_last // BLOCK_INTERVAL
+
+    def to_block_info(self):
+        """Block info dict in the shape returned by ETHCMiner.get_current_block"""
+        return {
+            'current_block': self.ethc_block,
+            'next_block': self.ethc_block + 1,
+            'last_block_time': self.last_block_time,
+            'time_since_last': self.time_since_last,
+            'blocks_ready': self.blocks_ready,
+            'next_block_available': self.blocks_ready > 0
+        }
+
+    def __str__(self):
+        return (f"ChainSnapshot(eth_block={self.eth_block_number}, ethc_block={self.ethc_block}, "
+                f"time_since_last={self.time_since_last}s, miners={self.miner_count})")
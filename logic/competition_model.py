@@ -0,0 +1,241 @@
+import logging
+from collections import namedtuple
+import numpy as np
+from eth_utils import to_checksum_address
+from logic.block_watcher import MineEvent, NewBlockEvent
+from logic.chain_snapshot import BLOCK_INTERVAL, ETH_BLOCK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Competing mines expected in the open block once it closes; observed is what is in it already
+CompetitionForecast = namedtuple('CompetitionForecast', ['ethc_block', 'elapsed', 'observed', 'expected', 'std'])
+
+class CompetitionModel:
+    """Streaming per-miner model of the competition, forecasting each block's final mine count
+
+    Fed Mine and NewETHCBlock events as the block watcher delivers them. For
+    every competing miner it keeps exponentially weighted statistics over
+    closed blocks: participation rate, mines per block entered (mean and
+    variance) and when in the 60 second window its mines arrive, as shares
+    per `bucket_seconds` bucket. Miners never seen before are covered by an
+    EWMA of the mines newcomers add per block.
+
+    A Mine event costs O(1); closing a block touches only the miners that
+    entered it, and miners that sat blocks out are decayed lazily the next
+    time they are read. Statistics live in NumPy arrays indexed by miner id,
+    so forecast() is a handful of vector operations over all known miners.
+
+    The forecast is what is in the block so far plus, per miner, the mines
+    still expected after `elapsed` seconds: for a miner that has not entered
+    yet, the chance it still will given that it hasn't, times its usual count;
+    for one that has, whatever is left of its usual count, at most the share
+    of it that usually comes later.
+    """
+
+    def __init__(self, exclude=(), alpha=0.05, bucket_seconds=5, window=BLOCK_INTERVAL, capacity=256):
+        """
+        Args:
+            exclude: Our own addresses, left out of the competition
+            alpha: EWMA weight of the newest block
+            bucket_seconds: Width of the entry-time buckets
+            window: Seconds a block stays open; mines after it fall in one last bucket
+        """
+        self.exclude = {to_checksum_address(address) for address in exclude}
+        self.alpha = alpha
+        self.decay = 1 - alpha
+        self.bucket_seconds = bucket_seconds
+        self.buckets = -(-window // bucket_seconds) + 1
+
+        self.addresses = []
+        self._ids = {}  # address -> miner id
+        self.participation = np.zeros(capacity)
+        self.updated_block = np.zeros(capacity, dtype=np.int64)  # last closed block `participation` accounts for
+        self.first_block = np.zeros(capacity, dtype=np.int64)
+        self.mean_count = np.zeros(capacity)
+        self.var_count = np.zeros(capacity)
+        self.timing = np.zeros((capacity, self.buckets))
+        self.newcomer_mean = 0.0  # mines per block from miners seen for the first time
+        self.newcomer_var = 0.0
+        self.blocks_closed = 0
+        self.last_closed = None
+
+        self.ethc_block = None  # open block
+        self.opened_at = None  # Ethereum block of its NewETHCBlock, None if we joined it late
+        self.observed = 0
+        self._counts = {}  # miner id -> mines in the open block
+        self._timing = {}  # miner id -> mines per bucket in the open block
+
+    def observe(self, event, elapsed=None):
+        """Update with one MineEvent or NewBlockEvent
+
+        Args:
+            elapsed: Seconds since the block opened when the mine arrived; by default
+                taken from the Ethereum blocks between the NewETHCBlock and the mine
+        """
+        if isinstance(event, NewBlockEvent):
+            if self.ethc_block is None or event.ethc_block > self.ethc_block:
+                self._close()
+                self._open(event.ethc_block, event.eth_block)
+            return
+        if not isinstance(event, MineEvent):
+            return
+        if self.ethc_block is None or event.ethc_block > self.ethc_block:
+            # Missed the NewETHCBlock: the block is followed but too partial to learn from
+            self._close()
+            self._open(event.ethc_block, None)
+        elif event.ethc_block < self.ethc_block:
+            return
+        if event.miner in self.exclude:
+            return
+
+        miner = self._ids.get(event.miner)
+        if miner is None:
+            miner = self._add(event.miner)
+        if elapsed is None:
+            elapsed = (event.eth_block - self.opened_at) * ETH_BLOCK_INTERVAL if self.opened_at is not None else 0
+        timing = self._timing.get(miner)
+        if timing is None:
+            timing = self._timing[miner] = np.zeros(self.buckets)
+        timing[self._bucket(elapsed)] += event.mine_count
+        self._counts[miner] = self._counts.get(miner, 0) + event.mine_count
+        self.observed += event.mine_count
+
+    def forecast(self, elapsed=None, eth_block=None):
+        """CompetitionForecast for the open block, `elapsed` seconds after it opened
+
+        Pass either elapsed or the current Ethereum block number.
+        """
+        if elapsed is None:
+            if eth_block is None or self.opened_at is None:
+                raise ValueError("forecast() needs elapsed seconds or an Ethereum block after the block opened")
+            elapsed = (eth_block - self.opened_at) * ETH_BLOCK_INTERVAL
+        if not self.blocks_closed:
+            return CompetitionForecast(self.ethc_block, elapsed, self.observed, float(self.observed), 0.0)
+
+        count = len(self.addresses)
+        known = self.first_block[:count] <= self.last_closed
+        participation = self._participation(count)
+        mean, var = self.mean_count[:count], self.var_count[:count]
+        entered = self._cdf(self.timing[:count], elapsed)
+        observed = np.zeros(count)
+        observed[list(self._counts)] = list(self._counts.values())
+        seen = observed > 0
+
+        # P(enters after elapsed | not entered by elapsed)
+        unseen = known & ~seen
+        late = np.divide(participation * (1 - entered), 1 - participation * entered,
+                         out=np.zeros(count), where=unseen & (participation * entered < 1))
+        remaining = np.where(unseen, late * mean, 0.0)
+        spread = np.where(unseen, late * var + late * (1 - late) * mean ** 2, 0.0)
+        # Miners already in the block may top up to their usual count, if they usually do so later
+        later = known & seen
+        remaining += np.where(later, np.minimum(np.maximum(mean - observed, 0), mean * (1 - entered)), 0.0)
+        spread += np.where(later, var * (1 - entered), 0.0)
+
+        # Newcomers are assumed to time their mines like the known miners, weighted by volume
+        weights = participation * mean * known
+        total = weights.sum()
+        overall = weights @ self.timing[:count] / total if total else np.full(self.buckets, 1 / self.buckets)
+        newcomer_share = 1 - self._cdf(overall[None, :], elapsed)[0]
+
+        expected = self.observed + remaining.sum() + self.newcomer_mean * newcomer_share
+        variance = spread.sum() + self.newcomer_var * newcomer_share
+        return CompetitionForecast(self.ethc_block, elapsed, self.observed, float(expected), float(np.sqrt(variance)))
+
+    def miner_stats(self, address):
+        """Current statistics of one miner"""
+        miner = self._ids[to_checksum_address(address)]
+        participation = self._participation(len(self.addresses))[miner] if self.blocks_closed else 0.0
+        return {
+            'participation': float(participation),
+            'mean_count': float(self.mean_count[miner]),
+            'std_count': float(np.sqrt(self.var_count[miner])),
+            'timing': self.timing[miner].copy(),
+        }
+
+    def _open(self, ethc_block, opened_at):
+        self.ethc_block = ethc_block
+        self.opened_at = opened_at
+        self.observed = 0
+        self._counts = {}
+        self._timing = {}
+
+    def _close(self):
+        """Fold the open block into the per-miner statistics"""
+        if self.ethc_block is None:
+            return
+        closed = self.ethc_block
+        if self.opened_at is None:
+            # Joined mid-block: nothing is learned, miners first seen here start fresh next block
+            for miner in self._counts:
+                if self.first_block[miner] == closed:
+                    self.first_block[miner] = closed + 1
+            return
+
+        alpha, decay = self.alpha, self.decay
+        newcomer_total = 0
+        for miner, mine_count in self._counts.items():
+            share = self._timing[miner] / mine_count
+            if self.first_block[miner] == closed:
+                newcomer_total += mine_count
+                self.participation[miner] = alpha
+                self.mean_count[miner] = mine_count
+                self.var_count[miner] = 0.0
+                self.timing[miner] = share
+            else:
+                gap = closed - self.updated_block[miner] - 1
+                self.participation[miner] = self.participation[miner] * decay ** (gap + 1) + alpha
+                delta = mine_count - self.mean_count[miner]
+                self.mean_count[miner] += alpha * delta
+                self.var_count[miner] = decay * (self.var_count[miner] + alpha * delta * delta)
+                self.timing[miner] = decay * self.timing[miner] + alpha * share
+            self.updated_block[miner] = closed
+
+        if self.blocks_closed:
+            # In the first block every miner is a newcomer, that says nothing about newcomers
+            delta = newcomer_total - self.newcomer_mean
+            self.newcomer_mean += alpha * delta
+            self.newcomer_var = decay * (self.newcomer_var + alpha * delta * delta)
+        self.blocks_closed += 1
+        self.last_closed = closed
+        logger.debug("Closed ETHC block %s: %s competing mines from %s miners", closed, self.observed, len(self._counts))
+
+    def _add(self, address):
+        miner = len(self.addresses)
+        if miner == len(self.participation):
+            self._grow()
+        self.addresses.append(address)
+        self._ids[address] = miner
+        self.first_block[miner] = self.ethc_block
+        return miner
+
+    def _grow(self):
+        size = len(self.participation) * 2
+        for name in ('participation', 'updated_block', 'first_block', 'mean_count', 'var_count'):
+            column = getattr(self, name)
+            grown = np.zeros(size, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+        timing = np.zeros((size, self.buckets))
+        timing[:len(self.timing)] = self.timing
+        self.timing = timing
+
+    def _participation(self, count):
+        """Bias-corrected participation, decayed for the blocks each miner sat out since"""
+        blocks = self.last_closed - self.updated_block[:count]
+        raw = self.participation[:count] * self.decay ** blocks
+        # EWMA weight accumulated since first seen, so a new miner isn't read as a rare one
+        weight = 1 - self.decay ** (self.last_closed - self.first_block[:count] + 1)
+        return np.clip(np.divide(raw, weight, out=np.zeros(count), where=weight > 0), 0, 1)
+
+    def _bucket(self, elapsed):
+        return min(max(int(elapsed // self.bucket_seconds), 0), self.buckets - 1)
+
+    def _cdf(self, timing, elapsed):
+        """Share of each row's mines that arrive by `elapsed`, linear within a bucket"""
+        bucket = self._bucket(elapsed)
+        before = timing[:, :bucket].sum(axis=1)
+        if bucket == self.buckets - 1:
+            return before
+        within = min(max(elapsed / self.bucket_seconds - bucket, 0.0), 1.0)
+        return before + timing[:, bucket] * within
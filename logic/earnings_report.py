@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from database.connection import get_session_factory
+from database.db_models import HourlyRollup
+from logic.tx_tracker import hour_of
+from util.sendgrid_wrapper import admin_message
+
+logger = logging.getLogger(__name__)
+
+WEI = 10 ** 18
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class EarningsReport:
+    """Hourly earnings summary emailed to the admins through a NotificationOutbox
+
+    Figures come from the hour's HourlyRollup row, which MineTracker keeps up
+    to date, so a summary is one primary-key read however much was mined.
+    """
+
+    def __init__(self, outbox, session_factory=None):
+        self.outbox = outbox
+        self.session_factory = session_factory or get_session_factory()
+        self._running = False
+
+    def rollup(self, hour):
+        """Totals for the hour starting at `hour` (naive UTC) as a dict, or None if nothing happened"""
+        with self.session_factory() as session:
+            row = session.get(HourlyRollup, hour_of(hour))
+            if row is None:
+                return None
+            return {column.name: getattr(row, column.name) for column in HourlyRollup.__table__.columns}
+
+    def summary(self, hour):
+        """(subject, text, html) of the email for an hour"""
+        rollup = self.rollup(hour) or {'hour': hour_of(hour)}
+        lines = [
+            ('Mine transactions sent', rollup.get('transactions', 0)),
+            ('Mines sent', rollup.get('mine_count', 0)),
+            ('Confirmed / failed / dropped',
+             f"{rollup.get('confirmed', 0)} / {rollup.get('failed', 0)} / {rollup.get('dropped', 0)}"),
+            ('Mine cost paid (ETH)', f"{rollup.get('value', 0) / WEI:.6f}"),
+            ('Gas paid (ETH)', f"{rollup.get('gas_paid', 0) / WEI:.6f}"),
+            ('Blocks won / decided', f"{rollup.get('wins', 0)} / {rollup.get('blocks_entered', 0)}"),
+            ('ETHC won', f"{rollup.get('reward', 0) / WEI:.4f}"),
+            ('Net profit (ETH)', f"{rollup.get('net_profit', 0) / WEI:+.6f}"),
+        ]
+        start = rollup['hour']
+        subject = f"ETHC earnings {start:%Y-%m-%d %H:00}-{start + timedelta(hours=1):%H:00} UTC"
+        text = '\n'.join(f"{name}: {value}" for name, value in lines)
+        html = '<table>' + ''.join(f"<tr><td>{name}</td><td>{value}</td></tr>" for name, value in lines) + '</table>'
+        return subject, text, html
+
+    def send(self, hour=None):
+        """Queue the summary of an hour, by default the last complete one"""
+        hour = hour_of(hour if hour is not None else _now() - timedelta(hours=1))
+        subject, text, html = self.summary(hour)
+        message = admin_message(text, subject)
+        message['body_html'] = html
+        message['categories'] = ['my-app', 'earnings']
+        return self.outbox.send(**message)
+
+    async def run(self):
+        """Send each hour's summary just after it ends, until stop()"""
+        self._running = True
+        while self._running:
+            now = _now()
+            next_hour = hour_of(now) + timedelta(hours=1)
+            await asyncio.sleep((next_hour - now).total_seconds())
+            try:
+                self.send(next_hour - timedelta(hours=1))
+            except Exception as e:
+                logger.error(f"Error sending earnings summary: {e}")
+
+    def stop(self):
+        self._running = False
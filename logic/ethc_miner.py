@@ -1,48 +1,148 @@
 import logging
+import math
+import time
+from collections import OrderedDict
 from decimal import Decimal
-from config.constants import ETHC_CONTRACT_ADDRESS, ETHC_CONTRACT_ABI
-from util.alchemy_connector import w3
+from functools import cached_property
+from config.constants import ETHC_CONTRACT_ADDRESS, FEE_URGENCY, load_abi
+from util.alchemy_connector import default_web3, resolve
+from util.metrics import install_metrics, metrics
+from util.multicall import Multicall
+from util.nonce_manager import is_already_sent, is_nonce_error, is_rejection
+from util.rpc_cache import install_rpc_cache
+from logic.block_watcher import BlockWatcher, NewBlockEvent
+from logic.chain_snapshot import BLOCK_INTERVAL, ChainSnapshot
+from logic.fee_oracle import FeeOracle
+from logic.gas_model import DEFAULT_GAS_INTERCEPT, DEFAULT_GAS_SLOPE, GasModel
+from logic.mempool_watcher import MempoolWatcher
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Sent mines remembered for observe_receipt; older ones are assumed dropped
+MAX_PENDING_MINES = 1024
+
 class ETHCMiner:
-    def __init__(self, wallet_manager):
+    def __init__(self, wallet_manager, web3=None, contract_address=None):
         """Initialize the ETHC miner with Web3 connection and contract"""
         logger.info("Initializing ETHCMiner...")
-        self.web3 = w3
+        self.web3 = web3 or default_web3()
         self.wallet_manager = wallet_manager
-        
-        # Initialize contract using ABI from constants
-        self.contract = self.web3.eth.contract(
-            address=ETHC_CONTRACT_ADDRESS,
-            abi=ETHC_CONTRACT_ABI
-        )
-        logger.info(f"Contract initialized at proxy address: {ETHC_CONTRACT_ADDRESS}")
+        self.contract_address = contract_address or ETHC_CONTRACT_ADDRESS
+
+        # Reads at the current head are answered from here until the next Ethereum block
+        self.rpc_cache = install_rpc_cache(self.web3)
+        # Moved outside the cache even if the wallet manager installed it first,
+        # so cached answers count toward the latency callers see
+        install_metrics(self.web3)
+        self._pending_mines = OrderedDict()  # tx hash -> mine count, until the receipt is seen
+        # Last seen ETHC block, used to include minersOfBlockCount in the same aggregate
+        self._ethc_block_hint = None
+        # Optional logic.miner_index.MinerIndex, used for participation lookups while warm
+        self.index = None
+        # Optional logic.tx_tracker.MineTracker, records every mine sent
+        self.tracker = None
+        # Optional logic.competition_model.CompetitionModel fed by the block watcher
+        self.competition = None
+        # Optional logic.mempool_watcher.MempoolWatcher, competitor mines not yet included
+        self.mempool = None
+        # Optional logic.block_scheduler.BlockScheduler, fed every snapshot
+        self.scheduler = None
+
+    # Contract objects, the fee oracle and the gas model are built on first use,
+    # so short-lived commands only pay for the ones they touch
+
+    @cached_property
+    def contract(self):
+        contract = self.web3.eth.contract(address=self.contract_address, abi=load_abi('ethc_contract'))
+        logger.info(f"Contract initialized at proxy address: {self.contract_address}")
+        return contract
+
+    @cached_property
+    def multicall(self):
+        """All state reads go through one Multicall3 aggregate per snapshot"""
+        return Multicall(self.web3)
+
+    @cached_property
+    def fee_oracle(self):
+        """Fee history cache shared by every mine in the same Ethereum block"""
+        return FeeOracle(self.web3)
+
+    @cached_property
+    def gas_model(self):
+        """Gas limits learned from receipts of our own mines"""
+        return GasModel()
+
+    async def get_snapshot(self, ethc_block=None):
+        """Read contract state and the latest block header in a single eth_call
+
+        Every value is pinned to the same Ethereum block. The base fee is the fee
+        oracle's figure for that block, None until its fee history reaches it. A second call, pinned to
+        that block, is only needed when the ETHC block to count miners for is not
+        known up front (first snapshot or an ETHC block rollover).
+
+        Args:
+            ethc_block: ETHC block to count miners for, defaults to the current block
+
+        Returns:
+            ChainSnapshot
+        """
+        try:
+            count_block = ethc_block if ethc_block is not None else self._ethc_block_hint
+            calls = [
+                self.multicall.block_number(),
+                self.multicall.block_timestamp(),
+                self.contract.functions.blockNumber(),
+                self.contract.functions.lastBlockTime(),
+                self.contract.functions.mineCost(),
+                self.contract.functions.miningReward(),
+            ]
+            if count_block is not None:
+                calls.append(self.contract.functions.minersOfBlockCount(count_block))
 
-    async def get_current_block(self):
+            results = await self.multicall.aggregate(calls)
+            (eth_block_number, timestamp, current_block,
+             last_block_time, mine_cost, mining_reward) = results[:6]
+            self._ethc_block_hint = current_block
+            # The aggregate itself may have come from the cache, so it can move the head but not confirm it
+            self.rpc_cache.advance_head(eth_block_number, confirmed=False)
+
+            target_block = ethc_block if ethc_block is not None else current_block
+            if count_block == target_block:
+                miner_count = results[6]
+            else:
+                miner_count = await resolve(self.contract.functions.minersOfBlockCount(target_block).call(
+                    block_identifier=eth_block_number
+                ))
+
+            snapshot = ChainSnapshot(
+                eth_block_number=eth_block_number,
+                timestamp=timestamp,
+                # BASEFEE inside an eth_call without a gas price reads 0 on geth, so the base
+                # fee comes from the fee oracle's eth_feeHistory window instead
+                base_fee=self.fee_oracle.block_base_fee(eth_block_number),
+                ethc_block=current_block,
+                last_block_time=last_block_time,
+                mine_cost=mine_cost,
+                mining_reward=mining_reward,
+                miner_count=miner_count
+            )
+            if self.scheduler is not None:
+                self.scheduler.observe(snapshot)
+            logger.debug("Snapshot: %s", snapshot)
+            return snapshot
+        except Exception as e:
+            logger.error(f"Error getting chain snapshot: {e}")
+            raise
+
+    async def get_current_block(self, snapshot=None):
         """Get current block and timing information from contract"""
         try:
-            current_block = self.contract.functions.blockNumber().call()
-            last_block_time = self.contract.functions.lastBlockTime().call()
-            current_time = self.web3.eth.get_block('latest').timestamp
-            
-            # Block interval is constant (1 minute)
-            block_interval = 60
+            if snapshot is None:
+                snapshot = await self.get_snapshot()
+            block_info = snapshot.to_block_info()
             
-            time_since_last = current_time - last_block_time
-            blocks_ready = time_since_last // block_interval
-            
-            block_info = {
-                'current_block': current_block,
-                'next_block': current_block + 1,
-                'last_block_time': last_block_time,
-                'time_since_last': time_since_last,
-                'blocks_ready': blocks_ready,
-                'next_block_available': True
-            }
-            
-            logger.debug(f"Block info: {block_info}")
+            logger.debug("Block info: %s", block_info)
             return block_info
         except Exception as e:
             logger.error(f"Error getting current block: {e}")
@@ -52,20 +152,15 @@ class ETHCMiner:
         """Get current mining statistics"""
         try:
             logger.info("Fetching mining stats...")
-            # Get block info first
-            block_info = await self.get_current_block()
-            
-            # Get costs and rewards from contract
-            mine_cost = self.contract.functions.mineCost().call()
-            mining_reward = self.contract.functions.miningReward().call()
-            last_block_time = self.contract.functions.lastBlockTime().call()
+            snapshot = await self.get_snapshot()
+            block_info = await self.get_current_block(snapshot)
             
             stats = {
                 'current_block': block_info['current_block'],
                 'block_interval': 60,  # 1 minute in seconds
-                'mine_cost': self.web3.from_wei(mine_cost, 'ether'),
-                'mining_reward': mining_reward,
-                'last_block_time': last_block_time,
+                'mine_cost': self.web3.from_wei(snapshot.mine_cost, 'ether'),
+                'mining_reward': snapshot.mining_reward,
+                'last_block_time': snapshot.last_block_time,
                 'time_since_last': block_info['time_since_last'],
                 'blocks_ready': block_info['blocks_ready']
             }
@@ -76,100 +171,299 @@ class ETHCMiner:
             raise
 
     async def get_block_miners(self, block_number):
-        """Get miners for a specific block"""
+        """Get miners for a specific block
+
+        While the miner index is warm, miners come from it (each address once, with
+        per-miner totals in mine_counts) and only selectedMinerOfBlock is read on chain.
+        """
         try:
-            miners = self.contract.functions.minersOfBlock(block_number).call()
-            miner_count = self.contract.functions.minersOfBlockCount(block_number).call()
-            
-            # Use selectedMinerOfBlock function
-            selected_miner = self.contract.functions.selectedMinerOfBlock(block_number).call()
+            if await self._indexed(block_number):
+                mine_counts = self.index.mine_counts(block_number)
+                selected_miner = await resolve(
+                    self.contract.functions.selectedMinerOfBlock(block_number).call()
+                )
+                return {
+                    'miners': list(mine_counts),
+                    'miner_count': sum(mine_counts.values()),
+                    'mine_counts': mine_counts,
+                    'selected_miner': selected_miner
+                }
+
+            cache_key = ('block_miners', block_number)
+            block_miners = self.rpc_cache.get(cache_key)
+            if block_miners is not None:
+                return dict(block_miners)
+
+            miners, miner_count, selected_miner = await self.multicall.aggregate([
+                self.contract.functions.minersOfBlock(block_number),
+                self.contract.functions.minersOfBlockCount(block_number),
+                self.contract.functions.selectedMinerOfBlock(block_number),
+            ])
             
-            return {
+            block_miners = {
                 'miners': miners,
                 'miner_count': miner_count,
                 'selected_miner': selected_miner
             }
+            # A closed block whose winner is drawn never changes again
+            closed = self._ethc_block_hint is not None and block_number < self._ethc_block_hint
+            if closed and int(selected_miner, 16) != 0:
+                self.rpc_cache.put(cache_key, block_miners, immutable=True)
+            return dict(block_miners)
         except Exception as e:
             logger.error(f"Error getting block miners: {e}")
             raise
 
-    async def mine(self, wallet_name, mine_count=1):
-        """Submit a mining transaction"""
+    async def _indexed(self, block_number):
+        """True if the miner index is warm at the known head, with block_number loaded"""
+        if self.index is None or not self.index.is_warm(block_number, head=self.rpc_cache.head):
+            return False
+        await self.index.load(block_number)
+        return True
+
+    async def get_blocks_miners(self, block_numbers):
+        """Get miners for several blocks with all reads in flight together"""
+        results = await asyncio.gather(*(self.get_block_miners(n) for n in block_numbers))
+        return dict(zip(block_numbers, results))
+
+    async def mine(self, wallet_name, mine_count=1, snapshot=None, fees=None, urgency=FEE_URGENCY, balance=None):
+        """Submit a mining transaction
+
+        The nonce comes from the wallet manager's NonceManager, so overlapping mines
+        from the same wallet get consecutive nonces. If the node rejects the nonce as
+        stale, it is resynced and the transaction re-signed and sent once more; see
+        send_signed_mine for the other send failures.
+
+        Args:
+            wallet_name: Wallet to mine from
+            mine_count: Number of mines in the transaction
+            snapshot: ChainSnapshot to price against, read fresh if not given
+            fees: FeeEstimate to pay, taken from the fee oracle if not given
+            urgency: Fee oracle urgency profile used when fees is not given
+            balance: Wallet balance from a sweep, read fresh if not given
+        """
         try:
-            # Get current block info (but don't wait)
-            block_info = await self.get_current_block()
-            
-            # Get contract state before mining
-            logger.info("\nChecking contract state:")
-            logger.info(f"- Block number from contract: {self.contract.functions.blockNumber().call()}")
-            logger.info(f"- Last block time: {self.contract.functions.lastBlockTime().call()}")
-            logger.info(f"- Current chain time: {self.web3.eth.get_block('latest').timestamp}")
-            logger.info(f"- Time since last block: {block_info['time_since_last']}s")
-            
-            # Get mining cost from contract
-            mine_cost = self.contract.functions.mineCost().call()
-            logger.info(f"- Mining cost from contract: {self.web3.from_wei(mine_cost, 'ether')} ETH")
-            
-            wallet = self.wallet_manager.get_wallet_by_name(wallet_name)
-            
-            # Calculate total cost including gas
-            total_mine_cost = mine_cost * mine_count
-            gas_limit = self.contract.functions.mine(mine_count).estimate_gas({
-                'from': wallet.public_key, 
-                'value': total_mine_cost
-            })
-            gas_limit = int(gas_limit * 1.2)  # Add 20% buffer
-            
-            # Get current gas prices
-            base_fee = self.web3.eth.get_block('latest').baseFeePerGas
-            priority_fee = self.web3.eth.max_priority_fee
-            max_fee_per_gas = base_fee * 2 + priority_fee  # Double the base fee for buffer
-            
-            max_gas_cost = gas_limit * max_fee_per_gas
-            total_cost = total_mine_cost + max_gas_cost
-            
-            logger.info("Cost breakdown:")
-            logger.info(f"- Mining cost: {self.web3.from_wei(total_mine_cost, 'ether')} ETH")
-            logger.info(f"- Max gas cost: {self.web3.from_wei(max_gas_cost, 'ether')} ETH")
-            logger.info(f"- Total needed: {self.web3.from_wei(total_cost, 'ether')} ETH")
-            
-            # Check wallet balance
-            balance = self.web3.eth.get_balance(wallet.public_key)
-            logger.info(f"- Wallet balance: {self.web3.from_wei(balance, 'ether')} ETH")
-            
-            if balance < total_cost:
-                raise ValueError("Insufficient funds for mining")
-                
-            # Build transaction
-            nonce = self.web3.eth.get_transaction_count(wallet.public_key, 'latest')
-            
-            transaction = {
-                'from': wallet.public_key,
-                'value': total_mine_cost,
-                'nonce': nonce,
-                'gas': gas_limit,
-                'maxFeePerGas': max_fee_per_gas,
-                'maxPriorityFeePerGas': priority_fee,
-                'type': 2,  # EIP-1559 transaction
-                'chainId': self.web3.eth.chain_id
-            }
-            
-            # Build and sign transaction
-            tx = self.contract.functions.mine(mine_count).build_transaction(transaction)
-            signed_tx = self.web3.eth.account.sign_transaction(tx, wallet.private_key)
-            
-            # Send transaction
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            return tx_hash
-            
+            with metrics.span('mine'):
+                return await self._mine(wallet_name, mine_count, snapshot, fees, urgency, balance)
         except Exception as e:
             logger.error(f"Error submitting mining transaction: {e}")
             raise
 
+    async def _mine(self, wallet_name, mine_count, snapshot, fees, urgency, balance):
+        # Each phase is timed under ethc_mine_phase_seconds{phase=...}
+        if snapshot is None:
+            snapshot = await metrics.timed(self.get_snapshot(), 'mine_phase', phase='reads')
+        nonce_manager = self.wallet_manager.nonce_manager
+        wallet = self.wallet_manager.get_wallet_by_name(wallet_name)
+        mine_cost = snapshot.mine_cost
+
+        # Calculate total cost including gas
+        total_mine_cost = mine_cost * mine_count
+        mine_function = self.contract.functions.mine(mine_count)
+
+        # Gas limit from the receipt model; the node is only asked when the model can't answer
+        gas_limit = self.gas_model.gas_limit(mine_count)
+
+        # Chain id, balance, fees and any gas estimate are independent, so request them together
+        requests = [nonce_manager.chain_id()]
+        if balance is None:
+            requests.append(metrics.timed(
+                resolve(self.web3.eth.get_balance(wallet.public_key)), 'mine_phase', phase='reads'
+            ))
+        if fees is None:
+            requests.append(metrics.timed(
+                self.fee_oracle.estimate(urgency, head=snapshot.eth_block_number), 'mine_phase', phase='fee'
+            ))
+        if gas_limit is None:
+            requests.append(metrics.timed(resolve(mine_function.estimate_gas({
+                'from': wallet.public_key,
+                'value': total_mine_cost
+            })), 'mine_phase', phase='estimate'))
+        results = list(await asyncio.gather(*requests))
+        chain_id = results[0]
+        extra = results[1:]
+        if balance is None:
+            balance = extra.pop(0)
+        if fees is None:
+            fees = extra.pop(0)
+        gas_source = 'gas model'
+        if gas_limit is None:
+            gas_limit = int(extra.pop(0) * 1.2)  # Add 20% buffer
+            gas_source = 'estimate_gas'
+
+        # Max fee covers the predicted base fee plus the profile's headroom
+        max_fee_per_gas = fees.max_fee_per_gas
+        priority_fee = fees.max_priority_fee_per_gas
+        max_gas_cost = gas_limit * max_fee_per_gas
+        total_cost = total_mine_cost + max_gas_cost
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Contract state: ETHC block %s, last block time %s, chain time %s (%ss since last), "
+                "mine cost %s ETH, predicted base fee %s gwei",
+                snapshot.ethc_block, snapshot.last_block_time, snapshot.timestamp, snapshot.time_since_last,
+                self.web3.from_wei(mine_cost, 'ether'), self.web3.from_wei(fees.base_fee, 'gwei')
+            )
+        logger.info("Cost of %s mines from %s: %s wei mining + %s wei max gas (%s gas from %s), balance %s wei",
+                    mine_count, wallet_name, total_mine_cost, max_gas_cost, gas_limit, gas_source, balance)
+
+        if balance < total_cost:
+            raise ValueError("Insufficient funds for mining")
+
+        # Build transaction; every field is set, so this is local encoding only
+        transaction = {
+            'from': wallet.public_key,
+            'value': total_mine_cost,
+            'gas': gas_limit,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': priority_fee,
+            'type': 2,  # EIP-1559 transaction
+            'chainId': chain_id
+        }
+
+        for attempt in range(2):
+            nonce = await nonce_manager.allocate(wallet.public_key)
+            try:
+                with metrics.span('mine_phase', phase='sign'):
+                    tx = await resolve(mine_function.build_transaction({**transaction, 'nonce': nonce}))
+                    raw_tx = self.wallet_manager.sign_transaction(wallet_name, tx)
+            except Exception:
+                nonce_manager.release(wallet.public_key, nonce)
+                raise
+            try:
+                with metrics.span('mine_phase', phase='send'):
+                    tx_hash = await self.send_signed_mine(raw_tx, wallet, nonce, snapshot.ethc_block,
+                                                          mine_count, total_mine_cost)
+                break
+            except Exception as e:
+                # A stale nonce has been resynced by now; re-sign with the next one and try once more
+                if not is_nonce_error(e) or attempt:
+                    raise
+
+        logger.info("Sent mine from %s with nonce %s: %s", wallet_name, nonce, tx_hash.hex())
+        return tx_hash
+
+    async def send_signed_mine(self, raw_tx, wallet, nonce, ethc_block, mine_count, value):
+        """Broadcast a signed mine transaction and record it as sent
+
+        What happens to the nonce depends on the node's answer:
+        - a transaction with this nonce already in the pool counts as sent, and
+          this one's hash is followed; sending again with a fresh nonce could pay
+          mineCost twice
+        - a stale nonce is resynced and the error raised, for the caller to re-sign
+        - any other rejection releases the nonce and raises
+        - no answer at all (timeout, lost connection) keeps the nonce, as the
+          transaction may have gone out, and tracks the hash before raising
+
+        Returns:
+            Transaction hash
+        """
+        nonce_manager = self.wallet_manager.nonce_manager
+        tx_hash = self.web3.keccak(raw_tx)
+        try:
+            tx_hash = await resolve(self.web3.eth.send_raw_transaction(raw_tx))
+        except Exception as e:
+            if is_already_sent(e):
+                logger.warning("Mine from %s with nonce %s already in the pool, following %s: %s",
+                               wallet.name, nonce, tx_hash.hex(), e)
+            elif is_nonce_error(e):
+                logger.warning("Nonce %s rejected for %s, resyncing: %s", nonce, wallet.name, e)
+                await nonce_manager.resync(wallet.public_key)
+                raise
+            elif is_rejection(e):
+                nonce_manager.release(wallet.public_key, nonce)
+                raise
+            else:
+                logger.warning("No answer sending mine from %s with nonce %s, tracking %s: %s",
+                               wallet.name, nonce, tx_hash.hex(), e)
+                self.record_sent(tx_hash, wallet, ethc_block, mine_count, nonce, value)
+                raise
+        self.record_sent(tx_hash, wallet, ethc_block, mine_count, nonce, value)
+        return tx_hash
+
+    def record_sent(self, tx_hash, wallet, ethc_block, mine_count, nonce, value):
+        """Remember a broadcast mine for the gas model and the tracker"""
+        self._pending_mines[bytes(tx_hash)] = mine_count
+        if len(self._pending_mines) > MAX_PENDING_MINES:
+            self._pending_mines.popitem(last=False)
+        if self.tracker is not None:
+            self.tracker.track(tx_hash, wallet.public_key, wallet.name, ethc_block, mine_count, nonce, value)
+
+    def observe_receipt(self, receipt):
+        """Feed the receipt of a transaction sent by mine() to the gas model"""
+        mine_count = self._pending_mines.pop(bytes(receipt['transactionHash']), None)
+        if mine_count is not None:
+            self.gas_model.observe_receipt(receipt, mine_count)
+
+    async def mine_all(self, mine_count=1, wallet_names=None, urgency=FEE_URGENCY):
+        """Submit a mine from every wallet for the current ETHC block at once
+
+        All wallets share one snapshot and one fee estimate, and their
+        transactions are sent concurrently.
+
+        Returns:
+            Dict of wallet name -> transaction hash, or the exception that wallet hit
+        """
+        wallet_names = wallet_names or self.wallet_manager.get_wallet_names()
+        snapshot = await self.get_snapshot()
+        fees = await self.fee_oracle.estimate(urgency, head=snapshot.eth_block_number)
+        # Every balance and nonce in one round-trip instead of one read per wallet
+        statuses = await self.sweep_wallets(snapshot=snapshot, fees=fees, cached_nonces=True)
+        results = await asyncio.gather(*(
+            self.mine(name, mine_count, snapshot=snapshot, fees=fees,
+                      balance=statuses[name].balance if name in statuses else None)
+            for name in wallet_names
+        ), return_exceptions=True)
+
+        failed = [name for name, result in zip(wallet_names, results) if isinstance(result, Exception)]
+        if failed:
+            logger.warning("Mining failed for %s of %s wallets: %s", len(failed), len(wallet_names), failed)
+        return dict(zip(wallet_names, results))
+
+    async def sweep_wallets(self, snapshot=None, fees=None, urgency=FEE_URGENCY, cached_nonces=False):
+        """WalletManager.sweep priced at the current mine cost, fees and gas model
+
+        Returns:
+            Dict of wallet name -> WalletStatus
+        """
+        if snapshot is None:
+            snapshot = await self.get_snapshot()
+        if fees is None:
+            fees = await self.fee_oracle.estimate(urgency, head=snapshot.eth_block_number)
+        model = self.gas_model
+        if model.intercept is not None:
+            # Same line as GasModel.gas_limit, so a sweep never promises more than mine() will send
+            gas_intercept = math.ceil((model.intercept + model.bound) * (1 + model.margin))
+            gas_slope = math.ceil(model.slope * (1 + model.margin))
+        else:
+            gas_intercept, gas_slope = DEFAULT_GAS_INTERCEPT, DEFAULT_GAS_SLOPE
+        return await self.wallet_manager.sweep(
+            mine_cost=snapshot.mine_cost,
+            max_fee_per_gas=fees.max_fee_per_gas,
+            gas_intercept=gas_intercept,
+            gas_slope=gas_slope,
+            cached_nonces=cached_nonces
+        )
+
     async def estimate_mining_probability(self, block_number):
-        """Estimate probability of winning a block based on current miners"""
+        """Estimate probability of winning a block based on current miners
+
+        Competitor mines still in the mempool are counted when watching it, as they
+        land in whatever block is open by then.
+        """
         try:
-            miner_count = self.contract.functions.minersOfBlockCount(block_number).call()
+            pending = self.mempool.pending_mine_count() if self.mempool is not None else 0
+            if self.competition is not None and self.competition.ethc_block == block_number:
+                # Expected competition at close, so late entrants are priced in; pending
+                # mines are among those late entrants, so they only raise a low forecast
+                snapshot = await self.get_snapshot(ethc_block=block_number)
+                forecast = self.competition.forecast(snapshot.time_since_last)
+                miner_count = max(forecast.expected, forecast.observed + pending)
+            elif await self._indexed(block_number):
+                miner_count = self.index.block_stats(block_number)['total_mine_count'] + pending
+            else:
+                snapshot = await self.get_snapshot(ethc_block=block_number)
+                miner_count = snapshot.miner_count + pending
             if miner_count == 0:
                 return 1.0  # 100% chance if no other miners
             return Decimal(1) / Decimal(miner_count + 1)  # +1 to include our potential mine
@@ -178,72 +472,134 @@ class ETHCMiner:
             raise
 
     async def get_halving_info(self):
-        """Get information about halving schedule"""
+        """Get the current block and the mining reward in effect for it
+
+        The contract ABI has no halving schedule (no lastHalvingBlock, nextHalvingBlock
+        or halvingInterval), so halvings show up as changes in miningReward, read
+        fresh from the snapshot on every call.
+        """
         try:
-            # Always get fresh block number
-            current_block = await self.get_current_block()
-            last_halving = self.contract.functions.lastHalvingBlock().call()
-            next_halving = self.contract.functions.nextHalvingBlock().call()
-            halving_interval = self.contract.functions.halvingInterval().call()
-            
+            snapshot = await self.get_snapshot()
             return {
-                'current_block': current_block,
-                'last_halving_block': last_halving,
-                'next_halving_block': next_halving,
-                'halving_interval': halving_interval
+                'current_block': await self.get_current_block(snapshot),
+                'mining_reward': snapshot.mining_reward
             }
         except Exception as e:
             logger.error(f"Error getting halving info: {e}")
             raise
 
-    def subscribe_to_events(self, event_handler):
-        """Subscribe to mining-related events"""
+    def get_block_watcher(self, **kwargs):
+        """Create a BlockWatcher following this miner's contract"""
+        return BlockWatcher(self.web3, self.contract, **kwargs)
+
+    def get_mempool_watcher(self, **kwargs):
+        """Create a MempoolWatcher for this miner's contract, ignoring our own wallets, and use it"""
+        kwargs.setdefault('exclude', [wallet.public_key for wallet in self.wallet_manager.wallets])
+        self.mempool = MempoolWatcher(self.web3, self.contract_address, **kwargs)
+        return self.mempool
+
+    async def subscribe_to_events(self, event_handler, watcher):
+        """Subscribe to mining-related events
+
+        Feeds every MineEvent and NewBlockEvent the watcher delivers to event_handler.
+        The watcher itself must be running (see BlockWatcher.run).
+
+        Returns:
+            The consumer task; cancel it to unsubscribe
+        """
         try:
-            # Subscribe to Mine events
-            mine_event_filter = self.contract.events.Mine.create_filter(fromBlock='latest')
-            # Subscribe to NewBlock events
-            new_block_filter = self.contract.events.NewBlock.create_filter(fromBlock='latest')
+            queue = watcher.subscribe()
             
-            def handle_event(event):
-                event_handler(event)
+            async def handle_events():
+                try:
+                    while True:
+                        event_handler(await queue.get())
+                finally:
+                    watcher.unsubscribe(queue)
             
-            return {
-                'mine_filter': mine_event_filter,
-                'block_filter': new_block_filter,
-                'handler': handle_event
-            }
+            return asyncio.ensure_future(handle_events())
         except Exception as e:
             logger.error(f"Error subscribing to events: {e}")
             raise
 
-    async def wait_for_next_block(self):
-        """Wait until the next block is available for mining"""
-        max_attempts = 5  # Prevent infinite waiting
-        attempt = 0
-        
-        while attempt < max_attempts:
+    async def wait_for_next_block(self, watcher=None, timeout=120):
+        """Wait until the next block is available for mining
+
+        With a running watcher this returns as soon as a NewETHCBlock log is seen.
+        With a scheduler it sleeps until the head that closes the window is due and
+        then watches the head closely; otherwise it falls back to checking the contract.
+        """
+        if watcher is not None:
+            queue = watcher.subscribe()
+            try:
+                while True:
+                    event = await asyncio.wait_for(queue.get(), timeout=timeout)
+                    if isinstance(event, NewBlockEvent):
+                        logger.info("Block %s started at Ethereum block %s", event.ethc_block, event.eth_block)
+                        return await self.get_current_block()
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No new ETHC block seen in {timeout}s")
+            finally:
+                watcher.unsubscribe(queue)
+
+        if self.scheduler is not None:
+            return await self._wait_for_window_close(timeout)
+
+        deadline = time.monotonic() + timeout
+        while True:
             try:
                 block_info = await self.get_current_block()
                 logger.info(f"Current block: {block_info['current_block']}, Time since last: {block_info['time_since_last']}s")
-                
+
                 if block_info['next_block_available']:
                     logger.info(f"Block {block_info['current_block']} is ready for mining")
                     return block_info
-                
-                time_to_wait = min(60 - block_info['time_since_last'], 10)  # Wait max 10 seconds at a time
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"ETHC block {block_info['current_block']} still open after {timeout}s")
+                # Check at least every 10 seconds; past the interval only a new head can close the window
+                time_to_wait = min(max(BLOCK_INTERVAL - block_info['time_since_last'], 1), 10, remaining)
                 logger.info(f"Waiting {time_to_wait} seconds before next check...")
                 await asyncio.sleep(time_to_wait)
-                attempt += 1
-                
+
             except Exception as e:
                 logger.error(f"Error while waiting for next block: {e}")
                 raise
-        
-        raise TimeoutError("Max attempts reached waiting for next block")
+
+    async def _wait_for_window_close(self, timeout, poll_interval=0.25):
+        deadline = time.monotonic() + timeout
+        snapshot = await self.get_snapshot()
+        start = snapshot.ethc_block
+        window = self.scheduler.window(skip_missed=False)
+        await self.scheduler.sleep_until(min(self.scheduler.next_head_at(window.closes_at), deadline))
+        while snapshot.ethc_block == start and not snapshot.blocks_ready:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"ETHC block {start} still open after {timeout}s")
+            # A new head is cheap to detect; the snapshot is only re-read once there is one
+            if await resolve(self.web3.eth.block_number) > snapshot.eth_block_number:
+                snapshot = await self.get_snapshot()
+            else:
+                await asyncio.sleep(poll_interval)
+        logger.info("ETHC block %s closed at Ethereum block %s", start, snapshot.eth_block_number)
+        return await self.get_current_block(snapshot)
+
+    async def wait_for_send_time(self, lead_time=None):
+        """Sleep until the scheduler's send time for the open ETHC block
+
+        Returns:
+            The BlockWindow to mine in
+        """
+        if self.scheduler is None:
+            raise ValueError("wait_for_send_time needs a BlockScheduler on the miner")
+        await self.get_snapshot()
+        return await self.scheduler.wait(lead_time)
 
     async def has_mined_block(self, wallet_address, block_number):
         """Check if the wallet has already mined this block"""
         try:
+            if await self._indexed(block_number):
+                return self.index.has_mined(block_number, self.web3.to_checksum_address(wallet_address))
             miners = await self.get_block_miners(block_number)
             return wallet_address in miners['miners']
         except Exception as e:
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from collections import OrderedDict, namedtuple
+from statistics import median
+from util.alchemy_connector import resolve
+
+logger = logging.getLogger(__name__)
+
+# EIP-1559: base fee moves at most 1/8 per block toward a 50% full target
+BASE_FEE_MAX_CHANGE_DENOMINATOR = 8
+ELASTICITY_MULTIPLIER = 2
+
+FeeProfile = namedtuple('FeeProfile', ['percentile', 'headroom_blocks'])
+FeeEstimate = namedtuple('FeeEstimate', ['base_fee', 'max_fee_per_gas', 'max_priority_fee_per_gas'])
+
+# percentile: priority fee percentile paid over recent blocks
+# headroom_blocks: consecutive full blocks the max fee still covers
+URGENCY_PROFILES = {
+    'cheap': FeeProfile(percentile=10, headroom_blocks=0),
+    'normal': FeeProfile(percentile=50, headroom_blocks=2),
+    # Must land before the ETHC block closes, about 5 Ethereum blocks
+    'urgent': FeeProfile(percentile=90, headroom_blocks=5),
+}
+
+def next_base_fee(base_fee, gas_used_ratio):
+    """Base fee of the following block, from a block's base fee and gasUsed / gasLimit"""
+    # gas_used_ratio * ELASTICITY_MULTIPLIER is gasUsed / gasTarget
+    delta = base_fee * (gas_used_ratio * ELASTICITY_MULTIPLIER - 1) / BASE_FEE_MAX_CHANGE_DENOMINATOR
+    if delta > 0:
+        delta = max(int(delta), 1)
+    return max(int(base_fee + delta), 0)
+
+def max_base_fee(base_fee, blocks):
+    """Highest base fee reachable after `blocks` consecutive full blocks"""
+    for _ in range(blocks):
+        base_fee += base_fee // BASE_FEE_MAX_CHANGE_DENOMINATOR
+    return base_fee
+
+class FeeOracle:
+    """EIP-1559 fee estimates from a cached, incrementally updated eth_feeHistory window
+
+    Base fee, gas used ratio and priority fee percentiles are kept per Ethereum
+    block for the last `history_blocks` blocks. update() only requests blocks newer
+    than the cache, and nothing at all when told the head has not moved, so every
+    mine in the same Ethereum block shares one eth_feeHistory call.
+
+    The next base fee is predicted with the EIP-1559 update rule instead of a flat
+    2x buffer; urgency profiles add headroom for a few full blocks on top.
+    """
+
+    def __init__(self, web3, history_blocks=20, min_priority_fee=10 ** 8):
+        self.web3 = web3
+        self.history_blocks = history_blocks
+        self.min_priority_fee = min_priority_fee
+        self.percentiles = sorted({profile.percentile for profile in URGENCY_PROFILES.values()})
+
+        self._blocks = OrderedDict()  # eth block -> (base fee, gas used ratio, {percentile: reward})
+        self.last_block = None
+        self._lock = asyncio.Lock()
+
+    async def update(self, head=None):
+        """Fetch fee history for blocks after the cached window, up to head"""
+        async with self._lock:
+            if head is None:
+                head = await resolve(self.web3.eth.block_number)
+            if self.last_block is not None and head <= self.last_block:
+                return
+            count = self.history_blocks
+            if self.last_block is not None:
+                count = min(head - self.last_block, count)
+
+            history = await resolve(self.web3.eth.fee_history(count, head, self.percentiles))
+            oldest = history['oldestBlock']
+            for offset, ratio in enumerate(history['gasUsedRatio']):
+                rewards = history['reward'][offset] if history.get('reward') else [0] * len(self.percentiles)
+                self._blocks[oldest + offset] = (
+                    history['baseFeePerGas'][offset],
+                    ratio,
+                    dict(zip(self.percentiles, rewards))
+                )
+            while len(self._blocks) > self.history_blocks:
+                self._blocks.popitem(last=False)
+            self.last_block = head
+            logger.debug("Fee history updated to block %s (%s new blocks)", head, count)
+
+    def predict_base_fee(self):
+        """Predicted base fee of the block after the newest cached one"""
+        if not self._blocks:
+            raise ValueError("No fee history, call update() first")
+        base_fee, ratio, _ = next(reversed(self._blocks.values()))
+        return next_base_fee(base_fee, ratio)
+
+    def block_base_fee(self, block):
+        """baseFeePerGas of a block in the cached window, or None"""
+        entry = self._blocks.get(block)
+        return entry[0] if entry is not None else None
+
+    def priority_fee(self, percentile):
+        """Median over the cached window of each block's priority fee at percentile"""
+        rewards = [block_rewards[percentile] for _, _, block_rewards in self._blocks.values()]
+        if not rewards:
+            raise ValueError("No fee history, call update() first")
+        return max(int(median(rewards)), self.min_priority_fee)
+
+    async def estimate(self, urgency='normal', head=None):
+        """Fee fields for a transaction that should land with the given urgency
+
+        Args:
+            urgency: Name of a URGENCY_PROFILES entry
+            head: Current Ethereum block if already known, saves a block number read
+
+        Returns:
+            FeeEstimate
+        """
+        try:
+            profile = URGENCY_PROFILES[urgency]
+        except KeyError:
+            raise ValueError(f"Unknown fee urgency: {urgency}")
+
+        await self.update(head)
+        base_fee = self.predict_base_fee()
+        priority_fee = self.priority_fee(profile.percentile)
+        estimate = FeeEstimate(
+            base_fee=base_fee,
+            max_fee_per_gas=max_base_fee(base_fee, profile.headroom_blocks) + priority_fee,
+            max_priority_fee_per_gas=priority_fee
+        )
+        logger.debug("Fee estimate (%s): %s", urgency, estimate)
+        return estimate
@@ -0,0 +1,94 @@
+import logging
+import math
+import time
+from util.checkpoint import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+# Rough mine(mineCount) gas usage, used until the model has receipts to fit
+DEFAULT_GAS_INTERCEPT = 50_000
+DEFAULT_GAS_SLOPE = 25_000
+
+class GasModel:
+    """Linear model of mine(mineCount) gas usage, learned from receipts
+
+    gasUsed is fit as intercept + slope * mineCount by least squares over the most
+    recent successful receipts. A gas limit is served locally as the prediction
+    plus `sigmas` residual standard deviations (never less than the largest
+    residual seen) and a small relative margin.
+
+    gas_limit() returns None when the model cannot be trusted: too few samples,
+    no sample for `max_age` seconds, or a mine count outside the range observed.
+    Callers then fall back to estimate_gas. Samples are saved to a checkpoint so
+    the model survives restarts.
+    """
+
+    def __init__(self, checkpoint_name='gas_model', data_dir=None, window=200, min_samples=5,
+                 max_age=6 * 3600, sigmas=3, margin=0.02):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_age = max_age
+        self.sigmas = sigmas
+        self.margin = margin
+
+        self.checkpoint = Checkpoint(checkpoint_name, data_dir) if checkpoint_name else None
+        state = self.checkpoint.load({}) if self.checkpoint else {}
+        self.samples = [tuple(sample) for sample in state.get('samples', [])]  # (mine count, gas used, time)
+        self.intercept = None
+        self.slope = None
+        self.bound = None
+        self._fit()
+
+    def observe(self, mine_count, gas_used, observed_at=None):
+        """Add one successful mine(mine_count) receipt and refit"""
+        self.samples.append((mine_count, gas_used, observed_at or time.time()))
+        self.samples = self.samples[-self.window:]
+        self._fit()
+        if self.checkpoint:
+            self.checkpoint.save({'samples': self.samples})
+
+    def observe_receipt(self, receipt, mine_count):
+        if receipt['status'] != 1:
+            # Reverted mines stop early and say nothing about a full run
+            return
+        self.observe(mine_count, receipt['gasUsed'])
+
+    def is_stale(self):
+        if len(self.samples) < self.min_samples or self.intercept is None:
+            return True
+        return time.time() - self.samples[-1][2] > self.max_age
+
+    def predict(self, mine_count):
+        return self.intercept + self.slope * mine_count
+
+    def gas_limit(self, mine_count):
+        """Gas limit for mine(mine_count), or None if estimate_gas should be used instead"""
+        if self.is_stale():
+            return None
+        counts = [sample[0] for sample in self.samples]
+        if not min(counts) <= mine_count <= max(counts):
+            return None
+        return math.ceil((self.predict(mine_count) + self.bound) * (1 + self.margin))
+
+    def _fit(self):
+        if len(self.samples) < self.min_samples:
+            return
+        counts = [sample[0] for sample in self.samples]
+        gas = [sample[1] for sample in self.samples]
+        n = len(counts)
+        mean_count = sum(counts) / n
+        mean_gas = sum(gas) / n
+        variance = sum((count - mean_count) ** 2 for count in counts)
+        if variance:
+            covariance = sum((count - mean_count) * (used - mean_gas) for count, used in zip(counts, gas))
+            self.slope = covariance / variance
+        else:
+            # Only one mine count seen; it is the only one gas_limit will serve
+            self.slope = 0.0
+        self.intercept = mean_gas - self.slope * mean_count
+
+        residuals = [used - self.predict(count) for count, used in zip(counts, gas)]
+        degrees = max(n - 2, 1)
+        sigma = math.sqrt(sum(residual ** 2 for residual in residuals) / degrees)
+        self.bound = max(self.sigmas * sigma, max(residuals))
+        logger.debug(f"Gas model: {self.intercept:.0f} + {self.slope:.0f} * mineCount, bound {self.bound:.0f}")
@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import os
+import numpy as np
+from eth_utils import to_checksum_address
+from config.constants import DATA_DIR, ETHC_DEPLOY_BLOCK, LOG_CHUNK_SIZE
+from util.alchemy_connector import resolve
+from util.checkpoint import Checkpoint
+from logic.log_decoder import LogDecoder
+
+logger = logging.getLogger(__name__)
+
+NO_WINNER = np.iinfo(np.uint32).max  # winner id of a block not drawn or not read yet
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+# Column name -> dtype, one append-only file per column
+MINE_COLUMNS = {
+    'ethc_block': np.uint64,
+    'miner': np.uint32,  # id into the address dictionary
+    'mine_count': np.uint64,
+    'eth_block': np.uint64,
+    'log_index': np.uint32,
+}
+BLOCK_COLUMNS = {
+    'ethc_block': np.uint64,
+    'eth_block': np.uint64,  # Ethereum block of the NewETHCBlock log that closed it
+    'winner': np.uint32,
+    'mine_cost': np.uint64,  # wei
+    # miningReward in ETHC base units overflows uint64 (50 ETHC is 5e19), so it is kept exact as two words
+    'mining_reward_high': np.uint64,
+    'mining_reward_low': np.uint64,
+}
+
+def join_words(high, low):
+    """Python ints from high and low uint64 word columns, as an object array"""
+    return (np.asarray(high).astype(object) << WORD_BITS) | np.asarray(low).astype(object)
+
+class ColumnTable:
+    """Fixed-width columns stored as flat binary files and read back as memory maps"""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        os.makedirs(path, exist_ok=True)
+        self._maps = {}  # column -> (length, memmap)
+
+    def __len__(self):
+        name, dtype = next(iter(self.columns.items()))
+        if not os.path.exists(self._file(name)):
+            return 0
+        return os.path.getsize(self._file(name)) // np.dtype(dtype).itemsize
+
+    def truncate(self, length):
+        """Drop rows past length, left behind by an append that was never checkpointed"""
+        for name, dtype in self.columns.items():
+            if os.path.exists(self._file(name)):
+                with open(self._file(name), 'r+b') as f:
+                    f.truncate(length * np.dtype(dtype).itemsize)
+        self._maps.clear()
+
+    def append(self, arrays):
+        lengths = {len(arrays[name]) for name in self.columns}
+        if len(lengths) != 1:
+            raise ValueError(f"Columns of {self.path} must be appended with equal lengths")
+        if not lengths.pop():
+            return
+        for name, dtype in self.columns.items():
+            with open(self._file(name), 'ab') as f:
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        self._maps.clear()
+
+    def column(self, name, writable=False):
+        """Memory map of a whole column; writable maps update the file in place"""
+        length = len(self)
+        if length == 0:
+            return np.empty(0, dtype=self.columns[name])
+        cached = self._maps.get((name, writable))
+        if cached is None or cached[0] != length:
+            mode = 'r+' if writable else 'r'
+            cached = (length, np.memmap(self._file(name), dtype=self.columns[name], mode=mode, shape=(length,)))
+            self._maps[(name, writable)] = cached
+        return cached[1]
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+class HistoryArchive:
+    """Append-only columnar archive of ETHC mining history under DATA_DIR/history
+
+    Mine logs, closed blocks (from NewETHCBlock) and their winners and prices are
+    stored as one memory-mapped NumPy column per field. Miner addresses are
+    dictionary encoded as uint32 ids. Mines are kept in ETHC block order, so a
+    range query is two binary searches and a zero-copy slice, and per-miner or
+    per-block aggregates are single bincount passes that never load more than
+    the columns they touch.
+
+    sync() follows confirmed Mine and NewETHCBlock logs with the block watcher's
+    reader; fill_blocks() reads winners, mineCost and miningReward for closed
+    blocks through the miner's Multicall.
+    """
+
+    def __init__(self, path=None, confirmations=12, chunk_size=LOG_CHUNK_SIZE):
+        self.path = path or os.path.join(DATA_DIR, 'history')
+        self.confirmations = confirmations
+        self.chunk_size = chunk_size
+        self.mines_table = ColumnTable(os.path.join(self.path, 'mines'), MINE_COLUMNS)
+        self.blocks_table = ColumnTable(os.path.join(self.path, 'blocks'), BLOCK_COLUMNS)
+        self.decoder = LogDecoder()
+
+        self.checkpoint = Checkpoint('archive', self.path)
+        state = self.checkpoint.load({})
+        self.last_block = state.get('last_block')  # last Ethereum block archived
+        self.addresses = state.get('addresses', [])
+        self._ids = {address: index for index, address in enumerate(self.addresses)}
+        # Rows are only committed once the checkpoint records them
+        self.mines_table.truncate(state.get('mine_rows', 0))
+        self.blocks_table.truncate(state.get('block_rows', 0))
+
+    # Ingestion
+
+    async def sync(self, miner, from_block=None, to_block=None):
+        """Archive confirmed logs after the last archived Ethereum block, up to to_block or the confirmed head
+
+        An empty archive starts at from_block, by default ETHC_DEPLOY_BLOCK.
+
+        Returns:
+            Number of logs archived
+        """
+        try:
+            reader = miner.get_block_watcher(checkpoint_name=None)
+            if to_block is None:
+                to_block = await resolve(miner.web3.eth.block_number) - self.confirmations
+            if self.last_block is not None:
+                from_block = self.last_block + 1
+            elif from_block is None:
+                from_block = ETHC_DEPLOY_BLOCK
+            archived = 0
+            while from_block <= to_block:
+                end = min(from_block + self.chunk_size - 1, to_block)
+                archived += self.append_logs(await reader.get_logs(from_block, end), end)
+                from_block = end + 1
+            return archived
+
+        except Exception as e:
+            logger.error(f"Error syncing history archive: {e}")
+            raise
+
+    def append_logs(self, logs, last_block):
+        """Archive decoded logs of Ethereum blocks up to last_block, in chain order"""
+        mines, new_blocks = self.decoder.decode_batch(logs)
+        if len(mines):
+            stored = self.mines_table.column('ethc_block')
+            if len(stored) and mines['ethc_block'][0] < stored[-1]:
+                raise ValueError(f"Mines for ETHC block {mines['ethc_block'][0]} arrive after block {stored[-1]}")
+            self.mines_table.append({
+                'ethc_block': mines['ethc_block'],
+                'miner': self._encode(mines['miner']),
+                'mine_count': mines['mine_count'],
+                'eth_block': mines['eth_block'],
+                'log_index': mines['log_index'],
+            })
+        if len(new_blocks):
+            # NewETHCBlock(n) closes block n - 1
+            count = len(new_blocks)
+            self.blocks_table.append({
+                'ethc_block': new_blocks['ethc_block'] - 1,
+                'eth_block': new_blocks['eth_block'],
+                'winner': np.full(count, NO_WINNER, dtype=np.uint32),
+                'mine_cost': np.zeros(count, dtype=np.uint64),
+                'mining_reward_high': np.zeros(count, dtype=np.uint64),
+                'mining_reward_low': np.zeros(count, dtype=np.uint64),
+            })
+        self.last_block = last_block
+        self._save()
+        return len(mines) + len(new_blocks)
+
+    async def fill_blocks(self, miner, batch_size=200, concurrency=8):
+        """Read winner, mineCost and miningReward for closed blocks that have no winner yet
+
+        Winners come from one selectedMinerOfBlock aggregate per batch. Prices are
+        read pinned to the Ethereum block each ETHC block closed in.
+
+        Returns:
+            Number of blocks whose winner was filled in
+        """
+        try:
+            pending = np.flatnonzero(self.blocks_table.column('winner') == NO_WINNER)
+            if not len(pending):
+                return 0
+            blocks = self.blocks_table.column('ethc_block')
+            eth_blocks = self.blocks_table.column('eth_block')
+            functions = miner.contract.functions
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def prices(eth_block):
+                async with semaphore:
+                    return await miner.multicall.aggregate(
+                        [functions.mineCost(), functions.miningReward()], block_identifier=int(eth_block)
+                    )
+
+            filled = 0
+            for start in range(0, len(pending), batch_size):
+                rows = pending[start:start + batch_size]
+                winners, *costs = await asyncio.gather(
+                    miner.multicall.aggregate([functions.selectedMinerOfBlock(int(blocks[row])) for row in rows]),
+                    *(prices(eth_blocks[row]) for row in rows)
+                )
+                winner_column = self.blocks_table.column('winner', writable=True)
+                cost_column = self.blocks_table.column('mine_cost', writable=True)
+                high_column = self.blocks_table.column('mining_reward_high', writable=True)
+                low_column = self.blocks_table.column('mining_reward_low', writable=True)
+                for row, winner, (mine_cost, mining_reward) in zip(rows, winners, costs):
+                    if int(winner, 16) == 0:
+                        continue  # not drawn yet
+                    winner_column[row] = self.miner_id(winner, create=True)
+                    cost_column[row] = mine_cost
+                    high_column[row] = mining_reward >> WORD_BITS
+                    low_column[row] = mining_reward & WORD_MASK
+                    filled += 1
+                for column in (winner_column, cost_column, high_column, low_column):
+                    column.flush()
+            self._save()
+            logger.info(f"Filled winners for {filled} of {len(pending)} archived blocks")
+            return filled
+
+        except Exception as e:
+            logger.error(f"Error filling archived blocks: {e}")
+            raise
+
+    # Queries
+
+    def mines(self, start=None, stop=None):
+        """Mine columns for ETHC blocks in [start, stop), as zero-copy memmap slices"""
+        blocks = self.mines_table.column('ethc_block')
+        low = 0 if start is None else np.searchsorted(blocks, start, 'left')
+        high = len(blocks) if stop is None else np.searchsorted(blocks, stop, 'left')
+        return {name: self.mines_table.column(name)[low:high] for name in MINE_COLUMNS}
+
+    def blocks(self, start=None, stop=None):
+        """Closed block columns for ETHC blocks in [start, stop)
+
+        mining_reward is joined from its two words into exact Python ints; the other
+        columns are zero-copy memmap slices.
+        """
+        blocks = self.blocks_table.column('ethc_block')
+        low = 0 if start is None else np.searchsorted(blocks, start, 'left')
+        high = len(blocks) if stop is None else np.searchsorted(blocks, stop, 'left')
+        columns = {name: self.blocks_table.column(name)[low:high] for name in BLOCK_COLUMNS}
+        columns['mining_reward'] = join_words(columns.pop('mining_reward_high'), columns.pop('mining_reward_low'))
+        return columns
+
+    def block_totals(self, start, stop, exclude=()):
+        """Total mines per ETHC block in [start, stop), indexed by block - start
+
+        exclude: addresses whose mines are left out, e.g. our own wallets to get
+        the competition each block faced
+        """
+        mines = self.mines(start, stop)
+        weights = mines['mine_count'].astype(np.float64)
+        excluded = [self._ids[address] for address in map(to_checksum_address, exclude) if address in self._ids]
+        if excluded:
+            weights = np.where(np.isin(mines['miner'], excluded), 0.0, weights)
+        offsets = (mines['ethc_block'] - start).astype(np.intp)
+        return np.bincount(offsets, weights=weights, minlength=stop - start).astype(np.uint64)
+
+    def miner_totals(self, start=None, stop=None):
+        """Per-miner mines, blocks entered and wins, as arrays indexed by miner id"""
+        mines = self.mines(start, stop)
+        size = len(self.addresses)
+        totals = np.bincount(mines['miner'], weights=mines['mine_count'], minlength=size).astype(np.uint64)
+        # One entry per (block, miner) pair counts a block entered
+        pairs = np.unique(mines['ethc_block'] * np.uint64(size or 1) + mines['miner'])
+        entered = np.bincount((pairs % np.uint64(size or 1)).astype(np.intp), minlength=size)
+        winners = self.blocks(start, stop)['winner']
+        wins = np.bincount(winners[winners != NO_WINNER], minlength=size)
+        return {'mines': totals, 'blocks': entered, 'wins': wins}
+
+    def miner_id(self, address, create=False):
+        address = to_checksum_address(address)
+        index = self._ids.get(address)
+        if index is None:
+            if not create:
+                raise KeyError(f"Miner {address} is not in the archive")
+            index = self._ids[address] = len(self.addresses)
+            self.addresses.append(address)
+        return index
+
+    def address(self, miner_id):
+        return self.addresses[miner_id]
+
+    def _encode(self, raw_addresses):
+        """Dictionary-encode 20-byte addresses, adding new ones"""
+        unique, inverse = np.unique(raw_addresses, return_inverse=True)
+        ids = np.array([self.miner_id(self.decoder.address(bytes(raw)), create=True) for raw in unique],
+                       dtype=np.uint32)
+        return ids[inverse]
+
+    def _save(self):
+        self.checkpoint.save({
+            'last_block': self.last_block,
+            'addresses': self.addresses,
+            'mine_rows': len(self.mines_table),
+            'block_rows': len(self.blocks_table),
+        })
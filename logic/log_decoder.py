@@ -0,0 +1,111 @@
+import logging
+from collections import namedtuple
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from util.abi_registry import compiled_abi
+
+logger = logging.getLogger(__name__)
+
+MineEvent = namedtuple('MineEvent', ['ethc_block', 'miner', 'mine_count', 'eth_block', 'tx_hash', 'log_index'])
+NewBlockEvent = namedtuple('NewBlockEvent', ['ethc_block', 'eth_block', 'tx_hash', 'log_index'])
+
+# Layouts the fast path is written for; anything else must go through web3
+MINE_LAYOUT = (('uint256', 'address'), ('uint256',))
+NEW_BLOCK_LAYOUT = (('uint256',), ())
+
+# Columns of decode_batch(); miner is the raw 20-byte address
+MINE_FIELDS = [('ethc_block', '<u8'), ('miner', 'S20'), ('mine_count', '<u8'),
+               ('eth_block', '<u8'), ('log_index', '<u4'), ('tx_hash', 'S32')]
+NEW_BLOCK_FIELDS = [('ethc_block', '<u8'), ('eth_block', '<u8'), ('log_index', '<u4'), ('tx_hash', 'S32')]
+
+def _raw(value):
+    """Bytes of a log field, whether it is still a hex string or already formatted"""
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else value
+
+def _int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+class LogDecoder:
+    """Decode Mine and NewETHCBlock logs straight from their raw bytes
+
+    Logs are matched on topic0 and every field is read at its fixed offset:
+    blockNumber and mineCount as big-endian uint256 words, miner from the last 20
+    bytes of its topic. There is no ABI type walk and no AttributeDict per log.
+    Accepts raw eth_getLogs JSON (hex strings) and web3-formatted logs alike.
+
+    decode() returns the same MineEvent / NewBlockEvent values as web3's
+    process_log. decode_batch() returns NumPy structured arrays for bulk work.
+    """
+
+    def __init__(self, abi_name='ethc_contract'):
+        abi = compiled_abi(abi_name)
+        mine, new_block = abi.event('Mine'), abi.event('NewETHCBlock')
+        if (mine.indexed, mine.data) != MINE_LAYOUT or (new_block.indexed, new_block.data) != NEW_BLOCK_LAYOUT:
+            raise ValueError(f"ABI {abi_name} events do not match the fast decoder's layout")
+        self.mine_topic = mine.topic
+        self.new_block_topic = new_block.topic
+        self._addresses = {}  # raw 20 bytes -> checksum address, miners repeat a lot
+
+    def decode(self, log):
+        """MineEvent or NewBlockEvent for one log"""
+        topics = log['topics']
+        topic = _raw(topics[0])
+        if topic == self.mine_topic:
+            return MineEvent(
+                ethc_block=int.from_bytes(_raw(topics[1]), 'big'),
+                miner=self.address(_raw(topics[2])[12:]),
+                mine_count=int.from_bytes(_raw(log['data'])[:32], 'big'),
+                eth_block=_int(log['blockNumber']),
+                tx_hash=HexBytes(_raw(log['transactionHash'])),
+                log_index=_int(log['logIndex'])
+            )
+        if topic == self.new_block_topic:
+            return NewBlockEvent(
+                ethc_block=int.from_bytes(_raw(topics[1]), 'big'),
+                eth_block=_int(log['blockNumber']),
+                tx_hash=HexBytes(_raw(log['transactionHash'])),
+                log_index=_int(log['logIndex'])
+            )
+        raise ValueError(f"Unexpected log topic {bytes(topic).hex()}")
+
+    def decode_many(self, logs):
+        return [self.decode(log) for log in logs]
+
+    def decode_batch(self, logs):
+        """Decode logs into (mines, new_blocks) NumPy structured arrays, in log order
+
+        Fields are listed in MINE_FIELDS and NEW_BLOCK_FIELDS.
+        """
+        # NumPy is only needed for batches, keep it out of the watcher's import
+        import numpy as np
+
+        mines, new_blocks = [], []
+        for log in logs:
+            topics = log['topics']
+            topic = _raw(topics[0])
+            if topic == self.mine_topic:
+                mines.append((
+                    int.from_bytes(_raw(topics[1]), 'big'),
+                    bytes(_raw(topics[2])[12:]),
+                    int.from_bytes(_raw(log['data'])[:32], 'big'),
+                    _int(log['blockNumber']),
+                    _int(log['logIndex']),
+                    bytes(_raw(log['transactionHash']))
+                ))
+            elif topic == self.new_block_topic:
+                new_blocks.append((
+                    int.from_bytes(_raw(topics[1]), 'big'),
+                    _int(log['blockNumber']),
+                    _int(log['logIndex']),
+                    bytes(_raw(log['transactionHash']))
+                ))
+            else:
+                raise ValueError(f"Unexpected log topic {bytes(topic).hex()}")
+        return np.array(mines, dtype=MINE_FIELDS), np.array(new_blocks, dtype=NEW_BLOCK_FIELDS)
+
+    def address(self, raw):
+        """Checksum address for 20 raw bytes"""
+        address = self._addresses.get(raw)
+        if address is None:
+            address = self._addresses[bytes(raw)] = to_checksum_address(raw)
+        return address
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import time
+from collections import namedtuple
+import websockets
+from eth_utils import to_checksum_address
+from config.constants import ALCHEMY_WS_URL, MEMPOOL_MAX_AGE, MEMPOOL_POLL_INTERVAL, MEMPOOL_SOURCE
+from util.abi_registry import compiled_abi
+from logic.log_decoder import MineEvent
+
+logger = logging.getLogger(__name__)
+
+# A competitor's mine() waiting to be included; seen_at is time.monotonic() when last seen pending
+PendingMine = namedtuple('PendingMine', ['tx_hash', 'sender', 'nonce', 'mine_count', 'value',
+                                         'max_fee_per_gas', 'seen_at'])
+
+SOURCES = ('pending', 'txpool')
+
+def _int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+def _raw(value):
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+
+class MempoolWatcher:
+    """Competitor mine() transactions still in the mempool, about to land in the open ETHC block
+
+    Pending transactions are polled every poll_interval seconds from one of
+    two views of the node's mempool:
+      - 'pending': eth_getBlockByNumber('pending', true), the block the node would build next
+      - 'txpool': txpool_content (geth, erigon, reth), every executable transaction it holds
+    Each poll is a complete view, so a mine missing from it has been included
+    or dropped and is evicted. When ws_url is set the watcher subscribes to
+    Alchemy's alchemy_pendingTransactions, filtered to the contract, instead.
+
+    Only transactions to the contract calling mine() are kept, with mineCount
+    decoded from the calldata and value from the transaction; our own wallets
+    are excluded. Entries are keyed by (sender, nonce), so a fee bump replaces
+    the transaction it supersedes instead of counting twice. Mine events from
+    the block watcher evict entries as soon as they land, and anything not seen
+    for max_age seconds is dropped, which is all that evicts pushed entries.
+    """
+
+    def __init__(self, web3, contract_address, exclude=(), source=MEMPOOL_SOURCE,
+                 poll_interval=MEMPOOL_POLL_INTERVAL, max_age=MEMPOOL_MAX_AGE, ws_url=ALCHEMY_WS_URL):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown mempool source {source}, expected one of {SOURCES}")
+        self.web3 = web3
+        self.contract_address = to_checksum_address(contract_address)
+        self.exclude = {to_checksum_address(address) for address in exclude}
+        self.source = source
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.ws_url = ws_url
+        self.mine_selector = compiled_abi('ethc_contract').selector('mine')
+
+        self._pending = {}  # (sender, nonce) -> PendingMine
+        self._keys = {}  # tx hash -> (sender, nonce)
+        self._running = False
+        self._ws = None
+
+    async def run(self):
+        """Follow the mempool until stop() is called"""
+        logger.info("Mempool watcher started on %s", 'websocket' if self.ws_url else self.source)
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    if self.ws_url:
+                        await self._receive()
+                    else:
+                        await self.poll()
+                        await asyncio.sleep(self.poll_interval)
+                except asyncio.CancelledError:
+                    raise
+                except (websockets.ConnectionClosed, OSError) as e:
+                    logger.warning(f"Pending transaction subscription lost, reconnecting: {e}")
+                    await self._close_ws()
+                    await asyncio.sleep(self.poll_interval)
+                except Exception as e:
+                    logger.error(f"Error in mempool watcher: {e}")
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            await self._close_ws()
+            logger.info("Mempool watcher stopped")
+
+    def stop(self):
+        self._running = False
+
+    async def poll(self):
+        """Replace the tracked mines with those in one full view of the mempool
+
+        Returns:
+            Pending competitor mine count
+        """
+        if self.source == 'txpool':
+            content = await self._request('txpool_content', [])
+            transactions = [tx for by_nonce in (content['pending'] or {}).values() for tx in by_nonce.values()]
+        else:
+            block = await self._request('eth_getBlockByNumber', ['pending', True])
+            transactions = block['transactions'] if block else []
+
+        now = time.monotonic()
+        seen = set()
+        for transaction in transactions:
+            pending = self.add(transaction, now)
+            if pending is not None:
+                seen.add((pending.sender, pending.nonce))
+        for key in [key for key in self._pending if key not in seen]:
+            self._evict(key)
+        mine_count = self.pending_mine_count(now)
+        logger.debug("%s pending competitor mines in %s transactions", mine_count, len(transactions))
+        return mine_count
+
+    def add(self, transaction, now=None):
+        """Track one JSON-RPC transaction object if it is a competitor's mine()
+
+        Returns:
+            The PendingMine, or None when the transaction is not one
+        """
+        to = transaction.get('to')
+        data = _raw(transaction.get('input') or transaction.get('data') or '0x')
+        if not to or len(data) < 36 or data[:4] != self.mine_selector:
+            return None
+        if to_checksum_address(to) != self.contract_address:
+            return None
+        sender = to_checksum_address(transaction['from'])
+        if sender in self.exclude:
+            return None
+
+        pending = PendingMine(
+            tx_hash=_raw(transaction['hash']),
+            sender=sender,
+            nonce=_int(transaction['nonce']),
+            mine_count=int.from_bytes(data[4:36], 'big'),
+            value=_int(transaction['value']),
+            max_fee_per_gas=_int(transaction.get('maxFeePerGas') or transaction.get('gasPrice') or 0),
+            seen_at=time.monotonic() if now is None else now
+        )
+        key = (sender, pending.nonce)
+        replaced = self._pending.get(key)
+        if replaced is not None and replaced.tx_hash != pending.tx_hash:
+            logger.debug("Mine from %s with nonce %s replaced", sender, pending.nonce)
+            del self._keys[replaced.tx_hash]
+        self._pending[key] = pending
+        self._keys[pending.tx_hash] = key
+        return pending
+
+    def observe(self, event):
+        """Evict the pending mine a MineEvent from the block watcher confirms"""
+        if isinstance(event, MineEvent):
+            key = self._keys.get(bytes(event.tx_hash))
+            if key is not None:
+                self._evict(key)
+
+    def expire(self, now=None):
+        """Drop mines not seen pending for max_age seconds"""
+        now = time.monotonic() if now is None else now
+        for key in [key for key, pending in self._pending.items() if now - pending.seen_at > self.max_age]:
+            self._evict(key)
+
+    def pending(self, now=None):
+        """PendingMine entries still live, oldest first"""
+        self.expire(now)
+        return sorted(self._pending.values(), key=lambda pending: pending.seen_at)
+
+    def pending_mine_count(self, now=None):
+        """Competing mines waiting in the mempool"""
+        self.expire(now)
+        return sum(pending.mine_count for pending in self._pending.values())
+
+    def stats(self):
+        pending = self.pending()
+        return {
+            'transactions': len(pending),
+            'senders': len({entry.sender for entry in pending}),
+            'mine_count': sum(entry.mine_count for entry in pending),
+            'value': sum(entry.value for entry in pending),
+        }
+
+    def _evict(self, key):
+        pending = self._pending.pop(key)
+        self._keys.pop(pending.tx_hash, None)
+
+    async def _request(self, method, params):
+        manager = self.web3.manager
+        if getattr(self.web3.provider, 'is_async', False):
+            return await manager.coro_request(method, params)
+        return manager.request_blocking(method, params)
+
+    async def _receive(self):
+        """Track the next pushed pending transaction, subscribing first if needed"""
+        if self._ws is None:
+            self._ws = await websockets.connect(self.ws_url)
+            await self._ws.send(json.dumps({
+                'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe',
+                'params': ['alchemy_pendingTransactions', {'toAddress': [self.contract_address], 'hashesOnly': False}]
+            }))
+            await self._ws.recv()  # subscription id
+            logger.info("Subscribed to pending transactions over websocket")
+        try:
+            message = json.loads(await asyncio.wait_for(self._ws.recv(), timeout=self.max_age))
+        except asyncio.TimeoutError:
+            return
+        transaction = message.get('params', {}).get('result')
+        if isinstance(transaction, dict):
+            self.add(transaction)
+
+    async def _close_ws(self):
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from config.constants import LOG_CHUNK_SIZE
+from database.connection import get_session_factory
+from database.db_models import BackfillRange, EthcBlock, MinerParticipation, SyncCursor
+from logic.block_watcher import MineEvent, NewBlockEvent
+from util.alchemy_connector import resolve
+
+logger = logging.getLogger(__name__)
+
+class BlockParticipation:
+    """Mine counts for one ETHC block, with the running total kept alongside"""
+    __slots__ = ('counts', 'total')
+
+    def __init__(self, counts=None):
+        self.counts = counts or {}
+        self.total = sum(self.counts.values())
+
+    def add(self, miner, mine_count):
+        self.counts[miner] = self.counts.get(miner, 0) + mine_count
+        self.total += mine_count
+
+class MinerIndex:
+    """Local index of (ETHC block, miner) -> total mine count, built from Mine logs
+
+    Logs at least `confirmations` Ethereum blocks deep are committed to the database
+    in the same transaction as the cursor. Logs in the newer, reorg-prone window are
+    kept in a provisional overlay that is re-read and replaced on every sync, so a
+    reorg simply drops them.
+
+    Lookups are dict operations on cached BlockParticipation entries; blocks that are
+    not cached are loaded from the database on first use. From async code, await
+    load() first so that read happens in a worker thread, as sync() does with its
+    writes.
+
+    The index counts as warm while its last sync reached the current Ethereum head,
+    give or take `max_lag` blocks, so no log the node already has is missing.
+    """
+
+    def __init__(self, miner, session_factory=None, confirmations=12, max_lag=0,
+                 chunk_size=LOG_CHUNK_SIZE, cache_size=4096, name='miner_index'):
+        self.web3 = miner.web3
+        self.reader = miner.get_block_watcher(checkpoint_name=None)
+        self.session_factory = session_factory or get_session_factory()
+        self.confirmations = confirmations
+        self.max_lag = max_lag
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.name = name
+
+        self._confirmed = OrderedDict()  # ethc block -> BlockParticipation
+        self._provisional = {}  # ethc block -> BlockParticipation
+        self.synced_head = None  # Ethereum head the last sync read up to
+
+        with self.session_factory() as session:
+            cursor = session.get(SyncCursor, self.name)
+            self.last_block = cursor.last_block if cursor else None
+            self.first_complete_block = cursor.first_complete_block if cursor else None
+
+    def is_warm(self, ethc_block=None, head=None):
+        """True if the index is synced to the Ethereum head and holds every Mine log for ethc_block
+
+        Args:
+            head: Current Ethereum block number; without it the index can't tell it is fresh
+        """
+        if self.synced_head is None or head is None or head - self.synced_head > self.max_lag:
+            return False
+        if self.first_complete_block is None:
+            return False
+        return ethc_block is None or ethc_block >= self.first_complete_block
+
+    async def sync(self):
+        """Commit newly confirmed logs and refresh the provisional window up to the head"""
+        head = await resolve(self.web3.eth.block_number)
+        confirmed_head = head - self.confirmations
+        if self.last_block is None:
+            # Fresh index: follow from here; older history comes from a backfill
+            self.last_block = confirmed_head
+
+        from_block = self.last_block + 1
+        while from_block <= confirmed_head:
+            to_block = min(from_block + self.chunk_size - 1, confirmed_head)
+            events = await self._read(from_block, to_block)
+            self._note_first_complete(events)
+            deltas = await asyncio.to_thread(self._store, events, to_block)
+            self._apply(deltas, to_block)
+            from_block = to_block + 1
+
+        provisional = {}
+        if head > self.last_block:
+            for event in await self._read(self.last_block + 1, head):
+                if isinstance(event, MineEvent):
+                    provisional.setdefault(event.ethc_block, BlockParticipation()).add(
+                        event.miner, event.mine_count
+                    )
+        self._provisional = provisional
+        self.synced_head = head
+        logger.debug(f"Miner index synced to {head}, confirmed to {self.last_block}")
+
+    def commit(self, events, to_block):
+        """Write decoded events for blocks up to to_block and advance the cursor atomically"""
+        self._note_first_complete(events)
+        self._apply(self._store(events, to_block), to_block)
+
+    def _note_first_complete(self, events):
+        if self.first_complete_block is None:
+            new_blocks = [event.ethc_block for event in events if isinstance(event, NewBlockEvent)]
+            if new_blocks:
+                # Every Mine log for this block comes after the event that opened it
+                self.first_complete_block = new_blocks[0]
+
+    def _store(self, events, to_block):
+        """Database half of commit(), safe to run in a worker thread"""
+        with self.session_factory() as session:
+            deltas = self._write(session, events)
+            self._save_cursor(session, to_block)
+            session.commit()
+        return deltas
+
+    def _apply(self, deltas, to_block):
+        """In-memory half of commit(), on the event loop"""
+        self.last_block = to_block
+        for (ethc_block, miner), (count, _) in deltas.items():
+            # Uncached blocks are read from the database, which now has these rows
+            if ethc_block in self._confirmed:
+                self._confirmed[ethc_block].add(miner, count)
+        if deltas:
+            logger.debug(f"Committed {len(deltas)} participation rows up to block {to_block}")
+
+    def write_ranges(self, name, ranges):
+        """Bulk-write backfilled events and record their block ranges in one transaction
+
+        Args:
+            name: Backfill name the ranges are recorded under
+            ranges: List of ((from_block, to_block), events)
+        """
+        with self.session_factory() as session:
+            events = [event for _, range_events in ranges for event in range_events]
+            deltas = self._write(session, events)
+            session.add_all([
+                BackfillRange(name=name, from_block=from_block, to_block=to_block)
+                for (from_block, to_block), _ in ranges
+            ])
+            session.commit()
+
+        for ethc_block, _ in deltas:
+            self._confirmed.pop(ethc_block, None)
+        return len(events)
+
+    def ensure_cursor(self, block_number):
+        """Start live syncing after block_number unless the index already has a cursor"""
+        if self.last_block is not None:
+            return self.last_block
+        with self.session_factory() as session:
+            self._save_cursor(session, block_number)
+            session.commit()
+        self.last_block = block_number
+        return block_number
+
+    def mark_complete(self, first_complete_block):
+        """Record that every Mine log from first_complete_block on is in the index"""
+        self.first_complete_block = first_complete_block
+        with self.session_factory() as session:
+            self._save_cursor(session, self.last_block)
+            session.commit()
+
+    def _save_cursor(self, session, last_block):
+        cursor = session.get(SyncCursor, self.name)
+        if cursor is None:
+            cursor = SyncCursor(name=self.name, last_block=last_block)
+            session.add(cursor)
+        cursor.last_block = last_block
+        cursor.first_complete_block = self.first_complete_block
+
+    def mine_counts(self, ethc_block):
+        """Return {miner: mine_count} for a block, including provisional logs"""
+        counts = dict(self._load(ethc_block).counts)
+        provisional = self._provisional.get(ethc_block)
+        if provisional:
+            for miner, count in provisional.counts.items():
+                counts[miner] = counts.get(miner, 0) + count
+        return counts
+
+    def mine_count(self, ethc_block, miner):
+        count = self._load(ethc_block).counts.get(miner, 0)
+        provisional = self._provisional.get(ethc_block)
+        if provisional:
+            count += provisional.counts.get(miner, 0)
+        return count
+
+    def has_mined(self, ethc_block, miner):
+        return self.mine_count(ethc_block, miner) > 0
+
+    def block_stats(self, ethc_block):
+        """Per-block aggregates: distinct miners and total mines"""
+        confirmed = self._load(ethc_block)
+        provisional = self._provisional.get(ethc_block)
+        if provisional is None:
+            return {'miner_count': len(confirmed.counts), 'total_mine_count': confirmed.total}
+        miners = confirmed.counts.keys() | provisional.counts.keys()
+        return {'miner_count': len(miners), 'total_mine_count': confirmed.total + provisional.total}
+
+    async def _read(self, from_block, to_block):
+        logs = await self.reader.get_logs(from_block, to_block)
+        return [self.reader.decode_log(log) for log in logs]
+
+    async def load(self, ethc_block):
+        """Cache a block's committed participation, reading the database in a worker thread"""
+        if ethc_block not in self._confirmed:
+            rows = await asyncio.to_thread(self._read_rows, ethc_block)
+            if ethc_block not in self._confirmed:
+                self._cache(ethc_block, BlockParticipation(rows))
+        return self._load(ethc_block)
+
+    def _load(self, ethc_block):
+        entry = self._confirmed.get(ethc_block)
+        if entry is not None:
+            self._confirmed.move_to_end(ethc_block)
+            return entry
+        entry = BlockParticipation(self._read_rows(ethc_block))
+        self._cache(ethc_block, entry)
+        return entry
+
+    def _read_rows(self, ethc_block):
+        with self.session_factory() as session:
+            rows = session.execute(
+                select(MinerParticipation.miner, MinerParticipation.mine_count)
+                .where(MinerParticipation.ethc_block == ethc_block)
+            ).all()
+        return {miner: count for miner, count in rows}
+
+    def _cache(self, ethc_block, entry):
+        self._confirmed[ethc_block] = entry
+        if len(self._confirmed) > self.cache_size:
+            self._confirmed.popitem(last=False)
+        return entry
+
+    def _write(self, session, events):
+        deltas = {}
+        new_blocks = []
+        for event in events:
+            if isinstance(event, MineEvent):
+                key = (event.ethc_block, event.miner)
+                count, last_eth_block = deltas.get(key, (0, 0))
+                deltas[key] = (count + event.mine_count, max(last_eth_block, event.eth_block))
+            elif isinstance(event, NewBlockEvent):
+                new_blocks.append({
+                    'ethc_block': event.ethc_block,
+                    'eth_block': event.eth_block,
+                    'tx_hash': event.tx_hash.hex()
+                })
+
+        self._upsert(session, deltas)
+        if new_blocks:
+            statement = self._dialect(session).insert(EthcBlock).on_conflict_do_nothing()
+            session.execute(statement, new_blocks)
+        return deltas
+
+    def _dialect(self, session):
+        return postgresql if session.bind.dialect.name == 'postgresql' else sqlite
+
+    def _upsert(self, session, deltas):
+        if not deltas:
+            return
+        rows = [
+            {'ethc_block': ethc_block, 'miner': miner, 'mine_count': count, 'last_eth_block': last_eth_block}
+            for (ethc_block, miner), (count, last_eth_block) in deltas.items()
+        ]
+        statement = self._dialect(session).insert(MinerParticipation)
+        statement = statement.on_conflict_do_update(
+            index_elements=['ethc_block', 'miner'],
+            set_={
+                'mine_count': MinerParticipation.mine_count + statement.excluded.mine_count,
+                'last_eth_block': statement.excluded.last_eth_block
+            }
+        )
+        session.execute(statement, rows)
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+from collections import namedtuple
+from eth_abi import encode
+from eth_utils import encode_hex, keccak
+from config.constants import FEE_URGENCY
+from util.abi_registry import compiled_abi
+from util.alchemy_connector import resolve
+from util.nonce_manager import is_nonce_error
+from logic.block_watcher import NewBlockEvent
+
+logger = logging.getLogger(__name__)
+
+PreparedMine = namedtuple('PreparedMine', [
+    'wallet_name', 'mine_count', 'nonce', 'value', 'gas', 'fees', 'raw_transaction', 'tx_hash'
+])
+
+class MinePreparer:
+    """Sign mine() transactions for the next ETHC block ahead of time, send them on the trigger
+
+    While the current ETHC block is open, prepare() reads everything a mine needs
+    (mine cost, fees, balances, nonces, gas limits) and signs one transaction per
+    wallet and mine count. fire() then only has to broadcast the stored raw bytes,
+    a single eth_sendRawTransaction.
+
+    A candidate is re-signed, locally, when the nonce it was signed with is no
+    longer the wallet's next nonce, when the mine cost changed, or when the fee
+    estimate moved by more than `fee_tolerance` since it was signed.
+    """
+
+    def __init__(self, miner, mine_counts=(1,), urgency=FEE_URGENCY, fee_tolerance=0.125):
+        self.miner = miner
+        self.web3 = miner.web3
+        self.wallet_manager = miner.wallet_manager
+        self.mine_counts = tuple(mine_counts)
+        self.urgency = urgency
+        self.fee_tolerance = fee_tolerance
+
+        self.ethc_block = None  # ETHC block the candidates are meant for
+        self.mine_cost = None
+        self.fees = None
+        self._chain_id = None
+        self._prepared = {}  # (wallet name, mine count) -> PreparedMine
+        self._mine_selector = compiled_abi('ethc_contract').selector('mine')
+        self.signatures = 0
+        self._running = False
+
+    async def prepare(self, snapshot=None, wallet_names=None):
+        """Read state for the next ETHC block and sign every candidate that needs it
+
+        Cheap to call again on every new Ethereum block: candidates whose nonce,
+        mine cost and fees still hold are kept as they are.
+
+        Returns:
+            Number of candidates signed by this call
+        """
+        try:
+            if snapshot is None:
+                snapshot = await self.miner.get_snapshot()
+            wallet_names = wallet_names or self.wallet_manager.get_wallet_names()
+            wallets = [self.wallet_manager.get_wallet_by_name(name) for name in wallet_names]
+            nonce_manager = self.wallet_manager.nonce_manager
+
+            # Balances and nonces of every wallet in one sweep, pinned to one block
+            self._chain_id, fees, statuses = await asyncio.gather(
+                nonce_manager.chain_id(),
+                self.miner.fee_oracle.estimate(self.urgency, head=snapshot.eth_block_number),
+                self.wallet_manager.sweep(cached_nonces=True)
+            )
+            nonces = []
+            for wallet in wallets:
+                nonce = statuses[wallet.name].nonce
+                if nonce is None:
+                    # The sweep's nonce read failed for this wallet
+                    nonce = await self._next_nonce(wallet.public_key)
+                nonces.append(nonce)
+            if self.fees is None or self._fees_moved(self.fees, fees):
+                self.fees = fees
+            self.mine_cost = snapshot.mine_cost
+            self.ethc_block = snapshot.ethc_block + 1
+
+            stale = []
+            for wallet, nonce in zip(wallets, nonces):
+                for mine_count in self.mine_counts:
+                    prepared = self._prepared.get((wallet.name, mine_count))
+                    if prepared is None or self._is_stale(prepared, nonce):
+                        stale.append((wallet, nonce, mine_count))
+            gas_limits = await asyncio.gather(*(
+                self._gas_limit(wallet, mine_count) for wallet, _, mine_count in stale
+            ))
+
+            candidates = []
+            for (wallet, nonce, mine_count), gas in zip(stale, gas_limits):
+                value = self.mine_cost * mine_count
+                if statuses[wallet.name].balance < value + gas * self.fees.max_fee_per_gas:
+                    logger.warning("%s cannot afford %s mines, not preparing", wallet.name, mine_count)
+                    self._prepared.pop((wallet.name, mine_count), None)
+                    continue
+                candidates.append((wallet.name, mine_count, self._transaction(mine_count, nonce, gas)))
+
+            # One batch for every candidate, signed in parallel off the event loop
+            raw_transactions = await self.wallet_manager.sign_transactions(
+                [(wallet_name, transaction) for wallet_name, _, transaction in candidates]
+            )
+            for (wallet_name, mine_count, transaction), raw_transaction in zip(candidates, raw_transactions):
+                self._prepared[(wallet_name, mine_count)] = self._prepared_mine(
+                    wallet_name, mine_count, transaction, raw_transaction
+                )
+            logger.info("Prepared mines for ETHC block %s: %s signed, %s ready",
+                        self.ethc_block, len(candidates), len(self._prepared))
+            return len(candidates)
+
+        except Exception as e:
+            logger.error(f"Error preparing mines: {e}")
+            raise
+
+    def get(self, wallet_name, mine_count):
+        return self._prepared.get((wallet_name, mine_count))
+
+    async def fire(self, wallet_name, mine_count, fees=None):
+        """Broadcast the prepared mine for a wallet, re-signing first only if it went stale
+
+        Args:
+            wallet_name: Wallet to mine from
+            mine_count: Mine count to send, must be one of mine_counts
+            fees: Fresh FeeEstimate, if the caller has one; the prepared fees otherwise
+
+        Returns:
+            Transaction hash
+        """
+        try:
+            prepared = self._prepared.get((wallet_name, mine_count))
+            if prepared is None:
+                raise ValueError(f"No prepared mine of {mine_count} for {wallet_name}")
+            if fees is not None and self._fees_moved(self.fees, fees):
+                self.fees = fees
+            wallet = self.wallet_manager.get_wallet_by_name(wallet_name)
+            nonce_manager = self.wallet_manager.nonce_manager
+
+            for attempt in range(2):
+                nonce = await nonce_manager.allocate(wallet.public_key)
+                if self._is_stale(prepared, nonce):
+                    try:
+                        transaction = self._transaction(mine_count, nonce, prepared.gas)
+                        raw_transaction = self.wallet_manager.sign_transaction(wallet.name, transaction)
+                    except Exception:
+                        nonce_manager.release(wallet.public_key, nonce)
+                        raise
+                    prepared = self._prepared_mine(wallet.name, mine_count, transaction, raw_transaction)
+                try:
+                    tx_hash = await self.miner.send_signed_mine(prepared.raw_transaction, wallet, nonce,
+                                                                self.ethc_block, mine_count, prepared.value)
+                    break
+                except Exception as e:
+                    # Same handling as ETHCMiner.mine: only a stale nonce is re-signed and sent again
+                    if not is_nonce_error(e) or attempt:
+                        raise
+
+            # Spent: the next block needs candidates with the next nonce
+            for count in self.mine_counts:
+                self._prepared.pop((wallet_name, count), None)
+            logger.info("Sent prepared mine from %s with nonce %s: %s", wallet_name, nonce, tx_hash.hex())
+            return tx_hash
+
+        except Exception as e:
+            logger.error(f"Error sending prepared mine: {e}")
+            raise
+
+    async def fire_all(self, plan, fees=None):
+        """Send prepared mines for {wallet name: mine count} concurrently
+
+        Returns:
+            Dict of wallet name -> transaction hash, or the exception that wallet hit
+        """
+        names = list(plan)
+        results = await asyncio.gather(*(
+            self.fire(name, plan[name], fees=fees) for name in names
+        ), return_exceptions=True)
+        return dict(zip(names, results))
+
+    async def run(self, watcher, plan):
+        """Fire on every new ETHC block, then prepare for the one after, until stop()
+
+        Candidates are refreshed on each Ethereum block in between. plan is a
+        {wallet name: mine count} dict or a callable taking the NewBlockEvent
+        and returning one.
+        """
+        queue = watcher.subscribe()
+        self._running = True
+        try:
+            await self.prepare()
+            while self._running:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=watcher.poll_interval)
+                except asyncio.TimeoutError:
+                    event = None
+                try:
+                    if isinstance(event, NewBlockEvent) and event.ethc_block >= self.ethc_block:
+                        await self.fire_all(plan(event) if callable(plan) else plan)
+                    await self.prepare()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in mine preparer: {e}")
+        finally:
+            watcher.unsubscribe(queue)
+
+    def stop(self):
+        self._running = False
+
+    async def _next_nonce(self, address):
+        nonce = self.wallet_manager.nonce_manager.peek(address)
+        if nonce is None:
+            nonce = await self.wallet_manager.nonce_manager.resync(address)
+        return nonce
+
+    async def _gas_limit(self, wallet, mine_count):
+        gas = self.miner.gas_model.gas_limit(mine_count)
+        if gas is None:
+            estimate = await resolve(self.miner.contract.functions.mine(mine_count).estimate_gas({
+                'from': wallet.public_key,
+                'value': self.mine_cost * mine_count
+            }))
+            gas = int(estimate * 1.2)  # Add 20% buffer
+        return gas
+
+    def _transaction(self, mine_count, nonce, gas):
+        return {
+            'to': self.miner.contract.address,
+            'data': encode_hex(self._mine_selector + encode(['uint256'], [mine_count])),
+            'value': self.mine_cost * mine_count,
+            'gas': gas,
+            'maxFeePerGas': self.fees.max_fee_per_gas,
+            'maxPriorityFeePerGas': self.fees.max_priority_fee_per_gas,
+            'nonce': nonce,
+            'type': 2,  # EIP-1559 transaction
+            'chainId': self._chain_id
+        }
+
+    def _prepared_mine(self, wallet_name, mine_count, transaction, raw_transaction):
+        self.signatures += 1
+        return PreparedMine(wallet_name, mine_count, transaction['nonce'], transaction['value'],
+                            transaction['gas'], self.fees, raw_transaction, keccak(raw_transaction))
+
+    def _is_stale(self, prepared, nonce):
+        return (prepared.nonce != nonce
+                or prepared.value != self.mine_cost * prepared.mine_count
+                or prepared.fees != self.fees)
+
+    def _fees_moved(self, old, new):
+        if new.base_fee > old.max_fee_per_gas:
+            return True  # would not be included at all
+        for before, after in ((old.max_fee_per_gas, new.max_fee_per_gas),
+                              (old.max_priority_fee_per_gas, new.max_priority_fee_per_gas)):
+            if abs(after - before) > before * self.fee_tolerance:
+                return True
+        return False
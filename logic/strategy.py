@@ -0,0 +1,109 @@
+import logging
+from collections import namedtuple
+import numpy as np
+from logic.gas_model import DEFAULT_GAS_INTERCEPT, DEFAULT_GAS_SLOPE
+
+logger = logging.getLogger(__name__)
+
+MineDecision = namedtuple('MineDecision', ['mine_count', 'expected_value', 'win_probability', 'cost'])
+
+class MineStrategy:
+    """Pick the mineCount with the highest expected value for an ETHC block
+
+    The contract draws the winner uniformly from minersOfBlock, which holds one
+    entry per mine, so with `others` competing entries, `own` entries already in
+    the block and n new mines the win probability is (own + n) / (others + own + n).
+    Expected value of adding n mines, in wei:
+
+        (P(n) - P(0)) * miningReward * ethc_price - n * mineCost - gas(n) * gas_price
+
+    It is evaluated for every candidate n from 0 to max_mine_count at once with
+    NumPy, so a decision takes microseconds.
+    """
+
+    def __init__(self, max_mine_count=1000, gas_model=None):
+        self.max_mine_count = max_mine_count
+        self.gas_model = gas_model
+        self.counts = np.arange(max_mine_count + 1, dtype=np.float64)
+
+    def gas(self):
+        """Predicted gas for every candidate count (zero for no transaction)"""
+        if self.gas_model is not None and self.gas_model.intercept is not None:
+            intercept, slope = self.gas_model.intercept, self.gas_model.slope
+        else:
+            intercept, slope = DEFAULT_GAS_INTERCEPT, DEFAULT_GAS_SLOPE
+        gas = intercept + slope * self.counts
+        gas[0] = 0
+        return gas
+
+    def win_probabilities(self, others, own=0):
+        entries = own + self.counts
+        total = others + entries
+        return np.divide(entries, total, out=np.zeros_like(entries), where=total > 0)
+
+    def expected_values(self, others, mine_cost, mining_reward, gas_price, ethc_price, own=0):
+        """Expected value in wei of adding each candidate number of mines
+
+        Args:
+            others: Mine entries of other miners in the block
+            mine_cost: mineCost in wei
+            mining_reward: miningReward in ETHC base units (18 decimals)
+            gas_price: Expected effective gas price in wei
+            ethc_price: ETHC price in ETH
+            own: Our mine entries already in the block
+
+        Returns:
+            (expected values, win probabilities, costs), each indexed by mine count
+        """
+        if ethc_price is None:
+            raise ValueError("No ETHC price to value the block reward, set ETHC_PRICE_ETH")
+        probabilities = self.win_probabilities(others, own)
+        reward = float(mining_reward) * ethc_price
+        costs = self.counts * float(mine_cost) + self.gas() * float(gas_price)
+        values = (probabilities - probabilities[0]) * reward - costs
+        return values, probabilities, costs
+
+    def solve(self, others, mine_cost, mining_reward, gas_price, ethc_price, own=0, budget=None):
+        """Best mine count, or a zero-count decision if no count has positive expected value
+
+        Args:
+            budget: Optional wei available to the wallet; counts it can't pay for are skipped
+        """
+        values, probabilities, costs = self.expected_values(
+            others, mine_cost, mining_reward, gas_price, ethc_price, own
+        )
+        if budget is not None:
+            values = np.where(costs <= budget, values, -np.inf)
+        best = int(np.argmax(values))
+        if values[best] <= 0:
+            best = 0
+        decision = MineDecision(
+            mine_count=best,
+            expected_value=float(values[best]) if best else 0.0,
+            win_probability=float(probabilities[best]),
+            cost=int(costs[best])
+        )
+        logger.debug("Strategy for %s competing mines: %s", others, decision)
+        return decision
+
+    def decide(self, snapshot, gas_price, ethc_price, own=0, budget=None, forecast=None, caution=0.0, pending=0):
+        """Solve for the block in a ChainSnapshot; its miner_count includes our own entries
+
+        Args:
+            forecast: Optional CompetitionForecast for the block; bets are then sized
+                on the competition expected when the block closes, not on the snapshot
+            caution: Forecast standard deviations added to the expected competition
+            pending: Competitor mines seen in the mempool, not yet in the snapshot
+        """
+        others = max(snapshot.miner_count - own, 0) + pending
+        if forecast is not None and forecast.ethc_block == snapshot.ethc_block:
+            others = max(forecast.expected + caution * forecast.std, others)
+        return self.solve(
+            others=others,
+            mine_cost=snapshot.mine_cost,
+            mining_reward=snapshot.mining_reward,
+            gas_price=gas_price,
+            ethc_price=ethc_price,
+            own=own,
+            budget=budget
+        )
@@ -0,0 +1,382 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from decimal import Decimal
+from eth_utils import encode_hex, to_checksum_address
+from sqlalchemy import func, select
+from config.constants import ETHC_PRICE_ETH
+from database.connection import get_session_factory
+from database.db_models import HourlyRollup, MineTransaction
+from logic.block_watcher import NewBlockEvent
+from util.abi_registry import compiled_abi
+from util.alchemy_connector import batch_request, resolve
+
+logger = logging.getLogger(__name__)
+
+ZERO_ADDRESS = '0x' + '00' * 20
+
+def _hash(tx_hash):
+    return tx_hash.lower() if isinstance(tx_hash, str) else encode_hex(tx_hash)
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def hour_of(when):
+    """Key of the hourly_rollups row covering a naive UTC datetime"""
+    return when.replace(minute=0, second=0, microsecond=0)
+
+class MineTracker:
+    """Track every mine() transaction from submission to receipt to won/lost
+
+    Transactions are stored in the mine_transactions table keyed by hash. One
+    coroutine (run) polls receipts for all pending transactions in batched
+    eth_getTransactionReceipt calls, and resolves winners when a NewETHCBlock
+    event shows that a block has closed. Transactions with no receipt after
+    `drop_after` seconds are marked dropped and their wallet's nonce is resynced.
+
+    Pending work is reloaded from the database on start, so a restart picks up
+    where the last run stopped. Every change is also added to the current
+    hour's HourlyRollup row in the same commit, so hourly totals are one read.
+
+    Nothing here blocks the event loop on the database: track() only buffers
+    the record, for the next step() to write, and every session runs in a
+    worker thread.
+    """
+
+    def __init__(self, miner, session_factory=None, batch_size=100, poll_interval=3.0, drop_after=900,
+                 ethc_price=ETHC_PRICE_ETH):
+        self.miner = miner
+        self.web3 = miner.web3
+        self.session_factory = session_factory or get_session_factory()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.drop_after = drop_after
+        # ETH per ETHC, values rewards in the rollups' net profit
+        self.ethc_price = ethc_price
+        if ethc_price is None:
+            logger.warning("ETHC_PRICE_ETH is not set, hourly net profit will leave out mining rewards")
+        self.mine_topic = encode_hex(compiled_abi('ethc_contract').topic('Mine'))
+
+        self._pending = {}  # tx hash -> monotonic submit time
+        self._unresolved = set()  # ETHC blocks with confirmed mines and no outcome yet
+        self._closed_through = None  # newest ETHC block known to have closed
+        self._waiters = {}  # tx hash -> futures waiting for a final state
+        self._unsaved = []  # MineTransaction rows recorded by track(), not yet written
+        self._db_lock = asyncio.Lock()  # one worker thread writes at a time
+        self._last_poll = 0.0
+        self._running = False
+        self._load()
+
+    def _load(self):
+        with self.session_factory() as session:
+            rows = session.execute(
+                select(MineTransaction.tx_hash, MineTransaction.status, MineTransaction.ethc_block)
+                .where(MineTransaction.status.in_(['pending', 'confirmed']))
+                .where(MineTransaction.outcome.is_(None))
+            ).all()
+        now = time.monotonic()
+        for tx_hash, status, ethc_block in rows:
+            if status == 'pending':
+                self._pending[tx_hash] = now
+            else:
+                self._unresolved.add(ethc_block)
+        if rows:
+            logger.info(f"Resuming {len(self._pending)} pending mines and {len(self._unresolved)} open blocks")
+
+    def track(self, tx_hash, wallet, wallet_name, ethc_block, mine_count, nonce, value):
+        """Record a sent mine transaction
+
+        Called on the mine path right after the broadcast, so the row is only
+        buffered here; flush() writes it.
+        """
+        tx_hash = _hash(tx_hash)
+        self._unsaved.append(MineTransaction(
+            tx_hash=tx_hash,
+            wallet=to_checksum_address(wallet),
+            wallet_name=wallet_name,
+            ethc_block=ethc_block,
+            mine_count=mine_count,
+            nonce=nonce,
+            value=value,
+            status='pending',
+            submitted_at=_now()
+        ))
+        self._pending[tx_hash] = time.monotonic()
+
+    async def flush(self):
+        """Write the transactions buffered by track(), in a worker thread"""
+        async with self._db_lock:
+            rows, self._unsaved = self._unsaved, []
+            if not rows:
+                return
+            try:
+                await asyncio.to_thread(self._insert, rows)
+            except Exception:
+                self._unsaved = rows + self._unsaved
+                raise
+
+    def _insert(self, rows):
+        with self.session_factory() as session:
+            for row in rows:
+                session.add(row)
+                self._roll_up(session, Counter(transactions=1, mine_count=row.mine_count), row.submitted_at)
+            session.commit()
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def get(self, tx_hash):
+        """Stored record of a transaction as a dict, or None"""
+        with self.session_factory() as session:
+            row = session.get(MineTransaction, _hash(tx_hash))
+            if row is None:
+                return None
+            return {column.name: getattr(row, column.name) for column in MineTransaction.__table__.columns}
+
+    async def wait_for_outcome(self, tx_hash, timeout=None):
+        """Wait until a transaction has failed, been dropped or had its block decided"""
+        tx_hash = _hash(tx_hash)
+        await self.flush()
+        record = await asyncio.to_thread(self.get, tx_hash)
+        if record is None:
+            raise ValueError(f"Transaction {tx_hash} is not tracked")
+        if self._is_final(record):
+            return record
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tx_hash, []).append(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        finally:
+            waiters = self._waiters.get(tx_hash, [])
+            if future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                self._waiters.pop(tx_hash, None)
+
+    async def run(self, watcher):
+        """Poll receipts and resolve outcomes until stop(); winners follow the watcher's events"""
+        queue = watcher.subscribe()
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.poll_interval)
+                    self.handle_event(event)
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    if time.monotonic() - self._last_poll >= self.poll_interval:
+                        await self.step()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in mine tracker: {e}")
+        finally:
+            watcher.unsubscribe(queue)
+            # Mines sent since the last step are not lost on shutdown
+            await self.flush()
+
+    def stop(self):
+        self._running = False
+
+    def handle_event(self, event):
+        if isinstance(event, NewBlockEvent):
+            self.close_block(event.ethc_block - 1)
+
+    def close_block(self, ethc_block):
+        """Mark every ETHC block up to ethc_block as closed, so its winner can be read"""
+        if self._closed_through is None or ethc_block > self._closed_through:
+            self._closed_through = ethc_block
+
+    async def step(self):
+        """One round of receipt polling and outcome resolution"""
+        self._last_poll = time.monotonic()
+        await self.flush()
+        if self._pending:
+            await self.poll_receipts()
+        if self._closed_through is not None and any(block <= self._closed_through for block in self._unresolved):
+            await self.resolve_outcomes()
+
+    async def poll_receipts(self):
+        """Fetch receipts for every pending transaction in batches and store the results"""
+        hashes = list(self._pending)
+        receipts = {}
+        for start in range(0, len(hashes), self.batch_size):
+            chunk = hashes[start:start + self.batch_size]
+            results = await batch_request(self.web3, 'eth_getTransactionReceipt', [[tx_hash] for tx_hash in chunk])
+            for tx_hash, result in zip(chunk, results):
+                if isinstance(result, Exception):
+                    logger.warning("Receipt request for %s failed: %s", tx_hash, result)
+                elif result is not None:
+                    receipts[tx_hash] = result
+
+        now = time.monotonic()
+        dropped = [
+            tx_hash for tx_hash in hashes
+            if tx_hash not in receipts and now - self._pending[tx_hash] > self.drop_after
+        ]
+        if receipts or dropped:
+            await self._store_receipts(receipts, dropped)
+        return len(receipts)
+
+    async def _store_receipts(self, receipts, dropped):
+        await self.flush()
+        async with self._db_lock:
+            finished, confirmed_blocks, dropped_wallets = await asyncio.to_thread(
+                self._write_receipts, receipts, dropped
+            )
+        self._unresolved.update(confirmed_blocks)
+        for tx_hash, receipt in receipts.items():
+            self.miner.observe_receipt({
+                'transactionHash': bytes.fromhex(tx_hash[2:]),
+                'status': int(receipt['status'], 16),
+                'gasUsed': int(receipt['gasUsed'], 16)
+            })
+
+        for tx_hash in list(receipts) + dropped:
+            self._pending.pop(tx_hash, None)
+        if dropped:
+            logger.warning(f"{len(dropped)} mine transactions dropped without a receipt")
+            for wallet in dropped_wallets:
+                await self.miner.wallet_manager.nonce_manager.resync(wallet)
+        await self._notify(finished)
+
+    def _write_receipts(self, receipts, dropped):
+        """Store receipts and drops; returns (finished hashes, ETHC blocks with confirmed mines, dropped wallets)"""
+        finished = []
+        confirmed_blocks = set()
+        dropped_wallets = set()
+        totals = Counter()
+        with self.session_factory() as session:
+            for tx_hash, receipt in receipts.items():
+                row = session.get(MineTransaction, tx_hash)
+                status = int(receipt['status'], 16)
+                gas_used = int(receipt['gasUsed'], 16)
+                row.status = 'confirmed' if status == 1 else 'failed'
+                row.eth_block = int(receipt['blockNumber'], 16)
+                row.gas_used = gas_used
+                row.gas_paid = gas_used * int(receipt['effectiveGasPrice'], 16)
+                totals['gas_paid'] += row.gas_paid
+                totals['net_profit'] -= row.gas_paid
+                for log in receipt['logs']:
+                    if log['topics'] and log['topics'][0] == self.mine_topic:
+                        row.ethc_block = int(log['topics'][1], 16)
+                if status == 1:
+                    # mineCost is only paid by mines that went through
+                    totals['confirmed'] += 1
+                    totals['value'] += int(row.value)
+                    totals['net_profit'] -= int(row.value)
+                    confirmed_blocks.add(row.ethc_block)
+                else:
+                    totals['failed'] += 1
+                    row.resolved_at = _now()
+                    finished.append(tx_hash)
+            for tx_hash in dropped:
+                row = session.get(MineTransaction, tx_hash)
+                row.status = 'dropped'
+                row.resolved_at = _now()
+                dropped_wallets.add(row.wallet)
+                finished.append(tx_hash)
+                totals['dropped'] += 1
+            self._roll_up(session, totals)
+            session.commit()
+        return finished, confirmed_blocks, dropped_wallets
+
+    async def resolve_outcomes(self):
+        """Read winners of closed blocks with confirmed mines and mark each mine won or lost
+
+        A block's reward is miningReward as of the Ethereum block of our last mine
+        in it, not as of now, so rewards stay right across a halving.
+        """
+        blocks = sorted(block for block in self._unresolved if block <= self._closed_through)
+        functions = self.miner.contract.functions
+        mined_at = await asyncio.to_thread(self._mined_at, blocks)
+        eth_blocks = sorted(set(mined_at.values()) - {None})
+        winners, *rewards = await asyncio.gather(
+            self.miner.multicall.aggregate([functions.selectedMinerOfBlock(block) for block in blocks]),
+            *(resolve(functions.miningReward().call(block_identifier=eth_block)) for eth_block in eth_blocks)
+        )
+        rewards = {block: rewards[eth_blocks.index(eth_block)] for block, eth_block in mined_at.items()
+                   if eth_block is not None}
+
+        async with self._db_lock:
+            finished, resolved = await asyncio.to_thread(self._write_outcomes, blocks, winners, rewards)
+        self._unresolved.difference_update(resolved)
+        await self._notify(finished)
+
+    def _mined_at(self, blocks):
+        """Ethereum block of our last confirmed mine in each ETHC block"""
+        with self.session_factory() as session:
+            return dict(session.execute(
+                select(MineTransaction.ethc_block, func.max(MineTransaction.eth_block))
+                .where(MineTransaction.ethc_block.in_(blocks))
+                .where(MineTransaction.status == 'confirmed')
+                .group_by(MineTransaction.ethc_block)
+            ).all())
+
+    def _write_outcomes(self, blocks, winners, rewards):
+        """Store won/lost for blocks whose winner is drawn; returns (finished hashes, resolved blocks)"""
+        finished = []
+        resolved = []
+        totals = Counter()
+        with self.session_factory() as session:
+            for block, winner in zip(blocks, winners):
+                if winner == ZERO_ADDRESS:
+                    # Not drawn yet, try again on the next round
+                    continue
+                rows = session.scalars(
+                    select(MineTransaction)
+                    .where(MineTransaction.ethc_block == block)
+                    .where(MineTransaction.status == 'confirmed')
+                    .order_by(MineTransaction.nonce)
+                ).all()
+                mining_reward = rewards.get(block, 0)
+                rewarded = False
+                for row in rows:
+                    won = row.wallet == to_checksum_address(winner)
+                    row.outcome = 'won' if won else 'lost'
+                    row.reward = mining_reward if won and not rewarded else 0
+                    rewarded = rewarded or won
+                    row.resolved_at = _now()
+                    finished.append(row.tx_hash)
+                totals['blocks_entered'] += 1
+                if rewarded:
+                    totals['wins'] += 1
+                    totals['reward'] += mining_reward
+                    if self.ethc_price is not None:
+                        totals['net_profit'] += int(mining_reward * Decimal(str(self.ethc_price)))
+                    logger.info(f"Won ETHC block {block} with {to_checksum_address(winner)}")
+                resolved.append(block)
+            self._roll_up(session, totals)
+            session.commit()
+        return finished, resolved
+
+    def _roll_up(self, session, totals, when=None):
+        """Add totals to the HourlyRollup row of the hour of `when` (default now), in the caller's transaction"""
+        if not totals:
+            return
+        hour = hour_of(when or _now())
+        rollup = session.get(HourlyRollup, hour)
+        if rollup is None:
+            rollup = HourlyRollup(hour=hour, **{
+                column.name: 0 for column in HourlyRollup.__table__.columns if column.name != 'hour'
+            })
+            session.add(rollup)
+        for name, amount in totals.items():
+            setattr(rollup, name, getattr(rollup, name) + amount)
+
+    async def _notify(self, tx_hashes):
+        for tx_hash in tx_hashes:
+            futures = self._waiters.get(tx_hash)
+            if not futures:
+                continue
+            record = await asyncio.to_thread(self.get, tx_hash)
+            for future in futures:
+                if not future.done():
+                    future.set_result(record)
+
+    def _is_final(self, record):
+        return record['status'] in ('failed', 'dropped') or record['outcome'] is not None
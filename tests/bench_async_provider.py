@@ -0,0 +1,81 @@
+"""Wall-clock comparison of the sync and async Web3 backends against a local RPC stub
+
+Run with: python -m tests.bench_async_provider --blocks 50 --wallets 50 --delay 0.05
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from web3 import Web3
+
+from logic.ethc_miner import ETHCMiner
+from tests.chain_stub import EthcChainStub
+from tests.rpc_stub_server import RPCStubServer
+from util.alchemy_connector import PooledAsyncHTTPProvider, build_async_web3, build_web3, resolve
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def make_chain(block_count, wallet_count):
+    chain = EthcChainStub(ethc_block=block_count)
+    for block in range(block_count):
+        chain.add_miner(block, '0x' + f"{block + 1:040x}", mine_count=3)
+    addresses = [Web3.to_checksum_address('0x' + f"{0xabc000 + i:040x}") for i in range(wallet_count)]
+    for i, address in enumerate(addresses):
+        chain.balances[address] = 10 ** 18 + i
+    return chain, addresses
+
+async def workload(miner, blocks, addresses):
+    """Per-decision reads: a snapshot, miners of recent blocks and every wallet balance"""
+    await asyncio.gather(
+        miner.get_snapshot(),
+        miner.get_blocks_miners(blocks),
+        *(resolve(miner.web3.eth.get_balance(address)) for address in addresses)
+    )
+
+def run_sync(url, chain, blocks, addresses):
+    miner = ETHCMiner(None, web3=build_web3(Web3.HTTPProvider(url)),
+                      contract_address=chain.contract_address)
+    asyncio.run(miner.get_snapshot())  # warm chain id cache
+    start = time.perf_counter()
+    asyncio.run(workload(miner, blocks, addresses))
+    return time.perf_counter() - start
+
+def run_async(url, chain, blocks, addresses, pool_size):
+    async def run():
+        provider = PooledAsyncHTTPProvider(url, pool_size=pool_size)
+        miner = ETHCMiner(None, web3=build_async_web3(provider),
+                          contract_address=chain.contract_address)
+        try:
+            await miner.get_snapshot()
+            start = time.perf_counter()
+            await workload(miner, blocks, addresses)
+            return time.perf_counter() - start
+        finally:
+            await provider.close()
+    return asyncio.run(run())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=50)
+    parser.add_argument('--wallets', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.05, help='Injected RPC latency in seconds')
+    parser.add_argument('--pool-size', type=int, default=20)
+    args = parser.parse_args()
+
+    chain, addresses = make_chain(args.blocks, args.wallets)
+    blocks = list(range(args.blocks))
+    requests = 1 + args.blocks + args.wallets
+
+    with RPCStubServer(chain, delay=args.delay) as server:
+        sync_elapsed = run_sync(server.url, chain, blocks, addresses)
+        async_elapsed = run_async(server.url, chain, blocks, addresses, args.pool_size)
+
+    logger.info(f"{requests} requests, {args.delay * 1000:.0f} ms injected latency, pool size {args.pool_size}")
+    logger.info(f"sync:    {sync_elapsed:.3f}s")
+    logger.info(f"async:   {async_elapsed:.3f}s")
+    logger.info(f"speedup: {sync_elapsed / async_elapsed:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Backtest sweep throughput over a synthetic block history
+
+Run with: python -m tests.bench_backtester --blocks 100000 --configs 200 --workers 4
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from logic.backtester import Backtester, BlockHistory, EVStrategy, FixedStrategy
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def make_history(block_count, seed=0):
+    """Competition that drifts over time, with gas and price noise"""
+    rng = np.random.default_rng(seed)
+    level = np.exp(np.cumsum(rng.normal(0, 0.02, block_count))) * 200
+    return BlockHistory(
+        ethc_block=np.arange(block_count, dtype=np.uint64),
+        others=rng.poisson(level).astype(np.float64),
+        mine_cost=np.full(block_count, 1e15),
+        mining_reward=np.full(block_count, 50e18),
+        gas_price=rng.lognormal(np.log(20e9), 0.4, block_count),
+        ethc_price=np.full(block_count, 0.0005)
+    )
+
+def make_configs(count):
+    configs = [FixedStrategy(mine_count=mine_count, max_competition=cap) for mine_count in (1, 5, 20) for cap in (50, 200)]
+    margins = np.round(np.linspace(0, 1, max((count - len(configs)) // 4, 1)), 3)
+    configs += [EVStrategy(margin=float(margin), price_factor=factor) for margin in margins for factor in (0.5, 0.8, 1, 1.2)]
+    return configs[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=100_000)
+    parser.add_argument('--configs', type=int, default=200)
+    parser.add_argument('--trials', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    backtester = Backtester(make_history(args.blocks), trials=args.trials, workers=args.workers)
+    configs = make_configs(args.configs)
+
+    start = time.perf_counter()
+    results = backtester.sweep(configs)
+    elapsed = time.perf_counter() - start
+    logger.info(f"{len(configs)} configurations x {args.blocks} blocks x {args.trials} trials "
+                f"with {backtester.workers} workers: {elapsed:.1f}s ({len(configs) / elapsed:.1f} configs/s)")
+    for result in sorted(results, key=lambda result: result.expected_profit, reverse=True)[:5]:
+        logger.info(f"{result.config}: EV {result.expected_profit / 1e18:.3f} ETH, ROI {result.roi:.1%}, "
+                    f"max drawdown {result.max_drawdown / 1e18:.3f} ETH")
+
+if __name__ == "__main__":
+    main()
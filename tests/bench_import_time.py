@@ -0,0 +1,57 @@
+"""Cold-start import cost of the miner's entry modules, measured with python -X importtime
+
+Run with: python -m tests.bench_import_time --repeat 5 --budget 1500
+"""
+import argparse
+import logging
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).parent.parent
+MODULES = ['config.constants', 'util.alchemy_connector', 'util.wallet_manager', 'logic.ethc_miner', 'app.main']
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+def import_profile(module):
+    """Cumulative microseconds per module for a fresh interpreter importing module"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            profile[match.group(4)] = int(match.group(2))
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=None, help='Fail if any module takes longer, in ms')
+    parser.add_argument('--top', type=int, default=5, help='Slowest dependencies to list per module')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        profiles = [import_profile(module) for _ in range(args.repeat)]
+        elapsed = statistics.median(profile[module] for profile in profiles) / 1000
+        dependencies = [item for item in profiles[-1].items() if item[0] != module]
+        slowest = sorted(dependencies, key=lambda item: item[1], reverse=True)[:args.top]
+        logger.info(f"{module:24s} {elapsed:8.1f} ms  (" +
+                    ", ".join(f"{name} {micros / 1000:.0f}" for name, micros in slowest) + ")")
+        if args.budget is not None and elapsed > args.budget:
+            over_budget.append(module)
+
+    if over_budget:
+        logger.error(f"Over the {args.budget:.0f} ms import budget: {over_budget}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Mine log decoding throughput: web3 process_log against the fast LogDecoder
+
+Run with: python -m tests.bench_log_decoder --logs 20000 --miners 200
+"""
+import argparse
+import logging
+import random
+import time
+
+from eth_utils import to_checksum_address
+
+from config.constants import load_abi
+from logic.log_decoder import LogDecoder
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def make_corpus(log_count, miner_count, seed=0):
+    """Raw and web3-formatted Mine logs, with a NewETHCBlock every 50 logs"""
+    rng = random.Random(seed)
+    chain = EthcChainStub()
+    miners = [to_checksum_address('0x' + f"{index + 1:040x}") for index in range(miner_count)]
+    for index in range(log_count):
+        if index and index % 50 == 0:
+            chain.advance()
+            chain.start_new_block()
+        else:
+            # Skip the stub's miner list, only the logs matter here
+            chain._emit('Mine', [chain.ethc_block.to_bytes(32, 'big'),
+                                 bytes(12) + bytes.fromhex(rng.choice(miners)[2:])],
+                        rng.randint(1, 100).to_bytes(32, 'big'))
+    web3 = stub_web3(chain)
+    formatted = web3.eth.get_logs({'address': chain.contract_address, 'fromBlock': 0, 'toBlock': 'latest'})
+    contract = web3.eth.contract(address=chain.contract_address, abi=load_abi('ethc_contract'))
+    return contract, chain.logs, formatted
+
+def web3_decode(contract, logs, mine_topic):
+    mine, new_block = contract.events.Mine(), contract.events.NewETHCBlock()
+    return [(mine if bytes(log['topics'][0]) == mine_topic else new_block).process_log(log) for log in logs]
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logs', type=int, default=20_000)
+    parser.add_argument('--miners', type=int, default=200)
+    args = parser.parse_args()
+
+    contract, raw, formatted = make_corpus(args.logs, args.miners)
+    decoder = LogDecoder()
+
+    results = {
+        'web3 process_log': timed(web3_decode, contract, formatted, decoder.mine_topic),
+        'decode (formatted)': timed(decoder.decode_many, formatted),
+        'decode (raw JSON)': timed(decoder.decode_many, raw),
+        'decode_batch (raw)': timed(decoder.decode_batch, raw),
+    }
+    baseline = results['web3 process_log']
+    logger.info(f"{len(raw)} logs, {args.miners} distinct miners")
+    for name, elapsed in results.items():
+        logger.info(f"{name:20s} {len(raw) / elapsed:10.0f} logs/s  ({baseline / elapsed:.1f}x)")
+
+if __name__ == "__main__":
+    main()
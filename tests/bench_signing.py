@@ -0,0 +1,70 @@
+"""Signing throughput of SigningService against the serial, in-process baseline
+
+Run with: python -m tests.bench_signing --transactions 200 --wallets 20 --workers 1 2 4
+"""
+import argparse
+import logging
+import os
+import time
+
+from eth_account import Account
+
+from util.signing_service import SigningService
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def make_jobs(transaction_count, wallet_count):
+    keys = {f"wallet{index}": '0x' + f"{index + 1:064x}" for index in range(wallet_count)}
+    jobs = [(f"wallet{index % wallet_count}", {
+        'to': '0x' + '11' * 20,
+        'value': 10 ** 15,
+        'data': '0x' + '00' * 36,
+        'gas': 120_000,
+        'maxFeePerGas': 3 * 10 ** 10,
+        'maxPriorityFeePerGas': 10 ** 9,
+        'nonce': index // wallet_count,
+        'type': 2,
+        'chainId': 1
+    }) for index in range(transaction_count)]
+    return keys, jobs
+
+def run_serial(keys, jobs):
+    accounts = {name: Account.from_key(key) for name, key in keys.items()}
+    start = time.perf_counter()
+    for name, transaction in jobs:
+        accounts[name].sign_transaction(transaction)
+    return time.perf_counter() - start
+
+def run_pool(keys, jobs, workers):
+    service = SigningService(keys, workers=workers, min_parallel=1)
+    try:
+        service.sign_batch(jobs[:workers])  # start the workers outside the timing
+        start = time.perf_counter()
+        service.sign_batch(jobs)
+        return time.perf_counter() - start
+    finally:
+        service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--transactions', type=int, default=200)
+    parser.add_argument('--wallets', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='Pool sizes to measure, defaults to 1, 2, 4, ... up to the core count')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or [2 ** power for power in range(cores.bit_length()) if 2 ** power <= cores]
+    keys, jobs = make_jobs(args.transactions, args.wallets)
+
+    serial_elapsed = run_serial(keys, jobs)
+    logger.info(f"{args.transactions} transactions, {args.wallets} wallets, {cores} cores")
+    logger.info(f"serial:     {args.transactions / serial_elapsed:8.0f} signatures/s")
+    for count in workers:
+        elapsed = run_pool(keys, jobs, count)
+        logger.info(f"{count:2d} workers: {args.transactions / elapsed:8.0f} signatures/s "
+                    f"({serial_elapsed / elapsed:.1f}x)")
+
+if __name__ == "__main__":
+    main()
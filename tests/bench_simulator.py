@@ -0,0 +1,175 @@
+"""Mining loop benchmarks against the local chain simulator, with results kept per commit
+
+Measures RPC calls per decision, decision latency, mines per minute across
+N wallets and memory, then appends the results to a JSON lines file and
+compares them with the last run of the same configuration.
+
+Run with: python -m tests.bench_simulator --wallets 20 --blocks 10 --delay 0.02
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from eth_account import Account
+
+from config.constants import DATA_DIR
+from logic.ethc_miner import ETHCMiner
+from logic.gas_model import GasModel
+from logic.strategy import MineStrategy
+from tests.chain_simulator import ChainSimulator
+from util.alchemy_connector import PooledAsyncHTTPProvider, build_async_web3
+from util.wallet_manager import WalletManager
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+# Per-mine lines would drown the results
+for name in ('logic', 'util'):
+    logging.getLogger(name).setLevel(logging.WARNING)
+
+# Metric -> True when a higher value is better
+METRICS = {
+    'rpc_calls_per_decision': False,
+    'http_requests_per_decision': False,
+    'decision_p50_ms': False,
+    'decision_p95_ms': False,
+    'mines_per_minute': True,
+    'peak_traced_mb': False,
+}
+
+def make_accounts(count):
+    return [Account.from_key((index + 1).to_bytes(32, 'big')) for index in range(count)]
+
+def make_miner(web3, simulator, accounts):
+    wallet_manager = WalletManager.from_config({
+        f"WALLET_{index}": {'name': f"wallet{index}", 'public_key': account.address, 'private_key': account.key.hex()}
+        for index, account in enumerate(accounts)
+    }, web3=web3)
+    miner = ETHCMiner(wallet_manager, web3=web3, contract_address=simulator.chain.contract_address)
+    miner.gas_model = GasModel(checkpoint_name=None)
+    return miner
+
+async def decide(miner, strategy, ethc_price):
+    """What the mining loop does before each ETHC block: read, price, sweep, solve"""
+    snapshot = await miner.get_snapshot()
+    fees = await miner.fee_oracle.estimate(head=snapshot.eth_block_number)
+    await miner.sweep_wallets(snapshot=snapshot, fees=fees, cached_nonces=True)
+    return strategy.decide(snapshot, fees.max_fee_per_gas, ethc_price)
+
+async def run_benchmark(args):
+    simulator = ChainSimulator(seed=args.seed, competitors=args.competitors)
+    accounts = make_accounts(args.wallets)
+    simulator.fund([account.address for account in accounts])
+    strategy = MineStrategy()
+
+    with simulator.serve(delay=args.delay) as server:
+        provider = PooledAsyncHTTPProvider(server.url)
+        miner = make_miner(build_async_web3(provider), simulator, accounts)
+        try:
+            await decide(miner, strategy, args.ethc_price)  # warm the pool and the chain id cache
+
+            latencies, calls, http_requests = [], [], []
+            for _ in range(args.decisions):
+                simulator.step()
+                requests, round_trips = simulator.chain.total_requests, server.http_requests
+                start = time.perf_counter()
+                await decide(miner, strategy, args.ethc_price)
+                latencies.append(time.perf_counter() - start)
+                calls.append(simulator.chain.total_requests - requests)
+                http_requests.append(server.http_requests - round_trips)
+
+            tracemalloc.start()
+            sent = 0
+            start = time.perf_counter()
+            for _ in range(args.blocks):
+                simulator.until_next_ethc_block()
+                results = await miner.mine_all(mine_count=args.mine_count)
+                sent += sum(1 for result in results.values() if not isinstance(result, Exception))
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            await provider.close()
+
+    latencies.sort()
+    return {
+        'rpc_calls_per_decision': sum(calls) / len(calls),
+        'http_requests_per_decision': sum(http_requests) / len(http_requests),
+        'decision_p50_ms': latencies[len(latencies) // 2] * 1000,
+        'decision_p95_ms': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+        'mines_per_minute': sent / elapsed * 60,
+        'peak_traced_mb': peak / 2 ** 20,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_previous(path, config):
+    """Last stored result for the same configuration"""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry['config'] == config:
+                previous = entry
+    return previous
+
+def regressions(previous, results, tolerance):
+    """Metrics that got worse than the previous run by more than `tolerance`"""
+    found = []
+    for name, higher_is_better in METRICS.items():
+        before, after = previous['results'].get(name), results[name]
+        if not before:
+            continue
+        change = (after - before) / before
+        if (-change if higher_is_better else change) > tolerance:
+            found.append((name, before, after, change))
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--wallets', type=int, default=20)
+    parser.add_argument('--blocks', type=int, default=10, help='ETHC blocks mined for the throughput run')
+    parser.add_argument('--decisions', type=int, default=50)
+    parser.add_argument('--competitors', type=int, default=20)
+    parser.add_argument('--mine-count', type=int, default=1)
+    parser.add_argument('--delay', type=float, default=0.02, help='Injected RPC latency in seconds')
+    parser.add_argument('--ethc-price', type=float, default=0.001)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--results', default=os.path.join(DATA_DIR, 'benchmarks', 'simulator.jsonl'))
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Relative change reported as a regression')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    config = {name: getattr(args, name) for name in ('wallets', 'blocks', 'decisions', 'competitors',
+                                                       'mine_count', 'delay', 'seed')}
+    results = asyncio.run(run_benchmark(args))
+    for name, value in results.items():
+        logger.info(f"{name:28s} {value:10.2f}")
+
+    previous = load_previous(args.results, config)
+    found = regressions(previous, results, args.tolerance) if previous else []
+    for name, before, after, change in found:
+        logger.warning(f"Regression in {name} since {previous['commit']}: {before:.2f} -> {after:.2f} ({change:+.0%})")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.results), exist_ok=True)
+        with open(args.results, 'a') as f:
+            f.write(json.dumps({'commit': commit(), 'time': time.time(), 'config': config, 'results': results}) + '\n')
+    sys.exit(1 if found else 0)
+
+if __name__ == "__main__":
+    main()
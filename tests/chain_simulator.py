@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import random
+import threading
+
+from eth_utils import to_checksum_address
+
+from logic.chain_snapshot import BLOCK_INTERVAL, ETH_BLOCK_INTERVAL
+from logic.fee_oracle import next_base_fee
+from tests.chain_stub import EthcChainStub
+from tests.rpc_stub_server import RPCStubServer
+
+logger = logging.getLogger(__name__)
+
+class ChainSimulator:
+    """Deterministic ETHC chain with a block cadence and simulated competitors
+
+    Drives an EthcChainStub one Ethereum block at a time. Each step() produces
+    the next block: a NewETHCBlock opens a new ETHC block once `ethc_interval`
+    seconds have passed (the previous one's winner drawn uniformly from its
+    entries, as the contract does), held transactions are included, and each of
+    `competitors` miners enters with probability `competitor_rate` per ETHC
+    block with a mineCount from `competitor_mines`, at a random Ethereum block
+    of the window. Base fees follow the EIP-1559 rule on random block fullness.
+
+    Everything random comes from one seeded generator, so the same seed and the
+    same sequence of steps and requests give the same chain. run() steps on a
+    wall-clock timer instead, `speed` times faster than real time. serve()
+    exposes the chain over HTTP with an injected per-request latency.
+    """
+
+    def __init__(self, seed=0, eth_block_time=ETH_BLOCK_INTERVAL, ethc_interval=BLOCK_INTERVAL,
+                 competitors=20, competitor_rate=0.5, competitor_mines=(1, 20), chain=None):
+        self.chain = chain or EthcChainStub()
+        self.random = random.Random(seed)
+        self.eth_block_time = eth_block_time
+        self.ethc_interval = ethc_interval
+        self.competitor_rate = competitor_rate
+        self.competitor_mines = competitor_mines
+        self.competitors = [to_checksum_address(f"0x{0xc0000 + index:040x}") for index in range(competitors)]
+        # Our transactions wait in the mempool until the next block, like on mainnet
+        self.chain.hold_transactions = True
+        # Shared with every server on this chain
+        self.lock = threading.Lock()
+        self.blocks_per_ethc_block = max(ethc_interval // eth_block_time, 1)
+        self._entries = {}  # eth block offset in the window -> competitor entries
+        self._running = False
+        self._plan_entries()
+
+    def step(self, blocks=1):
+        """Produce the next `blocks` Ethereum blocks"""
+        with self.lock:
+            for _ in range(blocks):
+                self._step()
+
+    def until_next_ethc_block(self):
+        """Step until a NewETHCBlock has been emitted; returns the new ETHC block"""
+        ethc_block = self.chain.ethc_block
+        while self.chain.ethc_block == ethc_block:
+            self.step()
+        return self.chain.ethc_block
+
+    async def run(self, speed=1.0):
+        """Step every eth_block_time / speed seconds until stop()"""
+        self._running = True
+        while self._running:
+            await asyncio.sleep(self.eth_block_time / speed)
+            self.step()
+
+    def stop(self):
+        self._running = False
+
+    def serve(self, delay=0.0):
+        """RPCStubServer on this chain answering after `delay` seconds; use as a context manager"""
+        return RPCStubServer(self.chain, delay=delay, lock=self.lock)
+
+    def fund(self, addresses, balance=10 ** 20):
+        with self.lock:
+            for address in addresses:
+                self.chain.balances[to_checksum_address(address)] = balance
+
+    def _step(self):
+        chain = self.chain
+        ratio = self.random.uniform(0.2, 0.8)
+        chain.gas_used_ratios[chain.eth_block_number] = ratio
+        chain.base_fees[chain.eth_block_number] = chain.base_fee
+        chain.advance(1)
+        chain.base_fee = next_base_fee(chain.base_fee, ratio)
+
+        if chain.timestamp - chain.last_block_time >= self.ethc_interval:
+            miners = chain.miners.get(chain.ethc_block)
+            winner = self.random.choice(miners) if miners else None
+            chain.start_new_block(winner=winner)
+            self._plan_entries()
+        chain.include_pending()
+
+        offset = (chain.timestamp - chain.last_block_time) // self.eth_block_time
+        for address, mine_count in self._entries.pop(offset, []):
+            chain.emit_mine(address, mine_count)
+
+    def _plan_entries(self):
+        """Pick which competitors enter the open ETHC block, with how many mines and when"""
+        self._entries = {}
+        low, high = self.competitor_mines
+        for address in self.competitors:
+            if self.random.random() < self.competitor_rate:
+                offset = self.random.randrange(self.blocks_per_ethc_block)
+                self._entries.setdefault(offset, []).append((address, self.random.randint(low, high)))
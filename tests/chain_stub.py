@@ -0,0 +1,457 @@
+import logging
+from collections import Counter
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_account._utils.typed_transactions import TypedTransaction
+from eth_utils import encode_hex, event_abi_to_log_topic, function_abi_to_4byte_selector, keccak, to_checksum_address
+from eth_utils.abi import collapse_if_tuple
+from hexbytes import HexBytes
+from web3.providers.base import BaseProvider
+from config.constants import ETHC_CONTRACT_ABI, MULTICALL3_ABI, MULTICALL3_ADDRESS
+from util.alchemy_connector import build_web3
+
+logger = logging.getLogger(__name__)
+
+ETHC_ADDRESS = '0x00000000000000000000000000000000000E7C00'
+
+class StubRPCError(Exception):
+    def __init__(self, message, code=-32000):
+        super().__init__(message)
+        self.code = code
+
+def _topics(abi):
+    return {
+        item['name']: event_abi_to_log_topic(item)
+        for item in abi if item.get('type') == 'event'
+    }
+
+def _selectors(abi):
+    selectors = {}
+    for item in abi:
+        if item.get('type') == 'function':
+            selectors[function_abi_to_4byte_selector(item)] = item
+    return selectors
+
+class EthcChainStub:
+    """In-memory stand-in for an Ethereum node hosting the ETHC contract and Multicall3
+
+    Answers the JSON-RPC methods the miner uses from plain Python state, and counts
+    every request so tests can assert on round-trips.
+    """
+
+    def __init__(self, chain_id=1, eth_block_number=19_000_000, timestamp=1_700_000_000,
+                 base_fee=10 ** 10, ethc_block=100, last_block_time=1_699_999_970,
+                 mine_cost=10 ** 15, mining_reward=50 * 10 ** 18):
+        self.chain_id = chain_id
+        self.eth_block_number = eth_block_number
+        self.timestamp = timestamp
+        self.base_fee = base_fee
+        self.ethc_block = ethc_block
+        self.last_block_time = last_block_time
+        self.mine_cost = mine_cost
+        self.mining_reward = mining_reward
+        self.miners = {}  # ethc block -> list of miner addresses
+        self.selected = {}  # ethc block -> winning address
+        self.balances = {}
+        self.nonces = {}  # address -> set of nonces used by accepted transactions
+        self.priority_fee = 10 ** 9
+        self.base_fees = {}  # eth block -> base fee, defaults to base_fee
+        self.mining_rewards = {}  # eth block -> miningReward, defaults to mining_reward
+        self.gas_used_ratios = {}  # eth block -> gasUsed / gasLimit, defaults to 0.5
+        self.gas_estimate = 100_000
+        self.transactions = []
+        self.known_hashes = set()
+        self.receipts = {}  # tx hash -> receipt
+        # When set, sent transactions wait in the mempool until include_pending()
+        self.hold_transactions = False
+        self.mempool = []
+
+        self.contract_address = to_checksum_address(ETHC_ADDRESS)
+        self.multicall_address = to_checksum_address(MULTICALL3_ADDRESS)
+        self._ethc_functions = _selectors(ETHC_CONTRACT_ABI)
+        self._mine_selector = next(selector for selector, item in self._ethc_functions.items()
+                                   if item['name'] == 'mine')
+        self._multicall_functions = _selectors(MULTICALL3_ABI)
+        self._topics = _topics(ETHC_CONTRACT_ABI)
+        self.logs = []
+        # Provider limits for eth_getLogs
+        self.max_logs_per_query = None
+        self.failing_get_logs = 0
+        self.request_counts = Counter()
+        self._call_block = eth_block_number  # Ethereum block the eth_call being answered is pinned to
+
+    @property
+    def total_requests(self):
+        return sum(self.request_counts.values())
+
+    def add_miner(self, ethc_block, address, mine_count=1):
+        self.miners.setdefault(ethc_block, []).extend([to_checksum_address(address)] * mine_count)
+
+    def advance(self, blocks=1):
+        """Produce empty Ethereum blocks, 12 seconds apart"""
+        self.eth_block_number += blocks
+        self.timestamp += 12 * blocks
+
+    def use_nonce(self, address):
+        """Consume the next nonce of address, as if a transaction was sent from elsewhere"""
+        address = to_checksum_address(address)
+        nonce = self._pending_count(address)
+        self.nonces.setdefault(address, set()).add(nonce)
+        return nonce
+
+    def emit_mine(self, address, mine_count=1, ethc_block=None, tx_hash=None):
+        """Record a mine() call in the current Ethereum block, with its Mine log"""
+        ethc_block = self.ethc_block if ethc_block is None else ethc_block
+        self.add_miner(ethc_block, address, mine_count)
+        return self._emit('Mine', [ethc_block.to_bytes(32, 'big'), bytes.fromhex(address[2:].rjust(64, '0'))],
+                          encode(['uint256'], [mine_count]), tx_hash)
+
+    def submit_mine(self, address, mine_count=1, nonce=None, max_fee_per_gas=None):
+        """Put an unsigned mine() from address in the mempool, as if broadcast by a competitor
+
+        Passing the nonce of a transaction already in the mempool replaces it, like a fee bump.
+
+        Returns:
+            The transaction hash
+        """
+        sender = to_checksum_address(address)
+        if nonce is None:
+            nonce = self.use_nonce(sender)
+        else:
+            self.nonces.setdefault(sender, set()).add(nonce)
+        transaction = {
+            'to': HexBytes(self.contract_address),
+            'value': self.mine_cost * mine_count,
+            'data': HexBytes(self._mine_selector + encode(['uint256'], [mine_count])),
+            'nonce': nonce,
+            'gas': self.mine_gas(mine_count),
+            'maxFeePerGas': max_fee_per_gas or 2 * self.base_fee + self.priority_fee,
+            'maxPriorityFeePerGas': self.priority_fee,
+        }
+        tx_hash = keccak(bytes.fromhex(sender[2:]) + encode(['uint256', 'uint256'],
+                                                            [nonce, transaction['maxFeePerGas']]))
+        self.mempool = [entry for entry in self.mempool if (entry[1], entry[2]['nonce']) != (sender, nonce)]
+        self.mempool.append((tx_hash, sender, transaction))
+        return tx_hash
+
+    def include_pending(self):
+        """Include every held transaction in the current Ethereum block"""
+        for tx_hash, sender, transaction in self.mempool:
+            self._include(tx_hash, sender, transaction)
+        self.mempool = []
+
+    def drop_pending(self):
+        """Discard every held transaction, freeing their nonces"""
+        for _, sender, transaction in self.mempool:
+            self.nonces[sender].discard(transaction['nonce'])
+        self.mempool = []
+
+    def start_new_block(self, winner=None):
+        """Close the open ETHC block and emit NewETHCBlock for the next one"""
+        if winner is not None:
+            self.selected[self.ethc_block] = to_checksum_address(winner)
+        self.ethc_block += 1
+        self.last_block_time = self.timestamp
+        self._emit('NewETHCBlock', [self.ethc_block.to_bytes(32, 'big')], b'')
+
+    def _emit(self, event_name, indexed, data, tx_hash=None):
+        block_logs = [log for log in self.logs if int(log['blockNumber'], 16) == self.eth_block_number]
+        tx_hash = tx_hash or (len(self.logs) + 1).to_bytes(32, 'big')
+        log = {
+            'address': self.contract_address,
+            'topics': [encode_hex(self._topics[event_name])] + [encode_hex(topic) for topic in indexed],
+            'data': encode_hex(data),
+            'blockNumber': hex(self.eth_block_number),
+            'blockHash': '0x' + self.eth_block_number.to_bytes(32, 'big').hex(),
+            'transactionHash': encode_hex(tx_hash),
+            'transactionIndex': hex(len(block_logs)),
+            'logIndex': hex(len(block_logs)),
+            'removed': False,
+        }
+        self.logs.append(log)
+        return log
+
+    def _include(self, tx_hash, sender, transaction):
+        to = to_checksum_address(transaction['to'])
+        data = bytes(transaction['data'])
+        logs = []
+        gas_used = 21_000
+        if to == self.contract_address and self._ethc_functions.get(data[:4], {}).get('name') == 'mine':
+            (mine_count,) = decode(['uint256'], data[4:])
+            logs.append(self.emit_mine(sender, mine_count, tx_hash=tx_hash))
+            gas_used = self.mine_gas(mine_count)
+        gas_price = min(transaction['maxFeePerGas'], self.base_fee + transaction['maxPriorityFeePerGas'])
+        self.receipts[encode_hex(tx_hash)] = {
+            'transactionHash': encode_hex(tx_hash),
+            'transactionIndex': hex(0),
+            'blockNumber': hex(self.eth_block_number),
+            'blockHash': '0x' + self.eth_block_number.to_bytes(32, 'big').hex(),
+            'from': sender,
+            'to': to,
+            'status': hex(1),
+            'gasUsed': hex(gas_used),
+            'cumulativeGasUsed': hex(gas_used),
+            'effectiveGasPrice': hex(gas_price),
+            'logs': logs,
+            'type': hex(2),
+        }
+
+    def mine_gas(self, mine_count):
+        return 48_000 + 23_500 * mine_count
+
+    def handle(self, method, params):
+        self.request_counts[method] += 1
+        handler = getattr(self, f"rpc_{method}", None)
+        if handler is None:
+            raise StubRPCError(f"Method {method} not supported", code=-32601)
+        return handler(*params)
+
+    # JSON-RPC methods
+
+    def rpc_eth_chainId(self):
+        return hex(self.chain_id)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.eth_block_number)
+
+    def rpc_eth_getBlockByNumber(self, block_identifier, full_transactions=False):
+        if block_identifier == 'pending':
+            # The block the node would build next: the head's successor holding the mempool
+            block = self.rpc_eth_getBlockByNumber('latest')
+            block['number'] = hex(self.eth_block_number + 1)
+            block['timestamp'] = hex(self.timestamp + 12)
+            block['transactions'] = [
+                self._transaction_json(*entry) if full_transactions else encode_hex(entry[0])
+                for entry in self.mempool
+            ]
+            return block
+        number = self._block_number(block_identifier)
+        return {
+            'number': hex(number),
+            'hash': '0x' + number.to_bytes(32, 'big').hex(),
+            'parentHash': '0x' + (number - 1).to_bytes(32, 'big').hex(),
+            'timestamp': hex(self.timestamp - 12 * (self.eth_block_number - number)),
+            'baseFeePerGas': hex(self.base_fee),
+            'gasLimit': hex(30_000_000),
+            'gasUsed': hex(15_000_000),
+            'miner': '0x' + '00' * 20,
+            'transactions': [],
+        }
+
+    def rpc_eth_getBalance(self, address, block_identifier='latest'):
+        return hex(self.balances.get(to_checksum_address(address), 0))
+
+    def rpc_eth_getTransactionCount(self, address, block_identifier='latest'):
+        return hex(self._pending_count(to_checksum_address(address)))
+
+    def rpc_eth_estimateGas(self, transaction, block_identifier=None):
+        return hex(self.gas_estimate)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return hex(self.priority_fee)
+
+    def rpc_eth_sendRawTransaction(self, raw_transaction):
+        raw = HexBytes(raw_transaction)
+        tx_hash = keccak(raw)
+        if tx_hash in self.known_hashes:
+            # Same signed transaction arriving through another endpoint
+            raise StubRPCError('already known')
+        sender = to_checksum_address(Account.recover_transaction(raw))
+        transaction = TypedTransaction.from_bytes(raw).as_dict()
+        nonce = transaction['nonce']
+        used = self.nonces.setdefault(sender, set())
+        if nonce in used:
+            raise StubRPCError('nonce too low')
+        if nonce > self._pending_count(sender) + 64:
+            raise StubRPCError('nonce too high')
+        used.add(nonce)
+        self.known_hashes.add(tx_hash)
+        self.transactions.append((sender, transaction))
+
+        if self.hold_transactions:
+            self.mempool.append((tx_hash, sender, transaction))
+        else:
+            self._include(tx_hash, sender, transaction)
+        return encode_hex(tx_hash)
+
+    def rpc_txpool_content(self):
+        pending = {}
+        for entry in self.mempool:
+            pending.setdefault(entry[1], {})[str(entry[2]['nonce'])] = self._transaction_json(*entry)
+        return {'pending': pending, 'queued': {}}
+
+    def _transaction_json(self, tx_hash, sender, transaction):
+        return {
+            'hash': encode_hex(tx_hash),
+            'from': sender,
+            'to': to_checksum_address(transaction['to']),
+            'nonce': hex(transaction['nonce']),
+            'value': hex(transaction['value']),
+            'input': encode_hex(transaction['data']),
+            'gas': hex(transaction['gas']),
+            'maxFeePerGas': hex(transaction['maxFeePerGas']),
+            'maxPriorityFeePerGas': hex(transaction['maxPriorityFeePerGas']),
+            'type': hex(2),
+            'blockHash': None,
+            'blockNumber': None,
+            'transactionIndex': None,
+        }
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        return self.receipts.get(tx_hash)
+
+    def rpc_eth_feeHistory(self, block_count, newest_block, reward_percentiles=None):
+        newest = self._block_number(newest_block)
+        count = int(block_count, 16) if isinstance(block_count, str) else block_count
+        oldest = max(newest - count + 1, 0)
+        blocks = range(oldest, newest + 1)
+        base_fees = [self.base_fees.get(number, self.base_fee) for number in blocks]
+        ratios = [self.gas_used_ratios.get(number, 0.5) for number in blocks]
+        # Next base fee by the EIP-1559 rule, in integer arithmetic as a node does
+        target = 15_000_000
+        gas_used = int(ratios[-1] * 2 * target)
+        delta = base_fees[-1] * abs(gas_used - target) // target // 8
+        base_fees.append(base_fees[-1] + max(delta, 1) if gas_used > target else base_fees[-1] - delta)
+        result = {
+            'oldestBlock': hex(oldest),
+            'baseFeePerGas': [hex(fee) for fee in base_fees],
+            'gasUsedRatio': ratios,
+        }
+        if reward_percentiles:
+            result['reward'] = [
+                [hex(self.priority_fee * percentile // 50) for percentile in reward_percentiles]
+                for _ in blocks
+            ]
+        return result
+
+    def rpc_eth_call(self, transaction, block_identifier='latest'):
+        self._call_block = self._block_number(block_identifier)
+        data = bytes.fromhex(transaction['data'][2:])
+        return '0x' + self._call(to_checksum_address(transaction['to']), data).hex()
+
+    def rpc_eth_getLogs(self, filter_params):
+        if self.failing_get_logs:
+            self.failing_get_logs -= 1
+            raise StubRPCError('upstream request timeout')
+        from_block = self._block_number(filter_params.get('fromBlock', 'latest'))
+        to_block = self._block_number(filter_params.get('toBlock', 'latest'))
+        address = filter_params.get('address') or []
+        if isinstance(address, str):
+            address = [address]
+        address = [to_checksum_address(item) for item in address]
+        topics = filter_params.get('topics') or []
+        topic0 = topics[0] if topics else None
+        if isinstance(topic0, str):
+            topic0 = [topic0]
+
+        matches = []
+        for log in self.logs:
+            if not from_block <= int(log['blockNumber'], 16) <= to_block:
+                continue
+            if address and log['address'] not in address:
+                continue
+            if topic0 and log['topics'][0] not in topic0:
+                continue
+            matches.append(log)
+        if self.max_logs_per_query is not None and len(matches) > self.max_logs_per_query:
+            raise StubRPCError(f"query returned more than {self.max_logs_per_query} results", code=-32005)
+        return matches
+
+    # Contract execution
+
+    def _block_number(self, block_identifier):
+        if block_identifier in ('latest', 'pending', 'safe', 'finalized'):
+            return self.eth_block_number
+        number = int(block_identifier, 16)
+        if number > self.eth_block_number:
+            raise StubRPCError(f"Block {number} not found")
+        return number
+
+    def _pending_count(self, address):
+        used = self.nonces.get(address, ())
+        count = 0
+        while count in used:
+            count += 1
+        return count
+
+    def _call(self, to, data):
+        selector, args_data = data[:4], data[4:]
+        if to == self.multicall_address:
+            abi = self._multicall_functions.get(selector)
+            prefix = 'multicall_'
+        elif to == self.contract_address:
+            abi = self._ethc_functions.get(selector)
+            prefix = 'ethc_'
+        else:
+            raise StubRPCError(f"No contract at {to}")
+        if abi is None:
+            raise StubRPCError('execution reverted')
+
+        input_types = [collapse_if_tuple(item) for item in abi['inputs']]
+        output_types = [collapse_if_tuple(item) for item in abi['outputs']]
+        args = decode(input_types, args_data) if input_types else ()
+        result = getattr(self, prefix + abi['name'])(*args)
+        return encode(output_types, [result])
+
+    def ethc_blockNumber(self):
+        return self.ethc_block
+
+    def ethc_lastBlockTime(self):
+        return self.last_block_time
+
+    def ethc_mineCost(self):
+        return self.mine_cost
+
+    def ethc_miningReward(self):
+        return self.mining_rewards.get(self._call_block, self.mining_reward)
+
+    def ethc_minersOfBlock(self, block_number):
+        return self.miners.get(block_number, [])
+
+    def ethc_minersOfBlockCount(self, block_number):
+        return len(self.miners.get(block_number, []))
+
+    def ethc_selectedMinerOfBlock(self, block_number):
+        return self.selected.get(block_number, '0x' + '00' * 20)
+
+    def multicall_aggregate3(self, calls):
+        results = []
+        for target, allow_failure, call_data in calls:
+            try:
+                results.append((True, self._call(to_checksum_address(target), call_data)))
+            except StubRPCError:
+                if not allow_failure:
+                    raise
+                results.append((False, b''))
+        return results
+
+    def multicall_getBlockNumber(self):
+        return self.eth_block_number
+
+    def multicall_getCurrentBlockTimestamp(self):
+        return self.timestamp
+
+    def multicall_getBasefee(self):
+        # As geth: BASEFEE is zeroed for calls that set no gas price
+        return 0
+
+    def multicall_getEthBalance(self, address):
+        return self.balances.get(to_checksum_address(address), 0)
+
+class StubProvider(BaseProvider):
+    """Web3 provider that answers requests from an EthcChainStub in-process"""
+
+    def __init__(self, chain):
+        self.chain = chain
+
+    def make_request(self, method, params):
+        try:
+            return {'jsonrpc': '2.0', 'id': 0, 'result': self.chain.handle(method, params)}
+        except StubRPCError as e:
+            return {'jsonrpc': '2.0', 'id': 0, 'error': {'code': e.code, 'message': str(e)}}
+
+    def is_connected(self):
+        return True
+
+def stub_web3(chain):
+    return build_web3(StubProvider(chain))
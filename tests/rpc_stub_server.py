@@ -0,0 +1,103 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tests.chain_stub import StubRPCError
+
+logger = logging.getLogger(__name__)
+
+class RPCStubServer:
+    """Local JSON-RPC HTTP server backed by an EthcChainStub
+
+    Each request sleeps for `delay` seconds before answering, to stand in for the
+    round-trip to a remote provider. Batched (array) requests are answered in one
+    response and pay the delay once. Setting `error_status` (e.g. 429) makes the
+    server refuse every request with that HTTP status, like a rate-limited provider.
+    `max_in_flight` is the most requests that were being answered at once.
+    """
+
+    def __init__(self, chain, delay=0.0, host='127.0.0.1', port=0, lock=None):
+        self.chain = chain
+        self.delay = delay
+        self.error_status = None
+        # Servers sharing one chain must share its lock too
+        self._lock = lock or threading.Lock()
+        self.http_requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                status = stub.error_status
+                if status:
+                    with stub._lock:
+                        stub.http_requests += 1
+                    data = b'{}'
+                else:
+                    data = json.dumps(stub.respond(json.loads(body))).encode()
+                self.send_response(status or 200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def respond(self, payload):
+        with self._lock:
+            self.http_requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            if isinstance(payload, list):
+                return [self._respond_one(request) for request in payload]
+            return self._respond_one(payload)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _respond_one(self, request):
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            with self._lock:
+                response['result'] = self.chain.handle(request['method'], request.get('params', []))
+        except StubRPCError as e:
+            response['error'] = {'code': e.code, 'message': str(e)}
+        return response
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.debug(f"RPC stub listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
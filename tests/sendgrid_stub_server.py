@@ -0,0 +1,65 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+class SendGridStubServer:
+    """Local stand-in for the SendGrid v3 API that records every mail/send request
+
+    Answers 202 Accepted after `delay` seconds. Statuses put in `statuses` are
+    returned first, one per request, to play rate limits and outages.
+    """
+
+    def __init__(self, delay=0.0, statuses=(), host='127.0.0.1', port=0):
+        self.delay = delay
+        self.statuses = list(statuses)
+        self.retry_after = None
+        self.requests = []  # (path, parsed body, Authorization header, status answered)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def mails(self):
+        """Bodies of the requests that were accepted"""
+        return [body for _, body, _, status in self.requests if status == 202]
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if stub.delay:
+                    time.sleep(stub.delay)
+                with stub._lock:
+                    status = stub.statuses.pop(0) if stub.statuses else 202
+                    stub.requests.append((self.path, body, self.headers.get('Authorization'), status))
+                self.send_response(status)
+                if status == 429 and stub.retry_after is not None:
+                    self.send_header('Retry-After', str(stub.retry_after))
+                data = b'' if status == 202 else json.dumps({'errors': [{'message': 'stub error'}]}).encode()
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
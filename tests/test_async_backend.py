@@ -0,0 +1,79 @@
+import asyncio
+import logging
+
+from web3 import Web3
+
+from logic.ethc_miner import ETHCMiner
+from tests.chain_stub import EthcChainStub
+from tests.rpc_stub_server import RPCStubServer
+from util.alchemy_connector import PooledAsyncHTTPProvider, build_async_web3, build_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINER_A = '0x1111111111111111111111111111111111111111'
+
+def make_chain():
+    chain = EthcChainStub()
+    for block in range(90, 100):
+        chain.add_miner(block, MINER_A, mine_count=block - 89)
+    return chain
+
+def test_async_backend_reads_contract_state():
+    chain = make_chain()
+    with RPCStubServer(chain) as server:
+        async def run():
+            provider = PooledAsyncHTTPProvider(server.url)
+            miner = ETHCMiner(None, web3=build_async_web3(provider),
+                              contract_address=chain.contract_address)
+            try:
+                stats = await miner.get_mining_stats()
+                block_miners = await miner.get_block_miners(95)
+            finally:
+                await provider.close()
+            return stats, block_miners
+
+        stats, block_miners = asyncio.run(run())
+
+    assert stats['current_block'] == chain.ethc_block
+    assert block_miners['miner_count'] == 6
+
+def test_async_backend_overlaps_requests():
+    """Reads for many blocks are in flight together instead of one after another"""
+    chain = make_chain()
+    blocks = list(range(90, 100))
+
+    with RPCStubServer(chain, delay=0.05) as server:
+        sync_miner = ETHCMiner(None, web3=build_web3(Web3.HTTPProvider(server.url)),
+                               contract_address=chain.contract_address)
+        asyncio.run(sync_miner.get_block_miners(blocks[0]))  # warm chain id cache
+        chain.request_counts.clear()
+        server.http_requests = server.max_in_flight = 0
+        sync_results = asyncio.run(sync_miner.get_blocks_miners(blocks))
+        sync_requests, sync_round_trips = dict(chain.request_counts), server.http_requests
+        sync_overlap = server.max_in_flight
+
+        async def run():
+            provider = PooledAsyncHTTPProvider(server.url)
+            miner = ETHCMiner(None, web3=build_async_web3(provider),
+                              contract_address=chain.contract_address)
+            try:
+                await miner.get_block_miners(blocks[0])  # warm chain id cache and pool
+                chain.request_counts.clear()
+                server.http_requests = server.max_in_flight = 0
+                return await miner.get_blocks_miners(blocks)
+            finally:
+                await provider.close()
+
+        async_results = asyncio.run(run())
+        async_requests, async_round_trips = dict(chain.request_counts), server.http_requests
+        async_overlap = server.max_in_flight
+
+    logger.info(f"sync: {sync_round_trips} round-trips, {sync_overlap} at once; "
+                f"async: {async_round_trips} round-trips, {async_overlap} at once")
+    assert async_results == sync_results
+    # The same reads, no more round-trips, but answered side by side rather than in turn
+    assert async_requests == sync_requests
+    assert async_round_trips <= sync_round_trips
+    assert sync_overlap == 1
+    assert async_overlap > 1
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from collections import Counter
+
+import pytest
+
+from database.connection import create_session_factory
+from logic.backfill import Backfill
+from logic.ethc_miner import ETHCMiner
+from logic.miner_index import MinerIndex
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINERS = ['0x' + f"{i:040x}" for i in range(1, 6)]
+
+def make_history(chain, ethc_blocks=40):
+    """Five Ethereum blocks per ETHC block, with a few mines in each"""
+    expected = Counter()
+    for _ in range(ethc_blocks):
+        chain.advance()
+        chain.start_new_block()
+        for step in range(4):
+            chain.advance()
+            miner = MINERS[(chain.ethc_block + step) % len(MINERS)]
+            chain.emit_mine(miner, mine_count=step + 1)
+            expected[chain.ethc_block] += step + 1
+    chain.advance(20)
+    return expected
+
+def make_index(chain, tmp_path):
+    miner = ETHCMiner(None, web3=stub_web3(chain), contract_address=chain.contract_address)
+    session_factory = create_session_factory(f"sqlite:///{tmp_path / 'history.db'}")
+    return MinerIndex(miner, session_factory=session_factory, confirmations=12)
+
+def test_backfill_splits_chunks_and_rebuilds_history(tmp_path):
+    chain = EthcChainStub()
+    deploy_block = chain.eth_block_number + 1
+    expected = make_history(chain)
+    chain.max_logs_per_query = 25
+
+    index = make_index(chain, tmp_path)
+    backfill = Backfill(index, from_block=deploy_block, concurrency=3, rate_limit=1000,
+                        chunk_size=100, target_results=20)
+    stats = asyncio.run(backfill.run())
+
+    assert stats['splits'] > 0
+    assert stats['events'] == len(chain.logs)
+    assert index.last_block == chain.eth_block_number - 12
+    assert index.first_complete_block is not None
+    for ethc_block, total in expected.items():
+        assert index.block_stats(ethc_block)['total_mine_count'] == total
+
+def test_interrupted_backfill_resumes_without_double_counting(tmp_path):
+    chain = EthcChainStub()
+    deploy_block = chain.eth_block_number + 1
+    expected = make_history(chain)
+
+    index = make_index(chain, tmp_path)
+    to_block = chain.eth_block_number - 12
+
+    # The first run writes a few chunks, then the provider keeps failing
+    first = Backfill(index, from_block=deploy_block, to_block=to_block, concurrency=1,
+                     rate_limit=1000, chunk_size=10, max_chunk_size=10, max_retries=0)
+    chain.max_logs_per_query = None
+
+    async def interrupted():
+        original = first.reader.get_logs
+        calls = []
+
+        async def flaky_get_logs(from_block, to_block):
+            calls.append(from_block)
+            if len(calls) > 5:
+                raise ValueError('upstream request timeout')
+            return await original(from_block, to_block)
+
+        first.reader.get_logs = flaky_get_logs
+        await first.run()
+
+    with pytest.raises(ValueError):
+        asyncio.run(interrupted())
+    del index.reader.get_logs
+    assert first.missing_ranges()
+
+    second = Backfill(index, from_block=deploy_block, to_block=to_block, concurrency=2,
+                      rate_limit=1000, chunk_size=10)
+    asyncio.run(second.run())
+
+    assert not second.missing_ranges()
+    for ethc_block, total in expected.items():
+        assert index.block_stats(ethc_block)['total_mine_count'] == total
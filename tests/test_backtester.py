@@ -0,0 +1,108 @@
+import asyncio
+import logging
+
+import numpy as np
+
+from logic.backtester import (
+    Backtester, BlockHistory, EVStrategy, FixedStrategy, SolverStrategy, fetch_gas_prices, load_history
+)
+from logic.history_archive import HistoryArchive
+from logic.strategy import MineStrategy
+from tests.test_history_archive import OURS, make_chain, make_miner, sync
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINE_COST = 10 ** 15
+MINING_REWARD = 50 * 10 ** 18
+GAS_PRICE = 10 * 10 ** 9
+
+def make_history(others, ethc_price=0.001, mining_reward=MINING_REWARD):
+    others = np.asarray(others, dtype=np.float64)
+    count = len(others)
+    return BlockHistory(
+        ethc_block=np.arange(count, dtype=np.uint64),
+        others=others,
+        mine_cost=np.full(count, float(MINE_COST)),
+        mining_reward=np.full(count, float(mining_reward)),
+        gas_price=np.full(count, float(GAS_PRICE)),
+        ethc_price=np.full(count, ethc_price)
+    )
+
+def test_ev_strategy_matches_solver():
+    rng = np.random.default_rng(1)
+    history = make_history(rng.integers(0, 2000, 300))
+    history = history._replace(ethc_price=rng.uniform(0.00001, 0.002, 300))
+
+    fast = EVStrategy(max_mine_count=500).mine_counts(history)
+    slow = SolverStrategy(MineStrategy(max_mine_count=500)).mine_counts(history)
+
+    assert fast.tolist() == slow.tolist()
+    assert 0 < np.count_nonzero(fast) < len(fast)
+
+def test_expected_profit_and_variance():
+    history = make_history([0, 3, 1000])
+    backtester = Backtester(history, trials=50)
+
+    result = backtester.run(FixedStrategy(mine_count=1, max_competition=10))
+
+    reward = MINING_REWARD * 0.001
+    cost = MINE_COST + (50_000 + 25_000) * GAS_PRICE
+    assert result.blocks == 3
+    assert result.blocks_entered == 2
+    assert result.expected_wins == 1 + 1 / 4
+    assert np.isclose(result.expected_profit, 1.25 * reward - 2 * cost)
+    assert np.isclose(result.variance, 0.25 * 0.75 * reward ** 2)
+    assert np.isclose(result.roi, result.expected_profit / (2 * cost))
+
+def test_drawdown_of_certain_losses():
+    # Alone in every block, so every block is won; the reward doesn't cover the cost
+    history = make_history([0] * 10, ethc_price=0.0)
+    cost = 2 * MINE_COST + (50_000 + 2 * 25_000) * GAS_PRICE
+
+    # The running total and peak carry over from one chunk of blocks to the next
+    for chunk_size in (3, 4096):
+        result = Backtester(history, trials=20, chunk_size=chunk_size).run(FixedStrategy(mine_count=2))
+        assert np.isclose(result.max_drawdown, 10 * cost)
+        assert np.isclose(result.drawdown_p95, 10 * cost)
+
+def test_drawdown_recovers_after_a_win():
+    # Lose 3 blocks to a certain competitor, win one alone, then lose 2
+    history = make_history([10 ** 9] * 3 + [0] + [10 ** 9] * 2, ethc_price=0.1)
+    result = Backtester(history, trials=5, chunk_size=2).run(FixedStrategy(mine_count=1))
+
+    cost = MINE_COST + 75_000 * GAS_PRICE
+    assert np.isclose(result.max_drawdown, 3 * cost, rtol=1e-6)
+
+def test_sweep_in_process_pool_matches_serial():
+    rng = np.random.default_rng(3)
+    history = make_history(rng.integers(0, 500, 2000))
+    strategies = [EVStrategy(margin=margin, price_factor=factor) for margin in (0, 0.2) for factor in (0.5, 1, 2)]
+    backtester = Backtester(history, trials=20)
+
+    parallel = backtester.sweep(strategies, workers=2)
+    serial = backtester.sweep(strategies, workers=1)
+
+    assert [repr(result.config) for result in parallel] == [repr(strategy) for strategy in strategies]
+    assert [result.expected_profit for result in parallel] == [result.expected_profit for result in serial]
+    assert [result.max_drawdown for result in parallel] == [result.max_drawdown for result in serial]
+    # Believing a higher price than the real one mines more and loses money
+    assert parallel[2].mines > parallel[1].mines
+    assert parallel[1].expected_profit > parallel[2].expected_profit
+
+def test_history_from_archive(tmp_path):
+    chain, first = make_chain()
+    miner = make_miner(chain)
+    archive = HistoryArchive(path=str(tmp_path))
+    sync(archive, chain, miner)
+    chain.base_fees[int(archive.blocks()['eth_block'][0])] = 2 * chain.base_fee
+
+    gas_prices = asyncio.run(fetch_gas_prices(miner, archive.blocks()['eth_block']))
+    history = load_history(archive, exclude=[OURS], gas_prices=gas_prices, ethc_price=0.001)
+
+    assert history.ethc_block.tolist() == [first, first + 1, first + 2]
+    assert history.others.tolist() == [7, 2, 7]
+    assert history.mine_cost.tolist() == [chain.mine_cost] * 3
+    assert history.mining_reward.tolist() == [chain.mining_reward] * 3
+    assert history.gas_price.tolist() == [2 * chain.base_fee + chain.priority_fee] + [chain.base_fee + chain.priority_fee] * 2
+    assert Backtester(history, trials=10).run(EVStrategy()).blocks == 3
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+
+from logic.block_scheduler import BlockScheduler, ChainClock
+from logic.chain_snapshot import ChainSnapshot
+from tests.chain_stub import EthcChainStub
+from tests.test_chain_snapshot import make_miner
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def snapshot(eth_block, timestamp, ethc_block=100, last_block_time=1000):
+    return ChainSnapshot(eth_block, timestamp, 10 ** 10, ethc_block, last_block_time, 10 ** 15, 50 * 10 ** 18, 0)
+
+def test_clock_keeps_the_fastest_head():
+    clock = ChainClock()
+    # Delivered 2.0s, 0.3s and 1.1s after their slots started
+    clock.observe(10, 1000, seen_at=52.0)
+    clock.observe(11, 1012, seen_at=62.3)
+    clock.observe(12, 1024, seen_at=75.1)
+    assert clock.offset == 1012 - 62.3
+    # Seeing a head again says nothing new
+    assert not clock.observe(12, 1024, seen_at=80.0)
+    assert clock.to_local(1036) == 1036 - clock.offset
+    assert clock.slot_at_or_after(1037) == (14, 1048)
+    assert clock.slot_at_or_after(1048) == (14, 1048)
+
+def test_window_ends_at_the_last_slot_before_close():
+    scheduler = BlockScheduler(lead_time=2.5)
+    now = time.monotonic()
+    scheduler.observe(snapshot(500, 1030), seen_at=now)
+
+    window = scheduler.window()
+    assert (window.ethc_block, window.opens_at, window.closes_at) == (100, 1000, 1060)
+    # Slots at 1042 and 1054 still count, the one at 1066 opens the next block
+    assert (window.last_slot, window.last_slot_time) == (502, 1054)
+    assert abs(window.send_at - (now + 24 - 2.5)) < 1e-6
+
+    # A slot stamped exactly at the close already belongs to the next block
+    scheduler.observe(snapshot(501, 1036), seen_at=now + 6)
+    assert scheduler.window().last_slot_time == 1048
+
+def test_missed_window_moves_to_the_next_one():
+    scheduler = BlockScheduler(lead_time=2.5)
+    # The head at 1054 arrived 1s ago, so the send time for it has passed
+    scheduler.observe(snapshot(500, 1054), seen_at=time.monotonic() - 1)
+
+    assert scheduler.window(skip_missed=False).last_slot_time == 1054
+    window = scheduler.window()
+    assert (window.ethc_block, window.opens_at, window.closes_at) == (101, 1066, 1126)
+    assert (window.last_slot, window.last_slot_time) == (505, 1114)
+
+def test_wakes_within_a_few_milliseconds():
+    scheduler = BlockScheduler(lead_time=0.5)
+    # The next slot, the last one of the window, starts 0.55s from now
+    scheduler.observe(snapshot(500, 1036), seen_at=time.monotonic() - 12 + 0.55)
+
+    window = asyncio.run(scheduler.wait())
+    error = time.monotonic() - window.send_at
+    logger.info(f"Woke {error * 1000:.2f} ms late")
+    assert window.last_slot_time == 1048
+    assert 0 <= error < 0.005
+
+def test_wait_for_next_block_sleeps_until_the_closing_head():
+    chain = EthcChainStub(timestamp=1_700_000_000, last_block_time=1_700_000_000 - 48)
+    miner = make_miner(chain)
+    miner.scheduler = BlockScheduler()
+    # The current head arrived 11.7s ago, so the one closing the window is due in 0.3s
+    miner.scheduler.clock.observe(chain.eth_block_number, chain.timestamp, seen_at=time.monotonic() - 11.7)
+
+    async def produce_closing_head():
+        await asyncio.sleep(0.35)
+        chain.advance()
+        chain.start_new_block()
+
+    async def run():
+        producer = asyncio.ensure_future(produce_closing_head())
+        started = time.monotonic()
+        block_info = await miner.wait_for_next_block(timeout=5)
+        await producer
+        return block_info, time.monotonic() - started
+
+    chain.request_counts.clear()
+    block_info, elapsed = asyncio.run(run())
+    assert block_info['current_block'] == 101
+    assert 0.3 < elapsed < 1.0
+    # Asleep until the head is due: a snapshot before, a cheap head check and a snapshot after,
+    # each snapshot two calls as the ETHC block is new to the miner
+    assert chain.request_counts['eth_call'] <= 4
+    assert chain.request_counts['eth_blockNumber'] <= 2
+
+def test_wait_for_next_block_without_scheduler_waits_out_the_window(monkeypatch):
+    chain = EthcChainStub(timestamp=1_700_000_000, last_block_time=1_700_000_000)
+    miner = make_miner(chain)
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        # Each check waits for the next Ethereum head
+        sleeps.append(seconds)
+        chain.advance()
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+    block_info = asyncio.run(miner.wait_for_next_block(timeout=5))
+    # Five 10s waits used to give up here, with the window still open
+    assert block_info['next_block_available']
+    assert block_info['time_since_last'] == 60
+    assert len(sleeps) == 5 and all(0 < seconds <= 10 for seconds in sleeps)
+
+def test_block_info_reports_the_window_closing():
+    assert not snapshot(500, 1059).to_block_info()['next_block_available']
+    assert snapshot(500, 1060).to_block_info()['next_block_available']
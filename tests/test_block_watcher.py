@@ -0,0 +1,104 @@
+import asyncio
+import logging
+
+from logic.block_watcher import MineEvent, NewBlockEvent
+from logic.ethc_miner import ETHCMiner
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINER_A = '0x1111111111111111111111111111111111111111'
+MINER_B = '0x2222222222222222222222222222222222222222'
+
+def make_miner(chain):
+    return ETHCMiner(None, web3=stub_web3(chain), contract_address=chain.contract_address)
+
+def test_poll_delivers_typed_events_and_resumes(tmp_path):
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+    start_block = chain.eth_block_number + 1
+
+    chain.advance()
+    chain.emit_mine(MINER_A, mine_count=3)
+    chain.advance()
+    chain.emit_mine(MINER_B)
+    chain.start_new_block(winner=MINER_A)
+
+    async def run():
+        watcher = miner.get_block_watcher(start_block=start_block, data_dir=tmp_path)
+        queue = watcher.subscribe()
+        delivered = await watcher.poll()
+        events = [queue.get_nowait() for _ in range(delivered)]
+        return watcher, events
+
+    watcher, events = asyncio.run(run())
+
+    assert [type(event) for event in events] == [MineEvent, MineEvent, NewBlockEvent]
+    assert events[0].miner == miner.web3.to_checksum_address(MINER_A)
+    assert events[0].mine_count == 3
+    assert events[0].ethc_block == chain.ethc_block - 1
+    assert events[2].ethc_block == chain.ethc_block
+    assert watcher.last_block == chain.eth_block_number
+
+    # A new watcher picks up from the saved cursor and only reads new blocks
+    chain.advance()
+    chain.emit_mine(MINER_B, mine_count=2)
+
+    async def resume():
+        resumed = miner.get_block_watcher(start_block=start_block, data_dir=tmp_path)
+        queue = resumed.subscribe()
+        await resumed.poll()
+        return queue
+
+    queue = asyncio.run(resume())
+    assert queue.qsize() == 1
+    assert queue.get_nowait().mine_count == 2
+
+def test_full_queue_holds_back_cursor(tmp_path):
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+    start_block = chain.eth_block_number + 1
+    chain.advance()
+    for _ in range(3):
+        chain.emit_mine(MINER_A)
+
+    async def run():
+        watcher = miner.get_block_watcher(start_block=start_block, data_dir=tmp_path)
+        queue = watcher.subscribe(maxsize=1)
+        poll = asyncio.ensure_future(watcher.poll())
+        await asyncio.sleep(0.05)
+        blocked_at = watcher.last_block
+        assert not poll.done()
+
+        received = []
+        while len(received) < 3:
+            received.append(await queue.get())
+        await poll
+        return blocked_at, watcher.last_block, received
+
+    blocked_at, last_block, received = asyncio.run(run())
+    assert blocked_at == start_block - 1
+    assert last_block == chain.eth_block_number
+    assert len(received) == 3
+
+def test_wait_for_next_block_returns_on_event(tmp_path):
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+
+    async def run():
+        watcher = miner.get_block_watcher(poll_interval=0.01, data_dir=tmp_path)
+        watcher_task = asyncio.ensure_future(watcher.run())
+        waiter = asyncio.ensure_future(miner.wait_for_next_block(watcher=watcher, timeout=5))
+        await asyncio.sleep(0.05)
+
+        chain.advance()
+        chain.start_new_block()
+        block_info = await waiter
+
+        watcher.stop()
+        await watcher_task
+        return block_info
+
+    block_info = asyncio.run(run())
+    assert block_info['current_block'] == chain.ethc_block
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from logic.block_watcher import MineEvent, NewBlockEvent
+from logic.log_decoder import LogDecoder
+from tests.bench_simulator import make_accounts, make_miner
+from tests.chain_simulator import ChainSimulator
+from util.alchemy_connector import PooledAsyncHTTPProvider, build_async_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def events(simulator):
+    return LogDecoder().decode_many(simulator.chain.logs)
+
+def test_same_seed_same_chain():
+    first, second, other = ChainSimulator(seed=1), ChainSimulator(seed=1), ChainSimulator(seed=2)
+    for simulator in (first, second, other):
+        simulator.step(40)
+
+    assert first.chain.logs == second.chain.logs
+    assert first.chain.selected == second.chain.selected
+    assert first.chain.logs != other.chain.logs
+
+def test_block_cadence_and_competitors():
+    simulator = ChainSimulator(competitors=10, competitor_rate=1.0, competitor_mines=(2, 2))
+    start = simulator.chain.ethc_block
+    simulator.step(60)
+
+    decoded = events(simulator)
+    opened = [event.ethc_block for event in decoded if isinstance(event, NewBlockEvent)]
+    # 60 Ethereum blocks of 12s are 12 ETHC blocks of 60s
+    assert opened == list(range(start + 1, start + 13))
+    for ethc_block in opened[:-1]:
+        mines = [event for event in decoded if isinstance(event, MineEvent) and event.ethc_block == ethc_block]
+        assert len(mines) == 10
+        assert sum(event.mine_count for event in mines) == 20
+        # Winners are drawn from the block's entries
+        assert simulator.chain.selected[ethc_block] in simulator.competitors
+
+def test_base_fee_moves_by_eip1559():
+    simulator = ChainSimulator(seed=3)
+    fees = []
+    for _ in range(20):
+        simulator.step()
+        fees.append(simulator.chain.base_fee)
+
+    assert len(set(fees)) > 1
+    for before, after in zip(fees, fees[1:]):
+        assert abs(after - before) <= before // 8 + 1
+
+def test_mines_land_in_the_next_block_over_http():
+    simulator = ChainSimulator(competitors=0)
+    accounts = make_accounts(3)
+    simulator.fund([account.address for account in accounts])
+
+    async def run(url):
+        provider = PooledAsyncHTTPProvider(url)
+        miner = make_miner(build_async_web3(provider), simulator, accounts)
+        try:
+            return await miner.mine_all(mine_count=2)
+        finally:
+            await provider.close()
+
+    with simulator.serve(delay=0.01) as server:
+        simulator.until_next_ethc_block()
+        results = asyncio.run(run(server.url))
+    assert all(isinstance(tx_hash, bytes) for tx_hash in results.values())
+
+    # Held in the mempool until the simulator produces a block
+    ethc_block = simulator.chain.ethc_block
+    assert simulator.chain.miners.get(ethc_block) is None
+    simulator.step()
+    assert sorted(set(simulator.chain.miners[ethc_block])) == sorted(account.address for account in accounts)
+    assert len(simulator.chain.miners[ethc_block]) == 6
+
+def test_run_steps_on_a_timer():
+    simulator = ChainSimulator()
+    start = simulator.chain.eth_block_number
+
+    async def run():
+        task = asyncio.ensure_future(simulator.run(speed=1200))
+        await asyncio.sleep(0.1)
+        simulator.stop()
+        await task
+
+    asyncio.run(run())
+    assert simulator.chain.eth_block_number - start >= 3
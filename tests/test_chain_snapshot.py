@@ -0,0 +1,108 @@
+import asyncio
+import logging
+
+from logic.ethc_miner import ETHCMiner
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINER_A = '0x1111111111111111111111111111111111111111'
+MINER_B = '0x2222222222222222222222222222222222222222'
+
+def make_miner(chain):
+    return ETHCMiner(None, web3=stub_web3(chain), contract_address=chain.contract_address)
+
+def test_snapshot_reads_state_in_one_call():
+    """Snapshot after the first one costs a single eth_call"""
+    chain = EthcChainStub()
+    chain.add_miner(chain.ethc_block, MINER_A, mine_count=3)
+    miner = make_miner(chain)
+
+    async def run():
+        await miner.get_snapshot()  # learns the chain id and current ETHC block
+        chain.request_counts.clear()
+        return await miner.get_snapshot()
+
+    snapshot = asyncio.run(run())
+    logger.info(f"Snapshot: {snapshot}")
+
+    assert chain.request_counts == {'eth_call': 1}
+    assert snapshot.eth_block_number == chain.eth_block_number
+    assert snapshot.ethc_block == chain.ethc_block
+    assert snapshot.mine_cost == chain.mine_cost
+    assert snapshot.miner_count == 3
+    assert snapshot.time_since_last == 30
+
+def test_snapshot_base_fee_comes_from_fee_history():
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+
+    async def run():
+        first = await miner.get_snapshot()
+        await miner.fee_oracle.estimate(head=first.eth_block_number)
+        chain.request_counts.clear()
+        return first, await miner.get_snapshot()
+
+    first, second = asyncio.run(run())
+
+    # Unknown rather than the 0 that BASEFEE reads in an eth_call, and no extra request once fetched
+    assert first.base_fee is None
+    assert second.base_fee == chain.base_fee
+    assert 'eth_feeHistory' not in chain.request_counts
+
+def test_snapshot_follows_ethc_block_rollover():
+    """A new ETHC block costs one extra call pinned to the same Ethereum block"""
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+    asyncio.run(miner.get_snapshot())
+
+    chain.ethc_block += 1
+    chain.add_miner(chain.ethc_block, MINER_B)
+    chain.request_counts.clear()
+    snapshot = asyncio.run(miner.get_snapshot())
+
+    assert chain.request_counts == {'eth_call': 2}
+    assert snapshot.ethc_block == chain.ethc_block
+    assert snapshot.miner_count == 1
+
+def test_block_methods_read_from_snapshot():
+    chain = EthcChainStub()
+    chain.add_miner(chain.ethc_block, MINER_A)
+    chain.add_miner(chain.ethc_block, MINER_B, mine_count=2)
+    chain.selected[chain.ethc_block] = MINER_B
+    miner = make_miner(chain)
+
+    async def run():
+        await miner.get_snapshot()
+        # The block watcher confirms the head with eth_blockNumber
+        miner.web3.eth.block_number
+        chain.request_counts.clear()
+        stats = await miner.get_mining_stats()
+        block_miners = await miner.get_block_miners(chain.ethc_block)
+        probability = await miner.estimate_mining_probability(chain.ethc_block)
+        return stats, block_miners, probability
+
+    stats, block_miners, probability = asyncio.run(run())
+
+    # The probability snapshot repeats the stats snapshot at the same head and is served from cache
+    assert chain.request_counts == {'eth_call': 2}
+    assert stats['current_block'] == chain.ethc_block
+    assert stats['mining_reward'] == chain.mining_reward
+    assert block_miners['miner_count'] == 3
+    assert block_miners['miners'][0] == miner.web3.to_checksum_address(MINER_A)
+    assert block_miners['selected_miner'] == miner.web3.to_checksum_address(MINER_B)
+    assert float(probability) == 0.25
+
+def test_halving_info_reads_the_reward_at_each_head():
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+    before = asyncio.run(miner.get_halving_info())
+
+    # A halving only shows up as a lower miningReward
+    chain.advance()
+    chain.mining_reward //= 2
+    after = asyncio.run(miner.get_halving_info())
+
+    assert before['current_block']['current_block'] == chain.ethc_block
+    assert before['mining_reward'] == 2 * after['mining_reward'] == 2 * chain.mining_reward
@@ -0,0 +1,116 @@
+import logging
+
+from eth_utils import to_checksum_address
+
+from logic.block_watcher import MineEvent, NewBlockEvent
+from logic.chain_snapshot import ChainSnapshot
+from logic.competition_model import CompetitionModel
+from logic.strategy import MineStrategy
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EARLY = to_checksum_address('0x' + '11' * 20)
+LATE = to_checksum_address('0x' + '22' * 20)
+OURS = to_checksum_address('0x' + '33' * 20)
+
+def open_block(model, ethc_block):
+    eth_block = 1000 + ethc_block * 5
+    model.observe(NewBlockEvent(ethc_block, eth_block, None, 0))
+    return eth_block
+
+def mine(model, ethc_block, eth_block, miner, mine_count):
+    model.observe(MineEvent(ethc_block, miner, mine_count, eth_block, None, 0))
+
+def train(model, blocks=80):
+    """EARLY mines 10 right away every block, LATE mines 20 four Ethereum blocks in, every other block"""
+    for ethc_block in range(blocks):
+        eth_block = open_block(model, ethc_block)
+        mine(model, ethc_block, eth_block, EARLY, 10)
+        mine(model, ethc_block, eth_block, OURS, 5)
+        if ethc_block % 2:
+            mine(model, ethc_block, eth_block + 4, LATE, 20)
+    return open_block(model, blocks)
+
+def test_learns_miner_statistics():
+    model = CompetitionModel(exclude=[OURS])
+    train(model)
+
+    early, late = model.miner_stats(EARLY), model.miner_stats(LATE)
+    assert abs(early['participation'] - 1) < 1e-9
+    assert abs(late['participation'] - 0.5) < 0.05
+    assert early['mean_count'] == 10 and early['std_count'] == 0
+    assert late['mean_count'] == 20
+    assert early['timing'][0] == 1
+    assert abs(late['timing'][48 // 5] - 1) < 1e-9
+    assert OURS not in model.addresses
+
+def test_forecast_prices_in_late_entrants():
+    model = CompetitionModel(exclude=[OURS])
+    eth_block = train(model)
+    mine(model, 80, eth_block, EARLY, 10)
+
+    early = model.forecast(elapsed=2)
+    assert early.ethc_block == 80
+    assert early.observed == 10
+    # LATE still enters about half the time
+    assert abs(early.expected - 20) < 1.5
+    assert 8 < early.std < 11
+
+    # Past the point LATE always shows up by, its absence means it sat this block out
+    after = model.forecast(elapsed=55)
+    assert abs(after.expected - 10) < 1e-6
+
+    mine(model, 80, eth_block + 4, LATE, 20)
+    assert abs(model.forecast(eth_block=eth_block + 4).expected - 30) < 0.01
+
+def test_miners_that_stop_fade_out():
+    model = CompetitionModel()
+    eth_block = train(model, blocks=40)
+    for ethc_block in range(40, 140):
+        mine(model, ethc_block, eth_block, EARLY, 10)
+        eth_block = open_block(model, ethc_block + 1)
+
+    assert model.miner_stats(LATE)['participation'] < 0.01
+    assert model.miner_stats(OURS)['participation'] < 0.01
+    assert abs(model.forecast(elapsed=0).expected - 10) < 0.5
+
+def test_newcomers_are_expected():
+    model = CompetitionModel()
+    train(model, blocks=2)
+    for ethc_block in range(2, 60):
+        eth_block = open_block(model, ethc_block)
+        newcomer = to_checksum_address(f"0x{ethc_block + 100:040x}")
+        mine(model, ethc_block, eth_block, newcomer, 4)
+    open_block(model, 60)
+
+    assert abs(model.newcomer_mean - 4) < 0.3
+    assert len(model.addresses) == 3 + 58
+    assert model.forecast(elapsed=0).expected > 3.5
+
+def test_joined_mid_block_is_not_learned():
+    model = CompetitionModel()
+    mine(model, 7, 2000, EARLY, 10)
+    assert model.forecast(elapsed=10).observed == 10
+    eth_block = open_block(model, 8)
+
+    assert model.blocks_closed == 0
+    mine(model, 8, eth_block, EARLY, 3)
+    open_block(model, 9)
+    assert model.miner_stats(EARLY)['mean_count'] == 3
+
+def test_strategy_sizes_on_forecast():
+    model = CompetitionModel(exclude=[OURS])
+    eth_block = train(model)
+    mine(model, 80, eth_block, EARLY, 10)
+    forecast = model.forecast(elapsed=2)
+    snapshot = ChainSnapshot(eth_block, 1_700_000_002, 10 ** 10, 80, 1_700_000_000, 10 ** 15, 50 * 10 ** 18, 10)
+    strategy = MineStrategy()
+
+    on_snapshot = strategy.decide(snapshot, 10 ** 10, 0.001)
+    on_forecast = strategy.decide(snapshot, 10 ** 10, 0.001, forecast=forecast)
+    cautious = strategy.decide(snapshot, 10 ** 10, 0.001, forecast=forecast, caution=2)
+
+    assert on_forecast == strategy.solve(forecast.expected, 10 ** 15, 50 * 10 ** 18, 10 ** 10, 0.001)
+    assert on_forecast.win_probability < on_snapshot.win_probability
+    assert cautious.win_probability < on_forecast.win_probability
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from config import constants
+from logic.earnings_report import EarningsReport
+from logic.tx_tracker import _now, hour_of
+from tests.sendgrid_stub_server import SendGridStubServer
+from tests.test_nonce_manager import ACCOUNTS, make_chain
+from tests.test_tx_tracker import make_tracker
+from util.notification_outbox import NotificationOutbox
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_rollups_follow_the_tracker_and_feed_the_email(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, 'DEV_EMAIL', 'admin@example.com')
+    monkeypatch.setattr(constants, 'HOST', 'miner.example.com')
+    chain = make_chain()
+    chain.hold_transactions = True
+    miner, tracker = make_tracker(chain, tmp_path, ethc_price=0.001)
+
+    async def mine_one_block():
+        await miner.mine_all(mine_count=2)
+        chain.include_pending()
+        await tracker.step()
+        chain.advance()
+        chain.start_new_block(winner=ACCOUNTS[1].address)
+        tracker.close_block(chain.ethc_block - 1)
+        await tracker.step()
+
+    asyncio.run(mine_one_block())
+    hour = hour_of(_now())
+    gas_paid = sum(record['gas_paid'] for record in (tracker.get(tx_hash) for tx_hash in list(chain.receipts)))
+
+    async def report(server):
+        outbox = NotificationOutbox(api_key='SG.test', host=server.url).start()
+        earnings = EarningsReport(outbox, session_factory=tracker.session_factory)
+        rollup = earnings.rollup(hour)
+        earnings.send(hour)
+        await outbox.close()
+        return rollup
+
+    with SendGridStubServer() as server:
+        rollup = asyncio.run(report(server))
+
+    value = len(ACCOUNTS) * 2 * chain.mine_cost
+    reward_eth = chain.mining_reward // 1000
+    assert rollup['transactions'] == len(ACCOUNTS)
+    assert rollup['mine_count'] == 2 * len(ACCOUNTS)
+    assert (rollup['confirmed'], rollup['failed'], rollup['dropped']) == (len(ACCOUNTS), 0, 0)
+    assert rollup['value'] == value
+    assert rollup['gas_paid'] == gas_paid
+    assert (rollup['blocks_entered'], rollup['wins']) == (1, 1)
+    assert rollup['reward'] == chain.mining_reward
+    assert rollup['net_profit'] == reward_eth - value - gas_paid
+
+    (mail,) = server.mails
+    assert mail['subject'].startswith(f"ETHC earnings {hour:%Y-%m-%d %H:00}")
+    text = mail['content'][0]['value']
+    assert 'Blocks won / decided: 1 / 1' in text
+    assert 'ETHC won: 50.0000' in text
+    assert f"Net profit (ETH): {(reward_eth - value - gas_paid) / 10 ** 18:+.6f}" in text
+
+def test_quiet_hour_reports_zeros(tmp_path):
+    _, tracker = make_tracker(make_chain(), tmp_path)
+    earnings = EarningsReport(outbox=None, session_factory=tracker.session_factory)
+
+    assert earnings.rollup(hour_of(_now())) is None
+    subject, text, _ = earnings.summary(hour_of(_now()))
+    assert 'Mines sent: 0' in text
+    assert 'Net profit (ETH): +0.000000' in text
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from logic.fee_oracle import FeeOracle, URGENCY_PROFILES, max_base_fee, next_base_fee
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_next_base_fee_follows_eip1559():
+    base_fee = 10 ** 10
+    assert next_base_fee(base_fee, 0.5) == base_fee
+    assert next_base_fee(base_fee, 1.0) == base_fee * 9 // 8
+    assert next_base_fee(base_fee, 0.0) == base_fee * 7 // 8
+    assert max_base_fee(base_fee, 2) == base_fee * 9 // 8 * 9 // 8
+
+def test_prediction_matches_node():
+    chain = EthcChainStub()
+    chain.gas_used_ratios[chain.eth_block_number] = 0.8
+    oracle = FeeOracle(stub_web3(chain))
+
+    async def run():
+        await oracle.update()
+        return oracle.predict_base_fee()
+
+    predicted = asyncio.run(run())
+    history = stub_web3(chain).eth.fee_history(1, 'latest')
+
+    assert predicted == history['baseFeePerGas'][-1]
+
+def test_update_is_incremental():
+    """Only blocks newer than the cache are requested, and none for a known head"""
+    chain = EthcChainStub()
+    oracle = FeeOracle(stub_web3(chain), history_blocks=10)
+
+    async def run():
+        await oracle.estimate(head=chain.eth_block_number)
+        await oracle.estimate(head=chain.eth_block_number)
+        chain.advance(3)
+        chain.base_fees[chain.eth_block_number] = 2 * chain.base_fee
+        return await oracle.estimate(head=chain.eth_block_number)
+
+    estimate = asyncio.run(run())
+
+    assert chain.request_counts['eth_feeHistory'] == 2
+    assert chain.request_counts['eth_blockNumber'] == 0
+    assert len(oracle._blocks) == 10
+    assert oracle.last_block == chain.eth_block_number
+    assert estimate.base_fee == 2 * chain.base_fee
+
+def test_urgency_profiles():
+    chain = EthcChainStub()
+    oracle = FeeOracle(stub_web3(chain))
+
+    async def run():
+        return {urgency: await oracle.estimate(urgency) for urgency in URGENCY_PROFILES}
+
+    estimates = asyncio.run(run())
+    logger.info(f"Estimates: {estimates}")
+
+    assert estimates['cheap'].max_fee_per_gas < estimates['normal'].max_fee_per_gas
+    assert estimates['normal'].max_fee_per_gas < estimates['urgent'].max_fee_per_gas
+    assert estimates['normal'].max_priority_fee_per_gas == chain.priority_fee
+    # Less than the old flat 2x base fee buffer even when urgent
+    assert estimates['urgent'].max_fee_per_gas < 2 * chain.base_fee + chain.priority_fee
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+
+from logic.gas_model import GasModel
+from tests.test_nonce_manager import ACCOUNTS, make_chain, make_miner
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INTERCEPT = 48_000
+SLOPE = 23_500
+
+def gas_used(mine_count, noise=0):
+    return INTERCEPT + SLOPE * mine_count + noise
+
+def trained_model(data_dir):
+    model = GasModel(data_dir=data_dir)
+    for mine_count, noise in [(1, 40), (5, -25), (10, 10), (20, -60), (50, 30), (3, 0)]:
+        model.observe(mine_count, gas_used(mine_count, noise))
+    return model
+
+def test_fits_linear_gas_usage(tmp_path):
+    model = trained_model(tmp_path)
+
+    assert abs(model.slope - SLOPE) < 5
+    assert abs(model.intercept - INTERCEPT) < 100
+    for mine_count in (1, 10, 50):
+        limit = model.gas_limit(mine_count)
+        assert gas_used(mine_count, 60) < limit < gas_used(mine_count) * 1.05
+
+def test_falls_back_when_unsure(tmp_path):
+    model = trained_model(tmp_path)
+
+    assert model.gas_limit(51) is None
+    assert GasModel(data_dir=tmp_path, checkpoint_name='empty').gas_limit(1) is None
+
+    model.samples[-1] = (3, gas_used(3), time.time() - model.max_age - 1)
+    assert model.gas_limit(10) is None
+
+def test_model_persists(tmp_path):
+    model = trained_model(tmp_path)
+    reloaded = GasModel(data_dir=tmp_path)
+
+    assert reloaded.gas_limit(10) == model.gas_limit(10)
+
+def test_mine_skips_estimate_gas_with_model(tmp_path):
+    chain = make_chain()
+    miner = make_miner(chain)
+    miner.gas_model = GasModel(data_dir=tmp_path)
+
+    async def run():
+        for mine_count in (1, 2, 4, 8, 16):
+            tx_hash = await miner.mine('wallet0', mine_count)
+            miner.observe_receipt({'transactionHash': tx_hash, 'status': 1, 'gasUsed': gas_used(mine_count)})
+        chain.request_counts.clear()
+        await miner.mine('wallet1', 10)
+
+    asyncio.run(run())
+
+    assert chain.request_counts['eth_estimateGas'] == 0
+    sender, transaction = chain.transactions[-1]
+    assert sender == ACCOUNTS[1].address
+    assert gas_used(10) < transaction['gas'] < gas_used(10) * 1.05
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+from eth_utils import to_checksum_address
+
+from logic.ethc_miner import ETHCMiner
+from logic.history_archive import NO_WINNER, HistoryArchive
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINER_A = to_checksum_address('0x1111111111111111111111111111111111111111')
+MINER_B = to_checksum_address('0x2222222222222222222222222222222222222222')
+OURS = to_checksum_address('0x3333333333333333333333333333333333333333')
+
+def make_chain():
+    """Three closed ETHC blocks with mines from three miners, then an open one"""
+    chain = EthcChainStub()
+    first = chain.ethc_block
+    for offset in range(3):
+        chain.emit_mine(MINER_A, mine_count=2)
+        chain.emit_mine(OURS, mine_count=1 + offset)
+        if offset != 1:
+            chain.emit_mine(MINER_B, mine_count=5)
+        chain.advance()
+        chain.start_new_block(winner=[MINER_A, OURS, MINER_B][offset])
+        chain.advance()
+    chain.emit_mine(MINER_A, mine_count=7)
+    chain.advance(20)
+    return chain, first
+
+def make_miner(chain):
+    return ETHCMiner(None, web3=stub_web3(chain), contract_address=chain.contract_address)
+
+def sync(archive, chain, miner):
+    async def run():
+        # Only the blocks make_chain produced, not the stub's whole history
+        archived = await archive.sync(miner, from_block=chain.eth_block_number - 30, to_block=chain.eth_block_number)
+        filled = await archive.fill_blocks(miner)
+        return archived, filled
+    return asyncio.run(run())
+
+def test_archives_mines_and_winners(tmp_path):
+    chain, first = make_chain()
+    miner = make_miner(chain)
+    archive = HistoryArchive(path=str(tmp_path))
+
+    archived, filled = sync(archive, chain, miner)
+
+    assert archived == 8 + 1 + 3
+    assert filled == 3
+    mines = archive.mines(first + 1, first + 3)
+    assert mines['ethc_block'].tolist() == [first + 1] * 2 + [first + 2] * 3
+    assert archive.block_totals(first, first + 4).tolist() == [8, 4, 10, 7]
+    assert archive.block_totals(first, first + 3, exclude=[OURS]).tolist() == [7, 2, 7]
+
+    blocks = archive.blocks()
+    assert blocks['ethc_block'].tolist() == [first, first + 1, first + 2]
+    assert [archive.address(winner) for winner in blocks['winner']] == [MINER_A, OURS, MINER_B]
+    assert blocks['mine_cost'].tolist() == [chain.mine_cost] * 3
+
+    totals = archive.miner_totals()
+    ours = archive.miner_id(OURS)
+    assert totals['mines'][ours] == 1 + 2 + 3
+    assert totals['blocks'][archive.miner_id(MINER_A)] == 4
+    assert totals['blocks'][archive.miner_id(MINER_B)] == 2
+    assert totals['wins'].tolist() == [1, 1, 1]
+
+def test_resume_skips_archived_logs(tmp_path):
+    chain, first = make_chain()
+    miner = make_miner(chain)
+    sync(HistoryArchive(path=str(tmp_path)), chain, miner)
+
+    chain.advance()
+    chain.emit_mine(MINER_B, mine_count=4)
+    chain.start_new_block()
+    archive = HistoryArchive(path=str(tmp_path))
+    archived, filled = sync(archive, chain, miner)
+
+    assert archived == 2
+    assert filled == 0  # the new block's winner is not drawn yet
+    assert archive.blocks()['winner'][-1] == NO_WINNER
+    assert archive.block_totals(first + 3, first + 4).tolist() == [11]
+
+def test_uncheckpointed_rows_are_dropped(tmp_path):
+    chain, first = make_chain()
+    miner = make_miner(chain)
+    archive = HistoryArchive(path=str(tmp_path))
+    sync(archive, chain, miner)
+    rows = len(archive.mines_table)
+
+    # An append that crashed before its checkpoint was written
+    archive.mines_table.append({name: archive.mines(first, first + 1)[name].copy()
+                                for name in archive.mines_table.columns})
+
+    assert len(HistoryArchive(path=str(tmp_path)).mines_table) == rows
+
+def test_mining_reward_keeps_every_wei(tmp_path):
+    chain, first = make_chain()
+    # Past float64's 53-bit mantissa and uint64's range
+    chain.mining_reward = 50 * 10 ** 18 + 1
+    miner = make_miner(chain)
+    sync(HistoryArchive(path=str(tmp_path)), chain, miner)
+
+    rewards = HistoryArchive(path=str(tmp_path)).blocks()['mining_reward']
+    assert rewards.tolist() == [50 * 10 ** 18 + 1] * 3
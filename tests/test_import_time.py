@@ -0,0 +1,41 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from tests.bench_import_time import import_profile
+
+ROOT = Path(__file__).parent.parent
+
+def run_python(code):
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+def test_constants_do_not_import_web3():
+    profile = import_profile('config.constants')
+
+    assert 'web3' not in profile
+    assert 'eth_account' not in profile
+
+def test_miner_import_skips_numpy():
+    assert 'numpy' not in import_profile('logic.ethc_miner')
+
+def test_config_and_clients_are_lazy():
+    output = run_python(
+        "import config.constants as c, util.alchemy_connector as a\n"
+        "print(c.get_wallets.cache_info().currsize, c.load_abi.cache_info().currsize,"
+        " a.get_w3.cache_info().currsize, a.get_async_w3.cache_info().currsize)\n"
+        "abi = c.ETHC_CONTRACT_ABI\n"
+        "print(c.load_abi.cache_info().currsize, c.load_abi('ethc_contract') is abi)"
+    )
+
+    assert output.split('\n')[:2] == ['0 0 0 0', '1 True']
+
+def test_miner_builds_contract_on_first_use():
+    from logic.ethc_miner import ETHCMiner
+    from tests.chain_stub import EthcChainStub, stub_web3
+
+    chain = EthcChainStub()
+    miner = ETHCMiner(None, web3=stub_web3(chain), contract_address=chain.contract_address)
+
+    assert 'contract' not in vars(miner)
+    assert 'gas_model' not in vars(miner)
+    assert miner.contract.address == chain.contract_address
@@ -0,0 +1,70 @@
+import logging
+
+from eth_utils import to_checksum_address
+
+from config.constants import load_abi
+from logic.log_decoder import LogDecoder, MineEvent, NewBlockEvent
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINER_A = to_checksum_address('0x1111111111111111111111111111111111111111')
+MINER_B = to_checksum_address('0xabcdef0000000000000000000000000000000001')
+
+def make_logs():
+    chain = EthcChainStub()
+    chain.emit_mine(MINER_A, mine_count=3)
+    chain.advance()
+    chain.emit_mine(MINER_B, mine_count=300)
+    chain.start_new_block()
+    chain.emit_mine(MINER_A)
+    web3 = stub_web3(chain)
+    formatted = web3.eth.get_logs({'address': chain.contract_address, 'fromBlock': 0, 'toBlock': 'latest'})
+    return chain, web3, chain.logs, formatted
+
+def web3_decode(contract, log):
+    """Reference decoding through web3's generic ABI machinery"""
+    for event in (contract.events.Mine(), contract.events.NewETHCBlock()):
+        try:
+            decoded = event.process_log(log)
+        except Exception:
+            continue
+        if decoded.event == 'Mine':
+            return MineEvent(decoded.args.blockNumber, decoded.args.miner, decoded.args.mineCount,
+                             decoded.blockNumber, decoded.transactionHash, decoded.logIndex)
+        return NewBlockEvent(decoded.args.blockNumber, decoded.blockNumber,
+                             decoded.transactionHash, decoded.logIndex)
+
+def test_matches_web3_decoder():
+    chain, web3, raw, formatted = make_logs()
+    contract = web3.eth.contract(address=chain.contract_address, abi=load_abi('ethc_contract'))
+    decoder = LogDecoder()
+
+    expected = [web3_decode(contract, log) for log in formatted]
+
+    assert [type(event) for event in expected] == [MineEvent, MineEvent, NewBlockEvent, MineEvent]
+    assert decoder.decode_many(formatted) == expected
+    assert decoder.decode_many(raw) == expected
+    assert decoder.decode(raw[0]).tx_hash.hex() == expected[0].tx_hash.hex()
+
+def test_batch_arrays():
+    chain, _, raw, _ = make_logs()
+
+    mines, new_blocks = LogDecoder().decode_batch(raw)
+
+    assert mines['mine_count'].tolist() == [3, 300, 1]
+    assert mines['miner'][1] == bytes.fromhex(MINER_B[2:])
+    assert mines['eth_block'].tolist() == [chain.eth_block_number - 1] + [chain.eth_block_number] * 2
+    assert new_blocks['ethc_block'].tolist() == [chain.ethc_block]
+
+def test_unknown_topic_rejected():
+    _, _, raw, _ = make_logs()
+    log = dict(raw[0], topics=['0x' + '00' * 32] + raw[0]['topics'][1:])
+
+    try:
+        LogDecoder().decode(log)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError")
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from decimal import Decimal
+
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+
+from logic.block_watcher import MineEvent
+from logic.chain_snapshot import ChainSnapshot
+from logic.mempool_watcher import MempoolWatcher
+from logic.strategy import MineStrategy
+from tests.rpc_stub_server import RPCStubServer
+from tests.test_nonce_manager import ACCOUNTS, make_chain, make_miner
+from util.alchemy_connector import PooledAsyncHTTPProvider, build_async_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ALICE = to_checksum_address('0x' + 'aa' * 20)
+BOB = to_checksum_address('0x' + 'bb' * 20)
+
+def setup():
+    chain = make_chain()
+    chain.hold_transactions = True
+    miner = make_miner(chain)
+    return chain, miner, miner.get_mempool_watcher(ws_url=None)
+
+def test_tracks_competitor_mines_only():
+    chain, miner, watcher = setup()
+    chain.submit_mine(ALICE, 3)
+    chain.submit_mine(BOB, 2)
+    # Our own mine and an unrelated transfer are in the mempool as well
+    asyncio.run(miner.mine('wallet0', mine_count=4))
+    chain.mempool.append((b'\x01' * 32, BOB, {
+        'to': HexBytes(ALICE), 'value': 1, 'data': HexBytes(b''), 'nonce': 7,
+        'gas': 21_000, 'maxFeePerGas': 1, 'maxPriorityFeePerGas': 1
+    }))
+
+    assert asyncio.run(watcher.poll()) == 5
+    alice, bob = watcher.pending()
+    assert (alice.sender, alice.mine_count, alice.value) == (ALICE, 3, 3 * chain.mine_cost)
+    assert (bob.sender, bob.mine_count, bob.nonce) == (BOB, 2, 0)
+    assert watcher.stats() == {'transactions': 2, 'senders': 2, 'mine_count': 5, 'value': 5 * chain.mine_cost}
+
+def test_replacement_counts_once():
+    chain, _, watcher = setup()
+    first = chain.submit_mine(ALICE, 3)
+    asyncio.run(watcher.poll())
+    bumped = chain.submit_mine(ALICE, 3, nonce=0, max_fee_per_gas=10 ** 12)
+
+    assert asyncio.run(watcher.poll()) == 3
+    (pending,) = watcher.pending()
+    assert pending.tx_hash == bumped != first
+    assert pending.max_fee_per_gas == 10 ** 12
+
+def test_evicts_included_and_dropped_mines():
+    chain, _, watcher = setup()
+    landed = chain.submit_mine(ALICE, 3)
+    chain.submit_mine(BOB, 2)
+    asyncio.run(watcher.poll())
+
+    # The Mine log arrives through the block watcher before the next poll
+    watcher.observe(MineEvent(chain.ethc_block, ALICE, 3, chain.eth_block_number, HexBytes(landed), 0))
+    assert watcher.pending_mine_count() == 2
+    chain.drop_pending()
+    assert asyncio.run(watcher.poll()) == 0
+
+    chain.submit_mine(ALICE, 1)
+    asyncio.run(watcher.poll())
+    chain.advance()
+    chain.include_pending()
+    assert asyncio.run(watcher.poll()) == 0
+    assert chain.miners[chain.ethc_block] == [ALICE]
+
+def test_entries_expire_without_being_seen():
+    chain, _, watcher = setup()
+    watcher.max_age = 30
+    chain.submit_mine(ALICE, 3)
+    asyncio.run(watcher.poll())
+    seen_at = watcher.pending()[0].seen_at
+
+    assert watcher.pending_mine_count(now=seen_at + 30) == 3
+    assert watcher.pending_mine_count(now=seen_at + 31) == 0
+
+def test_txpool_over_http():
+    chain = make_chain()
+    chain.submit_mine(ALICE, 3)
+    chain.submit_mine(ALICE, 4)
+    chain.submit_mine(ACCOUNTS[0].address, 9)
+
+    async def run(url):
+        provider = PooledAsyncHTTPProvider(url)
+        watcher = MempoolWatcher(build_async_web3(provider), chain.contract_address,
+                                 exclude=[ACCOUNTS[0].address], source='txpool', ws_url=None)
+        try:
+            return await watcher.poll(), watcher.pending()
+        finally:
+            await provider.close()
+
+    with RPCStubServer(chain) as server:
+        mine_count, pending = asyncio.run(run(server.url))
+    assert mine_count == 7
+    assert sorted(entry.nonce for entry in pending) == [0, 1]
+    assert chain.request_counts['txpool_content'] == 1
+
+def test_pending_mines_lower_the_win_probability():
+    chain, miner, watcher = setup()
+    for _ in range(4):
+        chain.emit_mine(ALICE)
+    chain.submit_mine(BOB, 5)
+
+    assert asyncio.run(miner.estimate_mining_probability(chain.ethc_block)) == Decimal(1) / 5
+    asyncio.run(watcher.poll())
+    assert asyncio.run(miner.estimate_mining_probability(chain.ethc_block)) == Decimal(1) / 10
+
+    snapshot = ChainSnapshot(chain.eth_block_number, chain.timestamp, chain.base_fee, chain.ethc_block,
+                             chain.last_block_time, chain.mine_cost, chain.mining_reward, 4)
+    strategy = MineStrategy()
+    decision = strategy.decide(snapshot, chain.base_fee, 0.001, pending=watcher.pending_mine_count())
+    assert decision == strategy.solve(9, chain.mine_cost, chain.mining_reward, chain.base_fee, 0.001)
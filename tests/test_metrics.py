@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import urllib.request
+
+from tests.test_nonce_manager import make_chain, make_miner
+from util.metrics import Histogram, Metrics, metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(bounds=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative()) == [2, 3, 4]
+    assert histogram.sum == 3.65
+    assert histogram.count == 4
+
+def test_render_prometheus_text():
+    registry = Metrics(enabled=True)
+    registry.observe('rpc_request', 0.002, (('method', 'eth_call:aggregate3'),))
+    registry.count('rpc_request_errors', (('method', 'eth_call:aggregate3'),))
+    try:
+        with registry.span('mine_phase', phase='send'):
+            raise ValueError("rejected")
+    except ValueError:
+        pass
+
+    text = registry.render()
+    logger.info(text)
+    assert '# TYPE ethc_rpc_request_seconds histogram' in text
+    assert 'ethc_rpc_request_seconds_bucket{method="eth_call:aggregate3",le="0.0025"} 1' in text
+    assert 'ethc_rpc_request_seconds_bucket{method="eth_call:aggregate3",le="+Inf"} 1' in text
+    assert 'ethc_rpc_request_seconds_count{method="eth_call:aggregate3"} 1' in text
+    assert 'ethc_rpc_request_errors_total{method="eth_call:aggregate3"} 1' in text
+    assert 'ethc_mine_phase_errors_total{phase="send"} 1' in text
+    assert 'ethc_mine_phase_seconds_count{phase="send"} 1' in text
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics(enabled=False)
+    with registry.span('mine'):
+        pass
+    registry.observe('rpc_request', 1.0)
+    registry.count('rpc_request_errors')
+
+    assert asyncio.run(registry.timed(asyncio.sleep(0, result=7), 'mine')) == 7
+    assert registry.span('mine') is registry.span('other')
+    assert registry.histograms == {} and registry.counters == {}
+
+def test_mine_records_rpc_and_phase_timings(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    metrics.reset()
+    chain = make_chain()
+    miner = make_miner(chain)
+
+    asyncio.run(miner.mine('wallet0', mine_count=2))
+
+    methods = {dict(labels)['method'] for name, labels in metrics.histograms if name == 'rpc_request'}
+    assert {'eth_call:aggregate3', 'eth_sendRawTransaction', 'eth_getBalance'} <= methods
+    phases = {dict(labels)['phase'] for name, labels in metrics.histograms if name == 'mine_phase'}
+    # A fresh gas model has no receipts, so the node estimates gas
+    assert phases == {'reads', 'estimate', 'fee', 'sign', 'send'}
+    assert metrics.histograms[('mine', ())].count == 1
+    assert metrics.histograms[('sign', ())].count == 1
+    assert metrics.counters[('contract_calls', (('function', 'mineCost'),))] >= 1
+    metrics.reset()
+
+def test_cached_reads_are_timed(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    metrics.reset()
+    chain = make_chain()
+    # The wallet manager times the shared client before the miner puts its cache on it
+    miner = make_miner(chain)
+
+    async def run():
+        await miner.get_snapshot()  # learns the current ETHC block
+        miner.web3.eth.block_number  # confirms the head, so the next snapshot is cached
+        chain.request_counts.clear()
+        metrics.reset()
+        await miner.get_snapshot()
+        await miner.get_snapshot()
+
+    asyncio.run(run())
+
+    names = [name for _, name in miner.web3.middleware_onion.middlewares]
+    assert names.index('metrics') < names.index('rpc_cache')
+    assert chain.request_counts['eth_call'] == 1
+    assert metrics.histograms[('rpc_request', (('method', 'eth_call:aggregate3'),))].count == 2
+    metrics.reset()
+
+def test_serves_metrics_over_http():
+    registry = Metrics(enabled=True)
+    registry.count('mines_sent', amount=3)
+    host, port = registry.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            body = response.read().decode()
+            assert response.headers['Content-Type'].startswith('text/plain')
+    finally:
+        registry.close()
+
+    assert 'ethc_mines_sent_total 3' in body
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+
+from database.connection import create_session_factory
+from logic.ethc_miner import ETHCMiner
+from logic.miner_index import MinerIndex
+from tests.chain_stub import EthcChainStub, stub_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINER_A = '0x1111111111111111111111111111111111111111'
+MINER_B = '0x2222222222222222222222222222222222222222'
+
+def make_index(chain, tmp_path):
+    miner = ETHCMiner(None, web3=stub_web3(chain), contract_address=chain.contract_address)
+    session_factory = create_session_factory(f"sqlite:///{tmp_path / 'index.db'}")
+    index = MinerIndex(miner, session_factory=session_factory, confirmations=2)
+    miner.index = index
+    return miner, index, session_factory
+
+def test_index_commits_confirmed_logs_and_drops_reorged_ones(tmp_path):
+    chain = EthcChainStub()
+    miner, index, session_factory = make_index(chain, tmp_path)
+    asyncio.run(index.sync())
+    assert not index.is_warm(head=chain.eth_block_number)
+
+    chain.advance()
+    chain.start_new_block()
+    block = chain.ethc_block
+    chain.emit_mine(MINER_A, mine_count=3)
+    chain.advance()
+    chain.emit_mine(MINER_B)
+    chain.emit_mine(MINER_A, mine_count=2)
+    chain.advance(2)
+    asyncio.run(index.sync())
+
+    assert index.is_warm(block, head=chain.eth_block_number)
+    assert not index.is_warm(block - 1, head=chain.eth_block_number)
+    # Any Ethereum block the last sync didn't read could hold a Mine log it lacks
+    assert not index.is_warm(block, head=chain.eth_block_number + 1)
+    assert not index.is_warm(block)
+    assert index.mine_count(block, miner.web3.to_checksum_address(MINER_A)) == 5
+    assert index.block_stats(block) == {'miner_count': 2, 'total_mine_count': 6}
+    assert index.last_block == chain.eth_block_number - 2
+
+    # A mine in the newest block is visible right away but not yet committed
+    chain.advance()
+    chain.emit_mine(MINER_B, mine_count=4)
+    asyncio.run(index.sync())
+    assert index.block_stats(block)['total_mine_count'] == 10
+
+    # That block is reorged out before it is confirmed
+    chain.logs.pop()
+    asyncio.run(index.sync())
+    assert index.block_stats(block)['total_mine_count'] == 6
+
+    # A fresh index over the same database resumes from the committed state
+    reopened = MinerIndex(miner, session_factory=session_factory, confirmations=2)
+    assert reopened.last_block == index.last_block
+    assert reopened.first_complete_block == block
+    assert reopened.block_stats(block) == {'miner_count': 2, 'total_mine_count': 6}
+
+def test_miner_reads_participation_from_warm_index(tmp_path):
+    chain = EthcChainStub()
+    miner, index, _ = make_index(chain, tmp_path)
+    asyncio.run(index.sync())
+    chain.advance()
+    chain.start_new_block()
+    block = chain.ethc_block
+    chain.emit_mine(MINER_A, mine_count=2)
+    chain.emit_mine(MINER_B)
+    chain.advance(3)
+    asyncio.run(index.sync())
+    asyncio.run(miner.get_snapshot())
+
+    async def run():
+        chain.request_counts.clear()
+        mined = await miner.has_mined_block(MINER_A.lower(), block)
+        probability = await miner.estimate_mining_probability(block)
+        block_miners = await miner.get_block_miners(block)
+        return mined, probability, block_miners
+
+    mined, probability, block_miners = asyncio.run(run())
+
+    assert mined
+    assert float(probability) == 0.25
+    assert block_miners['miner_count'] == 3
+    assert block_miners['mine_counts'][miner.web3.to_checksum_address(MINER_A)] == 2
+    # Only selectedMinerOfBlock still goes to the node
+    assert chain.request_counts == {'eth_call': 1}
+
+def test_miner_reads_chain_once_head_passes_index(tmp_path):
+    chain = EthcChainStub()
+    miner, index, _ = make_index(chain, tmp_path)
+    asyncio.run(index.sync())
+    chain.advance()
+    chain.start_new_block()
+    block = chain.ethc_block
+    chain.emit_mine(MINER_A)
+    chain.advance(3)
+    asyncio.run(index.sync())
+
+    # A mine lands in a block the index hasn't synced yet
+    chain.advance()
+    chain.emit_mine(MINER_B)
+    asyncio.run(miner.get_snapshot())
+    assert not index.is_warm(block, head=miner.rpc_cache.head)
+
+    block_miners = asyncio.run(miner.get_block_miners(block))
+    assert block_miners['miner_count'] == 2
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+
+from eth_account import Account
+
+from logic.ethc_miner import ETHCMiner
+from logic.gas_model import GasModel
+from tests.chain_stub import EthcChainStub, StubRPCError, stub_web3
+from util.nonce_manager import NonceManager, is_already_sent, is_nonce_error, is_rejection
+from util.wallet_manager import WalletManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACCOUNTS = [Account.from_key(bytes([index]) * 32) for index in range(1, 4)]
+
+def make_chain():
+    chain = EthcChainStub()
+    for account in ACCOUNTS:
+        chain.balances[account.address] = 10 ** 18
+    return chain
+
+def make_miner(chain):
+    web3 = stub_web3(chain)
+    wallet_manager = WalletManager.from_config({
+        f"WALLET_{index}": {
+            'name': f"wallet{index}",
+            'public_key': account.address,
+            'private_key': account.key.hex()
+        }
+        for index, account in enumerate(ACCOUNTS)
+    }, web3=web3)
+    miner = ETHCMiner(wallet_manager, web3=web3, contract_address=chain.contract_address)
+    # Keep receipts from tests out of the gas model checkpoint in DATA_DIR
+    miner.gas_model = GasModel(checkpoint_name=None)
+    return miner
+
+def test_allocate_is_unique_under_concurrency():
+    chain = make_chain()
+    address = ACCOUNTS[0].address
+    chain.use_nonce(address)
+    manager = NonceManager(stub_web3(chain))
+
+    async def run():
+        return await asyncio.gather(*(manager.allocate(address) for _ in range(20)))
+
+    nonces = asyncio.run(run())
+
+    assert sorted(nonces) == list(range(1, 21))
+    assert chain.request_counts['eth_getTransactionCount'] == 1
+
+def test_release_returns_last_nonce():
+    chain = make_chain()
+    address = ACCOUNTS[0].address
+    manager = NonceManager(stub_web3(chain))
+
+    async def run():
+        first = await manager.allocate(address)
+        second = await manager.allocate(address)
+        manager.release(address, second)
+        return first, second, await manager.allocate(address)
+
+    assert asyncio.run(run()) == (0, 1, 1)
+
+def test_mine_all_sends_every_wallet_without_refetching():
+    """Mining from every wallet reads the nonce and chain id once, not per transaction"""
+    chain = make_chain()
+    miner = make_miner(chain)
+
+    async def run():
+        first = await miner.mine_all()
+        chain.request_counts.clear()
+        second = await miner.mine_all(mine_count=2)
+        return first, second
+
+    first, second = asyncio.run(run())
+    logger.info(f"Second round requests: {dict(chain.request_counts)}")
+
+    assert all(isinstance(tx_hash, bytes) for tx_hash in {**first, **second}.values())
+    assert chain.request_counts['eth_sendRawTransaction'] == len(ACCOUNTS)
+    assert chain.request_counts['eth_getTransactionCount'] == 0
+    assert chain.request_counts['eth_chainId'] == 0
+    # Same Ethereum block, so the fee oracle reuses its cached history
+    assert chain.request_counts['eth_feeHistory'] == 0
+
+    for account in ACCOUNTS:
+        nonces = [tx['nonce'] for sender, tx in chain.transactions if sender == account.address]
+        assert nonces == [0, 1]
+    assert len(chain.miners[chain.ethc_block]) == 3 * len(ACCOUNTS)
+
+def test_mine_resyncs_after_nonce_too_low():
+    chain = make_chain()
+    miner = make_miner(chain)
+    address = ACCOUNTS[0].address
+
+    async def run():
+        await miner.mine('wallet0')
+        # A transaction sent from another process takes the next nonce
+        chain.use_nonce(address)
+        return await miner.mine('wallet0')
+
+    asyncio.run(run())
+
+    nonces = [tx['nonce'] for sender, tx in chain.transactions if sender == address]
+    assert nonces == [0, 2]
+    assert miner.wallet_manager.nonce_manager.peek(address) == 3
+
+def test_is_nonce_error():
+    assert is_nonce_error(ValueError({'code': -32000, 'message': 'nonce too low'}))
+    assert not is_nonce_error(Exception('insufficient funds for gas * price + value'))
+    # A transaction with the nonce is in the pool: sent, not stale
+    assert not is_nonce_error(Exception('replacement transaction underpriced'))
+    assert is_already_sent(ValueError({'code': -32000, 'message': 'already known'}))
+    assert is_already_sent(Exception('replacement transaction underpriced'))
+    assert is_rejection(ValueError({'code': -32000, 'message': 'insufficient funds'}))
+    assert not is_rejection(TimeoutError('timed out'))
+
+def fail_sends(chain, error, include=False):
+    """Make the next eth_sendRawTransaction raise error, after taking the transaction if include"""
+    send = chain.rpc_eth_sendRawTransaction
+
+    def failing_send(raw_transaction):
+        chain.rpc_eth_sendRawTransaction = send
+        if include:
+            send(raw_transaction)
+        raise error
+
+    chain.rpc_eth_sendRawTransaction = failing_send
+
+def test_already_known_is_not_sent_again():
+    chain = make_chain()
+    miner = make_miner(chain)
+    address = ACCOUNTS[0].address
+    # Another endpoint took the transaction first
+    fail_sends(chain, StubRPCError('already known'), include=True)
+
+    tx_hash = asyncio.run(miner.mine('wallet0'))
+
+    assert len(chain.transactions) == 1
+    assert chain.request_counts['eth_sendRawTransaction'] == 1
+    assert bytes(tx_hash) in chain.known_hashes
+    assert miner.wallet_manager.nonce_manager.peek(address) == 1
+
+def test_rejected_send_releases_the_nonce():
+    chain = make_chain()
+    miner = make_miner(chain)
+    fail_sends(chain, StubRPCError('insufficient funds for gas * price + value'))
+
+    async def run():
+        try:
+            await miner.mine('wallet0')
+        except ValueError:
+            pass
+        return await miner.mine('wallet0')
+
+    asyncio.run(run())
+
+    assert [tx['nonce'] for sender, tx in chain.transactions] == [0]
+
+def test_unanswered_send_keeps_the_nonce():
+    chain = make_chain()
+    miner = make_miner(chain)
+    address = ACCOUNTS[0].address
+    # The node took the transaction but the answer never came back
+    fail_sends(chain, TimeoutError('timed out'), include=True)
+
+    async def run():
+        try:
+            await miner.mine('wallet0')
+        except TimeoutError:
+            pass
+        return await miner.mine('wallet0')
+
+    asyncio.run(run())
+
+    assert [tx['nonce'] for sender, tx in chain.transactions] == [0, 1]
+    assert miner.wallet_manager.nonce_manager.peek(address) == 2
+    # Still followed, so the gas model sees its receipt
+    assert len(miner._pending_mines) == 2
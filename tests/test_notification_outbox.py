@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+
+from config import constants
+from tests.sendgrid_stub_server import SendGridStubServer
+from util.notification_outbox import NotificationOutbox
+from util.sendgrid_wrapper import Email
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ADMIN = 'admin@example.com'
+
+def make_outbox(server, **kwargs):
+    kwargs.setdefault('backoff', 0.01)
+    return NotificationOutbox(api_key='SG.test', host=server.url, **kwargs)
+
+def send(outbox, subject):
+    return outbox.send(sender=Email(ADMIN, 'ETHC'), recipients=[Email(ADMIN, 'Admin')],
+                       subject=subject, body_text='body', body_html='<p>body</p>')
+
+def test_sends_in_the_background(monkeypatch):
+    monkeypatch.setattr(constants, 'DEV_EMAIL', ADMIN)
+
+    async def run(server):
+        outbox = make_outbox(server).start()
+        send(outbox, 'first')
+        send(outbox, 'second')
+        await outbox.close()
+        return outbox
+
+    with SendGridStubServer() as server:
+        outbox = asyncio.run(run(server))
+
+    assert [mail['subject'] for mail in server.mails] == ['first', 'second']
+    path, body, authorization, _ = server.requests[0]
+    assert path == '/v3/mail/send'
+    assert authorization == 'Bearer SG.test'
+    assert body['personalizations'][0]['to'] == [{'email': ADMIN, 'name': 'Admin'}]
+    assert (outbox.sent, outbox.failed) == (2, 0)
+
+def test_retries_with_backoff():
+    async def run(server):
+        outbox = make_outbox(server).start()
+        send(outbox, 'flaky')
+        send(outbox, 'rejected')
+        await outbox.close()
+        return outbox
+
+    # 503 then 429 for the first email, 400 for the second
+    with SendGridStubServer(statuses=[503, 429, 202, 400]) as server:
+        server.retry_after = 0
+        outbox = asyncio.run(run(server))
+
+    assert [status for *_, status in server.requests] == [503, 429, 202, 400]
+    assert [mail['subject'] for mail in server.mails] == ['flaky']
+    assert (outbox.sent, outbox.failed) == (1, 1)
+
+def test_gives_up_after_max_attempts():
+    async def run(server):
+        outbox = make_outbox(server, max_attempts=3).start()
+        send(outbox, 'down')
+        await outbox.close()
+        return outbox
+
+    with SendGridStubServer(statuses=[500] * 5) as server:
+        outbox = asyncio.run(run(server))
+    assert len(server.requests) == 3
+    assert (outbox.sent, outbox.failed) == (0, 1)
+
+def test_alert_bursts_become_one_digest(monkeypatch):
+    monkeypatch.setattr(constants, 'DEV_EMAIL', ADMIN)
+    monkeypatch.setattr(constants, 'HOST', 'miner.example.com')
+
+    async def run(server):
+        outbox = make_outbox(server, digest_window=0.1).start()
+        outbox.notify_admins('RPC pool degraded', 'RPC')
+        outbox.notify_admins('Nonce resync for wallet0', 'Nonce')
+        outbox.notify_admins('Gas above cap')
+        await asyncio.sleep(0.2)
+        outbox.notify_admins('Wallet1 low balance', 'Balance')
+        await outbox.close()
+
+    with SendGridStubServer() as server:
+        asyncio.run(run(server))
+
+    digest, single = server.mails
+    assert digest['subject'] == '3 alerts: RPC'
+    text = digest['content'][0]['value']
+    assert 'RPC pool degraded' in text and 'Nonce resync for wallet0' in text and 'Gas above cap' in text
+    assert single['subject'] == 'Balance'
+    assert sorted(single['categories']) == ['my-app', 'notify_admins']
+
+def test_slow_sendgrid_does_not_block_the_loop():
+    async def run(server):
+        outbox = make_outbox(server).start()
+        send(outbox, 'slow')
+        # The loop keeps ticking while the post waits on the server
+        worst = 0.0
+        started = time.monotonic()
+        while time.monotonic() - started < 0.3:
+            before = time.monotonic()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.monotonic() - before - 0.01)
+        await outbox.close()
+        return worst
+
+    with SendGridStubServer(delay=0.25) as server:
+        worst = asyncio.run(run(server))
+    logger.info(f"Worst loop lag {worst * 1000:.1f} ms")
+    assert len(server.mails) == 1
+    assert worst < 0.1
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+
+from eth_abi import decode
+
+from logic.prepared_mines import MinePreparer
+from tests.test_nonce_manager import ACCOUNTS, make_chain, make_miner
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def sent_mine_counts(chain):
+    return [decode(['uint256'], bytes(transaction['data'])[4:])[0] for _, transaction in chain.transactions]
+
+def test_fire_is_one_rpc_per_wallet():
+    chain = make_chain()
+    miner = make_miner(chain)
+    preparer = MinePreparer(miner, mine_counts=(1, 2, 5))
+
+    plan = {'wallet0': 2, 'wallet1': 5, 'wallet2': 1}
+
+    async def run():
+        assert await preparer.prepare() == len(ACCOUNTS) * 3
+        prepared = {name: preparer.get(name, count) for name, count in plan.items()}
+        chain.request_counts.clear()
+        return prepared, await preparer.fire_all(plan)
+
+    prepared, results = asyncio.run(run())
+
+    assert dict(chain.request_counts) == {'eth_sendRawTransaction': len(ACCOUNTS)}
+    assert sorted(sent_mine_counts(chain)) == [1, 2, 5]
+    assert preparer.signatures == len(ACCOUNTS) * 3
+    for name, tx_hash in results.items():
+        assert bytes(tx_hash) == prepared[name].tx_hash
+    # Spent candidates are gone until the next prepare
+    assert preparer.get('wallet0', 1) is None
+
+def test_prepare_keeps_fresh_candidates():
+    chain = make_chain()
+    miner = make_miner(chain)
+    preparer = MinePreparer(miner, mine_counts=(1, 2))
+
+    async def run():
+        await preparer.prepare()
+        chain.advance()
+        return await preparer.prepare()
+
+    assert asyncio.run(run()) == 0
+
+def test_moved_fees_are_resigned():
+    chain = make_chain()
+    miner = make_miner(chain)
+    preparer = MinePreparer(miner)
+
+    async def run():
+        await preparer.prepare()
+        before = preparer.get('wallet0', 1)
+        chain.base_fee *= 2
+        chain.advance()
+        signed = await preparer.prepare()
+        return before, signed
+
+    before, signed = asyncio.run(run())
+
+    assert signed == len(ACCOUNTS)
+    assert preparer.get('wallet0', 1).fees.max_fee_per_gas > before.fees.max_fee_per_gas
+
+def test_moved_nonce_is_resigned_on_fire():
+    chain = make_chain()
+    miner = make_miner(chain)
+    preparer = MinePreparer(miner)
+    address = ACCOUNTS[0].address
+
+    async def run():
+        await preparer.prepare()
+        # Another process sends from the same wallet after the candidate was signed
+        chain.use_nonce(address)
+        return await preparer.fire('wallet0', 1)
+
+    tx_hash = asyncio.run(run())
+
+    assert tx_hash is not None
+    assert [transaction['nonce'] for _, transaction in chain.transactions] == [1]
+    assert miner.wallet_manager.nonce_manager.peek(address) == 2
+
+def test_prepare_reads_balances_in_one_sweep():
+    chain = make_chain()
+    miner = make_miner(chain)
+    preparer = MinePreparer(miner, mine_counts=(1, 2))
+
+    assert asyncio.run(preparer.prepare()) == len(ACCOUNTS) * 2
+    assert 'eth_getBalance' not in chain.request_counts
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+
+from eth_utils import to_checksum_address
+
+from logic.ethc_miner import ETHCMiner
+from tests.chain_stub import EthcChainStub, stub_web3
+from util.rpc_cache import RPCCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINER_A = to_checksum_address('0x1111111111111111111111111111111111111111')
+MINER_B = to_checksum_address('0x2222222222222222222222222222222222222222')
+
+def make_miner(chain):
+    return ETHCMiner(None, web3=stub_web3(chain), contract_address=chain.contract_address)
+
+def test_head_reads_invalidate_on_new_block():
+    chain = EthcChainStub()
+    chain.balances[MINER_A] = 100
+    miner = make_miner(chain)
+    web3 = miner.web3
+
+    web3.eth.block_number
+    assert web3.eth.get_balance(MINER_A) == 100
+    chain.balances[MINER_A] = 200
+    assert web3.eth.get_balance(MINER_A) == 100
+    assert chain.request_counts['eth_getBalance'] == 1
+
+    chain.advance()
+    web3.eth.block_number
+    assert web3.eth.get_balance(MINER_A) == 200
+    assert miner.rpc_cache.stats()['hits'] == 1
+
+def test_head_reads_not_cached_without_head():
+    chain = EthcChainStub()
+    web3 = make_miner(chain).web3
+
+    web3.eth.get_balance(MINER_A)
+    web3.eth.get_balance(MINER_A)
+
+    assert chain.request_counts['eth_getBalance'] == 2
+
+def test_finalized_reads_never_expire():
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+    web3 = miner.web3
+    old_block = chain.eth_block_number - 100
+
+    web3.eth.block_number
+    web3.eth.get_balance(MINER_A, old_block)
+    chain.advance(5)
+    web3.eth.block_number
+    web3.eth.get_balance(MINER_A, old_block)
+    miner.rpc_cache.head_ttl = 0
+    web3.eth.get_balance(MINER_A, old_block)
+
+    assert chain.request_counts['eth_getBalance'] == 1
+    assert miner.rpc_cache.stats()['immutable_entries'] == 1
+
+def test_closed_block_miners_cached_forever():
+    chain = EthcChainStub()
+    closed = chain.ethc_block - 1
+    chain.add_miner(closed, MINER_A, mine_count=2)
+    chain.selected[closed] = MINER_A
+    chain.add_miner(chain.ethc_block, MINER_B)
+    miner = make_miner(chain)
+
+    async def run():
+        await miner.get_snapshot()
+        # The block watcher confirms the head with eth_blockNumber
+        miner.web3.eth.block_number
+        chain.request_counts.clear()
+        for _ in range(10):
+            assert await miner.has_mined_block(MINER_A, closed)
+        # The open block is read once per Ethereum block
+        await miner.get_block_miners(chain.ethc_block)
+        await miner.get_block_miners(chain.ethc_block)
+        chain.advance()
+        miner.web3.eth.block_number
+        await miner.get_snapshot()
+        await miner.has_mined_block(MINER_A, closed)
+        await miner.get_block_miners(chain.ethc_block)
+
+    asyncio.run(run())
+
+    # closed block once, open block twice, snapshot once
+    assert chain.request_counts['eth_call'] == 4
+
+def test_lru_evicts_head_entries_first():
+    cache = RPCCache(max_entries=3)
+    cache.advance_head(100)
+    cache.put('old', 1, immutable=True)
+    cache.put('head-1', 2)
+    cache.put('head-2', 3)
+    cache.put('new', 4, immutable=True)
+
+    assert cache.get('old') == 1
+    assert cache.get('head-1') is None
+    assert cache.get('head-2') == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_snapshots_follow_the_chain_without_a_watcher():
+    """Cached snapshot answers must not keep their own cache entry alive"""
+    chain = EthcChainStub()
+    miner = make_miner(chain)
+    start = chain.eth_block_number
+
+    async def run():
+        seen = []
+        for _ in range(6):
+            snapshot = await miner.get_snapshot()
+            await miner.get_snapshot()  # two snapshots in the same Ethereum block
+            seen.append((snapshot.eth_block_number, snapshot.blocks_ready))
+            chain.advance()
+        return seen
+
+    seen = asyncio.run(run())
+    assert [block for block, _ in seen] == list(range(start, start + 6))
+    # 30s into the window at the start, so it closes after three blocks
+    assert [ready for _, ready in seen] == [0, 0, 0, 1, 1, 1]
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+import time
+
+from eth_account import Account
+
+from logic.ethc_miner import ETHCMiner
+from logic.gas_model import GasModel
+from tests.chain_stub import EthcChainStub
+from tests.rpc_stub_server import RPCStubServer
+from util.alchemy_connector import PooledAsyncHTTPProvider, build_async_web3
+from util.rpc_pool import RPCPoolProvider
+from util.wallet_manager import WalletManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACCOUNT = Account.from_key('0x' + '42' * 32)
+
+def start_servers(chain, delays):
+    lock = threading.Lock()
+    return [RPCStubServer(chain, delay=delay, lock=lock).start() for delay in delays]
+
+def make_pool(servers, **kwargs):
+    return RPCPoolProvider([PooledAsyncHTTPProvider(server.url) for server in servers], **kwargs)
+
+def test_slow_primary_is_demoted_from_cold():
+    chain = EthcChainStub()
+    servers = start_servers(chain, [0.5, 0.0])
+
+    async def run():
+        pool = make_pool(servers, hedge_after=0.1)
+        try:
+            for _ in range(10):
+                response = await pool.make_request('eth_blockNumber', [])
+                assert response['result'] == hex(chain.eth_block_number)
+            return pool.hedges, [server.http_requests for server in servers], pool
+        finally:
+            await pool.close()
+
+    try:
+        hedges, counts, pool = asyncio.run(run())
+    finally:
+        for server in servers:
+            server.stop()
+
+    logger.info(f"endpoint stats: {pool.endpoint_stats()}")
+    # Only the first read waits on the slow primary; the cancelled hedge loser is still measured
+    assert hedges == 1
+    assert counts == [1, 10]
+    assert pool.stats[0].p50 >= 0.1
+    assert pool.stats[0].error_rate == 0.0
+
+def test_slow_read_is_hedged():
+    chain = EthcChainStub()
+    servers = start_servers(chain, [0.0, 0.0])
+
+    async def run():
+        pool = make_pool(servers, hedge_after=0.05)
+        try:
+            await pool.make_request('eth_blockNumber', [])
+            # Whichever endpoint is now primary stalls
+            primary = servers[pool.ranked()[0]]
+            primary.delay = 1.0
+            start = time.perf_counter()
+            response = await pool.make_request('eth_blockNumber', [])
+            return response, time.perf_counter() - start, pool.hedges
+        finally:
+            await pool.close()
+
+    try:
+        response, elapsed, hedges = asyncio.run(run())
+    finally:
+        for server in servers:
+            server.stop()
+
+    assert response['result'] == hex(chain.eth_block_number)
+    assert hedges == 1
+    assert elapsed < 0.5
+
+def test_rate_limited_endpoint_fails_over():
+    chain = EthcChainStub()
+    servers = start_servers(chain, [0.0, 0.02])
+    servers[0].error_status = 429
+
+    async def run():
+        pool = make_pool(servers, hedge_after=1.0)
+        miner = ETHCMiner(None, web3=build_async_web3(pool), contract_address=chain.contract_address)
+        try:
+            stats = await miner.get_mining_stats()
+            for _ in range(5):
+                await pool.make_request('eth_blockNumber', [])
+            return stats, pool
+        finally:
+            await pool.close()
+
+    try:
+        stats, pool = asyncio.run(run())
+    finally:
+        for server in servers:
+            server.stop()
+
+    assert stats['current_block'] == chain.ethc_block
+    limited = pool.stats[0]
+    assert limited.error_rate == 1.0
+    assert not limited.healthy
+    # Once benched the limited endpoint is not tried first any more
+    assert servers[0].http_requests == limited.max_consecutive_errors
+
+def test_signed_transaction_fans_out_to_every_endpoint():
+    chain = EthcChainStub()
+    chain.balances[ACCOUNT.address] = 10 ** 18
+    servers = start_servers(chain, [0.0, 0.02, 0.05])
+
+    async def run():
+        pool = make_pool(servers)
+        web3 = build_async_web3(pool)
+        wallet_manager = WalletManager.from_config({
+            'WALLET_0': {'name': 'wallet0', 'public_key': ACCOUNT.address, 'private_key': ACCOUNT.key.hex()}
+        }, web3=web3)
+        miner = ETHCMiner(wallet_manager, web3=web3, contract_address=chain.contract_address)
+        miner.gas_model = GasModel(checkpoint_name=None)
+        try:
+            before = [server.http_requests for server in servers]
+            tx_hash = await miner.mine('wallet0', mine_count=2)
+            await asyncio.sleep(0.1)  # let the slower endpoints answer
+            return tx_hash, [server.http_requests - count for server, count in zip(servers, before)]
+        finally:
+            await pool.close()
+
+    try:
+        tx_hash, counts = asyncio.run(run())
+    finally:
+        for server in servers:
+            server.stop()
+
+    assert tx_hash is not None
+    assert len(chain.transactions) == 1
+    assert all(count >= 1 for count in counts)
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+from eth_account import Account
+
+from util.signing_service import SigningService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACCOUNTS = [Account.from_key('0x' + f"{index + 1:064x}") for index in range(3)]
+KEYS = {f"wallet{index}": account.key.hex() for index, account in enumerate(ACCOUNTS)}
+
+def make_jobs(count):
+    return [(f"wallet{index % len(ACCOUNTS)}", {
+        'to': '0x' + '11' * 20,
+        'value': index,
+        'gas': 21_000,
+        'maxFeePerGas': 2 * 10 ** 10,
+        'maxPriorityFeePerGas': 10 ** 9,
+        'nonce': index // len(ACCOUNTS),
+        'type': 2,
+        'chainId': 1
+    }) for index in range(count)]
+
+def serial(jobs):
+    return [bytes(ACCOUNTS[int(name[-1])].sign_transaction(transaction).rawTransaction)
+            for name, transaction in jobs]
+
+def test_pool_matches_serial_signing_in_order():
+    jobs = make_jobs(10)
+    service = SigningService(KEYS, workers=2, min_parallel=1)
+    try:
+        pooled = service.sign_batch(jobs)
+        pooled_async = asyncio.run(service.sign_batch_async(jobs))
+    finally:
+        service.close()
+
+    assert pooled == serial(jobs)
+    assert pooled_async == pooled
+
+def test_small_batch_signs_in_process():
+    service = SigningService(KEYS, workers=2, min_parallel=16)
+    jobs = make_jobs(4)
+
+    assert asyncio.run(service.sign_batch_async(jobs)) == serial(jobs)
+    assert service._pool is None
+
+def test_unknown_wallet_rejected():
+    service = SigningService(KEYS, workers=1)
+    try:
+        service.sign_batch([('nobody', make_jobs(1)[0][1])])
+    except ValueError as e:
+        assert 'nobody' in str(e)
+    else:
+        raise AssertionError("Expected ValueError")
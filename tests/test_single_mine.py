@@ -3,6 +3,7 @@ import logging
 
 from logic.ethc_miner import ETHCMiner
 from util.wallet_manager import WalletManager
+from util.alchemy_connector import w3
 
 # Configure logging
 logging.basicConfig(
@@ -41,7 +42,8 @@ async def test_single_mine():
         # Wait for confirmation
         logger.info("\nWaiting for transaction confirmation...")
         # Use synchronous wait_for_transaction_receipt
-        tx_receipt = miner.web3.eth.wait_for_transaction_receipt(tx_hash)
+        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        miner.observe_receipt(tx_receipt)
         
         if tx_receipt.status == 1:
             logger.info(f"Mining transaction confirmed! Gas used: {tx_receipt.gasUsed}")
@@ -0,0 +1,73 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from logic.chain_snapshot import ChainSnapshot
+from logic.strategy import MineStrategy
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINE_COST = 10 ** 15
+MINING_REWARD = 50 * 10 ** 18
+GAS_PRICE = 10 * 10 ** 9
+
+def brute_force(others, ethc_price, max_mine_count, own=0):
+    best, best_value = 0, 0.0
+    for n in range(1, max_mine_count + 1):
+        gain = (own + n) / (others + own + n) - (own / (others + own) if others + own else 0)
+        value = gain * MINING_REWARD * ethc_price - n * MINE_COST - (50_000 + 25_000 * n) * GAS_PRICE
+        if value > best_value:
+            best, best_value = n, value
+    return best
+
+def test_matches_brute_force():
+    strategy = MineStrategy(max_mine_count=300)
+    for others, own, ethc_price in [(0, 0, 0.001), (40, 0, 0.001), (200, 10, 0.0005), (50, 0, 0.00001)]:
+        decision = strategy.solve(others, MINE_COST, MINING_REWARD, GAS_PRICE, ethc_price, own=own)
+        logger.info(f"others={others} own={own} price={ethc_price}: {decision}")
+        assert decision.mine_count == brute_force(others, ethc_price, 300, own=own)
+
+def test_weights_competitors_by_mine_count():
+    strategy = MineStrategy()
+    probabilities = strategy.win_probabilities(others=30)
+
+    assert probabilities[10] == 10 / 40
+    assert np.all(np.diff(probabilities) > 0)
+
+def test_unprofitable_block_mines_nothing():
+    decision = MineStrategy().solve(10_000, MINE_COST, MINING_REWARD, GAS_PRICE, ethc_price=0.0)
+
+    assert decision.mine_count == 0
+    assert decision.cost == 0
+
+def test_missing_price_fails_loudly():
+    # An unset ETHC_PRICE_ETH must not read as a worthless reward and silently stop mining
+    with pytest.raises(ValueError, match='ETHC_PRICE_ETH'):
+        MineStrategy().solve(0, MINE_COST, MINING_REWARD, GAS_PRICE, ethc_price=None)
+
+def test_budget_caps_mine_count():
+    strategy = MineStrategy()
+    unlimited = strategy.solve(100, MINE_COST, MINING_REWARD, GAS_PRICE, 0.01)
+    capped = strategy.solve(100, MINE_COST, MINING_REWARD, GAS_PRICE, 0.01, budget=unlimited.cost // 2)
+
+    assert 0 < capped.mine_count < unlimited.mine_count
+    assert capped.cost <= unlimited.cost // 2
+
+def test_decide_from_snapshot_is_fast():
+    snapshot = ChainSnapshot(
+        eth_block_number=19_000_000, timestamp=1_700_000_000, base_fee=GAS_PRICE, ethc_block=100,
+        last_block_time=1_699_999_970, mine_cost=MINE_COST, mining_reward=MINING_REWARD, miner_count=120
+    )
+    strategy = MineStrategy()
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        decision = strategy.decide(snapshot, GAS_PRICE, ethc_price=0.01, own=20)
+    per_decision = (time.perf_counter() - start) / runs
+    logger.info(f"{per_decision * 1e6:.1f}us per decision: {decision}")
+
+    assert decision.mine_count > 0
+    assert per_decision < 0.001
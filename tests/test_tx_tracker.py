@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import threading
+
+from database.connection import create_session_factory
+from logic.tx_tracker import MineTracker
+from tests.chain_stub import EthcChainStub
+from tests.rpc_stub_server import RPCStubServer
+from tests.test_nonce_manager import ACCOUNTS, make_chain, make_miner
+from util.alchemy_connector import PooledAsyncHTTPProvider, batch_request, build_async_web3
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_tracker(chain, tmp_path, **kwargs):
+    miner = make_miner(chain)
+    session_factory = create_session_factory(f"sqlite:///{tmp_path / 'tracker.db'}")
+    tracker = MineTracker(miner, session_factory=session_factory, **kwargs)
+    miner.tracker = tracker
+    return miner, tracker
+
+def test_tracks_mines_to_outcome(tmp_path):
+    chain = make_chain()
+    chain.hold_transactions = True
+    miner, tracker = make_tracker(chain, tmp_path)
+    block = chain.ethc_block
+
+    async def run():
+        tx_hashes = await miner.mine_all(mine_count=2)
+        await tracker.step()
+        assert tracker.pending_count == len(ACCOUNTS)
+
+        chain.include_pending()
+        await tracker.step()
+        assert tracker.pending_count == 0
+
+        chain.advance()
+        chain.start_new_block(winner=ACCOUNTS[1].address)
+        waits = [asyncio.ensure_future(tracker.wait_for_outcome(tx_hash, timeout=5))
+                 for tx_hash in tx_hashes.values()]
+        tracker.close_block(chain.ethc_block - 1)
+        await tracker.step()
+        return await asyncio.gather(*waits)
+
+    records = asyncio.run(run())
+
+    for account, record in zip(ACCOUNTS, records):
+        assert record['status'] == 'confirmed'
+        assert record['ethc_block'] == block
+        assert record['mine_count'] == 2
+        assert record['gas_used'] == chain.mine_gas(2)
+        assert record['gas_paid'] > 0
+        assert record['outcome'] == ('won' if account == ACCOUNTS[1] else 'lost')
+    assert [record['reward'] for record in records] == [0, chain.mining_reward, 0]
+    # Receipts also train the gas model
+    assert len(miner.gas_model.samples) == len(ACCOUNTS)
+
+def test_reward_is_read_at_the_mined_block(tmp_path):
+    chain = make_chain()
+    miner, tracker = make_tracker(chain, tmp_path)
+    reward = chain.mining_reward
+
+    async def run():
+        tx_hash = await miner.mine('wallet0')
+        await tracker.step()
+        # The reward halves before the block is resolved
+        chain.mining_rewards[chain.eth_block_number] = reward
+        chain.mining_reward = reward // 2
+        chain.advance()
+        chain.start_new_block(winner=ACCOUNTS[0].address)
+        tracker.close_block(chain.ethc_block - 1)
+        await tracker.step()
+        return tracker.get(tx_hash)
+
+    record = asyncio.run(run())
+
+    assert record['outcome'] == 'won'
+    assert record['reward'] == reward
+
+def test_mine_path_does_not_wait_on_the_database(tmp_path):
+    chain = make_chain()
+    miner, tracker = make_tracker(chain, tmp_path)
+    session_factory = tracker.session_factory
+    loop_sessions = []
+
+    def counting_factory():
+        if threading.current_thread() is threading.main_thread():
+            loop_sessions.append(1)
+        return session_factory()
+
+    tracker.session_factory = counting_factory
+
+    async def run():
+        tx_hash = await miner.mine('wallet0')
+        assert tracker.get(tx_hash) is None  # buffered until the next step
+        loop_sessions.clear()
+        await tracker.step()
+        return tx_hash
+
+    tx_hash = asyncio.run(run())
+
+    assert loop_sessions == []
+    assert tracker.get(tx_hash)['status'] == 'confirmed'
+
+def test_dropped_mine_resyncs_nonce(tmp_path):
+    chain = make_chain()
+    chain.hold_transactions = True
+    miner, tracker = make_tracker(chain, tmp_path, drop_after=0)
+    address = ACCOUNTS[0].address
+
+    async def run():
+        tx_hash = await miner.mine('wallet0')
+        await miner.mine('wallet0')
+        chain.drop_pending()
+        await tracker.step()
+        return tracker.get(tx_hash)
+
+    record = asyncio.run(run())
+
+    assert record['status'] == 'dropped'
+    assert miner.wallet_manager.nonce_manager.peek(address) == 0
+
+def test_tracker_resumes_after_restart(tmp_path):
+    chain = make_chain()
+    chain.hold_transactions = True
+    miner, tracker = make_tracker(chain, tmp_path)
+
+    asyncio.run(miner.mine_all())
+    asyncio.run(tracker.flush())  # as run() does on the way out
+    chain.include_pending()
+
+    restarted = MineTracker(miner, session_factory=tracker.session_factory)
+    assert restarted.pending_count == len(ACCOUNTS)
+    asyncio.run(restarted.step())
+    assert restarted.pending_count == 0
+
+def test_run_follows_watcher(tmp_path):
+    chain = make_chain()
+    miner, tracker = make_tracker(chain, tmp_path, poll_interval=0.01)
+    watcher = miner.get_block_watcher(start_block=chain.eth_block_number, poll_interval=0.01,
+                                      ws_url=None, checkpoint_name=None)
+
+    async def run():
+        watcher_task = asyncio.ensure_future(watcher.run())
+        tracker_task = asyncio.ensure_future(tracker.run(watcher))
+        try:
+            tx_hash = await miner.mine('wallet2')
+            chain.advance()
+            chain.start_new_block(winner=ACCOUNTS[2].address)
+            return await tracker.wait_for_outcome(tx_hash, timeout=5)
+        finally:
+            tracker.stop()
+            watcher.stop()
+            await asyncio.gather(watcher_task, tracker_task)
+
+    record = asyncio.run(run())
+
+    assert record['outcome'] == 'won'
+    assert record['reward'] == chain.mining_reward
+
+def test_batch_request_uses_one_http_request():
+    chain = EthcChainStub()
+    hashes = ['0x' + f"{index:064x}" for index in range(150)]
+
+    with RPCStubServer(chain) as server:
+        async def run():
+            provider = PooledAsyncHTTPProvider(server.url)
+            try:
+                return await batch_request(build_async_web3(provider), 'eth_getTransactionReceipt',
+                                           [[tx_hash] for tx_hash in hashes])
+            finally:
+                await provider.close()
+
+        results = asyncio.run(run())
+        http_requests = server.http_requests
+
+    assert results == [None] * len(hashes)
+    assert http_requests == 1
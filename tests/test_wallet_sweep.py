@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from tests.rpc_stub_server import RPCStubServer
+from tests.test_nonce_manager import ACCOUNTS, make_chain, make_miner
+from util.alchemy_connector import PooledAsyncHTTPProvider, build_async_web3
+from util.wallet_manager import WalletManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_manager(web3):
+    return WalletManager.from_config({
+        f"WALLET_{index}": {
+            'name': f"Wallet{index}",
+            'public_key': account.address,
+            'private_key': account.key.hex()
+        }
+        for index, account in enumerate(ACCOUNTS)
+    }, web3=web3)
+
+def test_lookups_use_indexes():
+    manager = make_manager(None)
+
+    assert manager.get_wallet_by_name('WALLET1').public_key == ACCOUNTS[1].address
+    assert manager.get_wallet_by_address(ACCOUNTS[2].address.lower()).name == 'Wallet2'
+    assert not hasattr(manager.wallets[0], '__dict__')
+    try:
+        manager.get_wallet_by_name('missing')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError")
+
+def test_sweep_is_one_round_trip():
+    chain = make_chain()
+    chain.balances[ACCOUNTS[1].address] = 5 * 10 ** 17
+    chain.use_nonce(ACCOUNTS[2].address)
+
+    with RPCStubServer(chain) as server:
+        async def run():
+            provider = PooledAsyncHTTPProvider(server.url)
+            manager = make_manager(build_async_web3(provider))
+            try:
+                await manager.web3.eth.chain_id  # warm the chain id cache
+                before = server.http_requests
+                statuses = await manager.sweep(mine_cost=10 ** 16, max_fee_per_gas=10 ** 10,
+                                               gas_intercept=50_000, gas_slope=25_000)
+                return statuses, server.http_requests - before, manager
+            finally:
+                await provider.close()
+
+        statuses, requests, manager = asyncio.run(run())
+
+    # One aggregate eth_call and one batched nonce request, sent together
+    assert requests == 2
+    assert [status.balance for status in statuses.values()] == [10 ** 18, 5 * 10 ** 17, 10 ** 18]
+    assert [status.nonce for status in statuses.values()] == [0, 0, 1]
+    assert len({status.eth_block for status in statuses.values()}) == 1
+    # n * 0.01 ETH + (50k + 25k * n) * 10 gwei within the balance
+    assert statuses['Wallet0'].affordable_mines == (10 ** 18 - 5 * 10 ** 14) // (10 ** 16 + 25 * 10 ** 13)
+    assert manager.nonce_manager.peek(ACCOUNTS[2].address) == 1
+
+def test_mine_all_reads_no_balances():
+    chain = make_chain()
+    miner = make_miner(chain)
+
+    results = asyncio.run(miner.mine_all(mine_count=2))
+
+    assert all(isinstance(result, bytes) for result in results.values())
+    assert chain.request_counts['eth_getBalance'] == 0
+    assert len(chain.transactions) == len(ACCOUNTS)
@@ -0,0 +1,57 @@
+import functools
+import logging
+from collections import namedtuple
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector
+from config import constants
+
+logger = logging.getLogger(__name__)
+
+# Everything needed to decode one event straight from a raw log
+EventLayout = namedtuple('EventLayout', ['name', 'topic', 'indexed', 'data', 'names'])
+
+class CompiledABI:
+    """Selectors, event topics and event layouts computed once from an ABI
+
+    Lookups by function name or 4-byte selector and by event name or topic0 are
+    plain dict reads, with no contract object or web3 client involved.
+    """
+
+    def __init__(self, abi):
+        self.abi = abi
+        self.selectors = {}  # function name -> 4-byte selector
+        self.functions = {}  # selector -> function ABI
+        self.topics = {}  # event name -> topic0
+        self.events = {}  # topic0 -> EventLayout
+        for entry in abi:
+            if entry.get('type') == 'function':
+                selector = function_abi_to_4byte_selector(entry)
+                self.selectors[entry['name']] = selector
+                self.functions[selector] = entry
+            elif entry.get('type') == 'event' and not entry.get('anonymous'):
+                topic = event_abi_to_log_topic(entry)
+                inputs = entry['inputs']
+                self.topics[entry['name']] = topic
+                self.events[topic] = EventLayout(
+                    name=entry['name'],
+                    topic=topic,
+                    indexed=tuple(item['type'] for item in inputs if item.get('indexed')),
+                    data=tuple(item['type'] for item in inputs if not item.get('indexed')),
+                    names=tuple(item['name'] for item in inputs if item.get('indexed'))
+                    + tuple(item['name'] for item in inputs if not item.get('indexed'))
+                )
+
+    def selector(self, function_name):
+        return self.selectors[function_name]
+
+    def topic(self, event_name):
+        return self.topics[event_name]
+
+    def event(self, event_name):
+        return self.events[self.topics[event_name]]
+
+@functools.cache
+def compiled_abi(name):
+    """CompiledABI for config/abi/<name>.json, built on first use"""
+    compiled = CompiledABI(constants.load_abi(name))
+    logger.debug(f"Compiled ABI {name}: {len(compiled.selectors)} functions, {len(compiled.events)} events")
+    return compiled
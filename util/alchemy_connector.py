@@ -1,6 +1,139 @@
-from web3 import Web3
+import asyncio
+import functools
+import inspect
+import logging
+import aiohttp
+from web3 import AsyncWeb3, Web3
+from web3.middleware import async_simple_cache_middleware, construct_simple_cache_middleware
+from web3.providers.async_rpc import AsyncHTTPProvider
 from config import constants
+from util.rpc_pool import RPCPoolProvider
+
+logger = logging.getLogger(__name__)
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that sends every request through one pooled aiohttp session
+
+    The session is created lazily inside the running event loop and shared by all
+    concurrent requests, so reads for many wallets and blocks reuse keep-alive
+    connections up to pool_size at a time.
+    """
+
+    def __init__(self, endpoint_uri, pool_size=None, timeout=None, request_kwargs=None):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        self.pool_size = pool_size or constants.RPC_POOL_SIZE
+        self.timeout = timeout or constants.RPC_TIMEOUT
+        self._session = None
+        self._session_loop = None
+
+    def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # A session from a previous (closed) loop cannot be reused, start a fresh pool
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                raise_for_status=True
+            )
+            self._session_loop = loop
+            logger.debug(f"Opened async RPC session with pool size {self.pool_size}")
+        return self._session
+
+    async def make_request(self, method, params):
+        session = self._get_session()
+        request_data = self.encode_rpc_request(method, params)
+        async with session.post(self.endpoint_uri, data=request_data,
+                                **self.get_request_kwargs()) as response:
+            raw_response = await response.read()
+        return self.decode_rpc_response(raw_response)
+
+    async def make_batch_request(self, requests):
+        """Send [(method, params), ...] as one JSON-RPC batch, returning responses in order"""
+        session = self._get_session()
+        payload = [
+            {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+            for request_id, (method, params) in enumerate(requests)
+        ]
+        async with session.post(self.endpoint_uri, json=payload, **self.get_request_kwargs()) as response:
+            responses = await response.json(content_type=None)
+        by_id = {response.get('id'): response for response in responses}
+        return [by_id.get(request_id, {'error': {'message': 'missing from batch response'}})
+                for request_id in range(len(requests))]
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+def build_web3(provider):
+    """Create a Web3 client for the given provider with the miner's standard middleware"""
+    web3 = Web3(provider)
+    # The validation middleware asks for eth_chainId before every eth_call; answer it from cache
+    web3.middleware_onion.add(construct_simple_cache_middleware(), name='simple_cache')
+    return web3
+
+def build_async_web3(provider):
+    """Create an AsyncWeb3 client for the given provider with the miner's standard middleware"""
+    web3 = AsyncWeb3(provider)
+    web3.middleware_onion.add(async_simple_cache_middleware, name='simple_cache')
+    return web3
+
+async def resolve(value):
+    """Await results from the async backend, pass sync results through unchanged"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+async def batch_request(web3, method, params_list):
+    """Call one JSON-RPC method for many parameter lists, in a single batch when the provider can
+
+    Results are raw (unformatted) JSON values. A failed item is returned as a
+    ValueError in its place instead of failing the whole batch.
+    """
+    provider = web3.provider
+    requests = [(method, params) for params in params_list]
+    if hasattr(provider, 'make_batch_request'):
+        responses = await provider.make_batch_request(requests)
+    else:
+        responses = await asyncio.gather(*(resolve(provider.make_request(*request)) for request in requests))
+    return [
+        ValueError(response['error']) if response.get('error') else response.get('result')
+        for response in responses
+    ]
 
 # Connect to the Ethereum network
 ALCHEMY_API_KEY = constants.ALCHEMY_API_KEY
-w3 = Web3(Web3.HTTPProvider(f'https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}'))
\ No newline at end of file
+ALCHEMY_URL = f'https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}'
+RPC_URLS = [ALCHEMY_URL] + [url for url in constants.RPC_ENDPOINTS if url != ALCHEMY_URL]
+
+def build_async_provider(urls):
+    """One pooled HTTP provider, or an RPCPoolProvider routing across several"""
+    if len(urls) == 1:
+        return PooledAsyncHTTPProvider(urls[0])
+    return RPCPoolProvider([PooledAsyncHTTPProvider(url) for url in urls])
+
+@functools.cache
+def get_w3():
+    """Blocking client for scripts and one-off calls, built on first use"""
+    return build_web3(Web3.HTTPProvider(ALCHEMY_URL))
+
+@functools.cache
+def get_async_w3():
+    """Non-blocking client for the mining loop, built on first use"""
+    return build_async_web3(build_async_provider(RPC_URLS))
+
+def default_web3():
+    """Client used by ETHCMiner and WalletManager, selected by WEB3_BACKEND"""
+    if constants.WEB3_BACKEND == 'sync':
+        return get_w3()
+    return get_async_w3()
+
+def __getattr__(name):
+    # w3 and async_w3 used to be built at import; keep them importable by name
+    if name == 'w3':
+        return get_w3()
+    if name == 'async_w3':
+        return get_async_w3()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,35 @@
+import json
+import logging
+import os
+from config.constants import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+class Checkpoint:
+    """Small JSON state file in DATA_DIR, written atomically so a crash never leaves it half-written"""
+
+    def __init__(self, name, data_dir=None):
+        self.path = os.path.join(data_dir or DATA_DIR, f"{name}.json")
+
+    def load(self, default=None):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+        except json.JSONDecodeError as e:
+            logger.error(f"Corrupt checkpoint {self.path}, ignoring it: {e}")
+            return default
+
+    def save(self, state):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,261 @@
+import bisect
+import functools
+import logging
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.constants import METRICS_ENABLED
+from util.abi_registry import compiled_abi
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from a cached read to a slow broadcast
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus layout: per-bucket counts, sum and count"""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+class _Span:
+    """Times a with-block into a histogram, counting an error if it raises"""
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, self.labels)
+        if exc_type is not None:
+            self.metrics.count(self.name + '_errors', self.labels)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+class Metrics:
+    """Counters and latency histograms keyed by metric name and labels
+
+    span() times a block of code, timed() an awaitable; both record the latency
+    under the name and count an error under name + '_errors' when it raises.
+    render() writes everything in the Prometheus text format and serve() exposes
+    it on a local HTTP endpoint.
+
+    When disabled every call returns at once: span() hands back one shared
+    no-op context manager and no RPC middleware is installed, so instrumented
+    code pays about one attribute check.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, prefix='ethc_'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}  # (name, labels) -> count
+        self._server = None
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, tuple(sorted(labels.items())))
+
+    async def timed(self, awaitable, name, **labels):
+        """Await and return awaitable's result, timed like span()"""
+        if not self.enabled:
+            return await awaitable
+        with _Span(self, name, tuple(sorted(labels.items()))):
+            return await awaitable
+
+    def observe(self, name, value, labels=()):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = Histogram()
+        histogram.observe(value)
+
+    def count(self, name, labels=(), amount=1):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            metric = f"{self.prefix}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append(f"{metric}{_labels(labels)} {value}")
+        for name in sorted({name for name, _ in self.histograms}):
+            metric = f"{self.prefix}{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                if histogram_name != name:
+                    continue
+                bounds = [str(bound) for bound in histogram.bounds] + ['+Inf']
+                for bound, total in zip(bounds, histogram.cumulative()):
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', bound),))} {total}")
+                lines.append(f"{metric}_sum{_labels(labels)} {histogram.sum}")
+                lines.append(f"{metric}_count{_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host='127.0.0.1', port=9108):
+        """Serve render() at http://host:port/metrics from a daemon thread
+
+        Returns:
+            The bound (host, port); pass port 0 to pick a free one
+        """
+        if self._server is not None:
+            return self._server.server_address
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        logger.info("Serving metrics on http://%s:%s/metrics", *self._server.server_address)
+        return self._server.server_address
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+# Shared registry for the whole process
+metrics = Metrics()
+
+@functools.cache
+def _function_names():
+    """Contract function names by hex 4-byte selector, so eth_call latency is broken down per function"""
+    names = {}
+    for abi_name in ('ethc_contract', 'multicall3'):
+        for name, selector in compiled_abi(abi_name).selectors.items():
+            names[selector.hex()] = name
+    return names
+
+def _request_name(method, params):
+    if method != 'eth_call':
+        return method
+    try:
+        data = params[0].get('data') or params[0].get('input') or ''
+    except (AttributeError, IndexError):
+        return method
+    data = data.hex() if isinstance(data, (bytes, bytearray)) else data.removeprefix('0x')
+    return 'eth_call:' + _function_names().get(data[:8], 'unknown')
+
+def _record(registry, method, params, started, response):
+    labels = (('method', _request_name(method, params)),)
+    registry.observe('rpc_request', time.perf_counter() - started, labels)
+    if response is None or 'error' in response:
+        registry.count('rpc_request_errors', labels)
+
+def metrics_middleware(registry):
+    def middleware(make_request, web3):
+        def middleware_fn(method, params):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = make_request(method, params)
+                return response
+            finally:
+                _record(registry, method, params, started, response)
+        return middleware_fn
+    return middleware
+
+def async_metrics_middleware(registry):
+    async def middleware(make_request, web3):
+        async def middleware_fn(method, params):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = await make_request(method, params)
+                return response
+            finally:
+                _record(registry, method, params, started, response)
+        return middleware_fn
+    return middleware
+
+_installed = weakref.WeakKeyDictionary()
+
+def install_metrics(web3, registry=None):
+    """Time every JSON-RPC request of a web3 client; a no-op while metrics are disabled
+
+    The layer is kept outermost: calling this again after another middleware was
+    added (the RPC cache, by ETHCMiner on a client WalletManager already timed)
+    moves it back outside, so answers served by the cache are timed as well.
+    """
+    registry = registry or metrics
+    if not registry.enabled:
+        return registry
+    onion = web3.middleware_onion
+    if web3 in _installed:
+        registry, middleware = _installed[web3]
+        if onion.middlewares[0][1] == 'metrics':
+            return registry
+        onion.remove('metrics')
+    else:
+        is_async = getattr(web3.provider, 'is_async', False)
+        middleware = async_metrics_middleware(registry) if is_async else metrics_middleware(registry)
+        _installed[web3] = (registry, middleware)
+    onion.add(middleware, name='metrics')
+    return registry
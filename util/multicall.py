@@ -0,0 +1,75 @@
+import logging
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from config.constants import MULTICALL3_ADDRESS, load_abi
+from util.alchemy_connector import resolve
+from util.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class Multicall:
+    """Batch contract view calls into a single Multicall3 aggregate3 eth_call
+
+    Works with both the sync Web3 and AsyncWeb3 clients from util.alchemy_connector.
+    """
+
+    def __init__(self, web3, address=MULTICALL3_ADDRESS):
+        self.web3 = web3
+        self.contract = self.web3.eth.contract(
+            address=self.web3.to_checksum_address(address),
+            abi=load_abi('multicall3')
+        )
+
+    # Header helpers executed inside the aggregate, so they share its block
+    def block_number(self):
+        return self.contract.functions.getBlockNumber()
+
+    def block_timestamp(self):
+        return self.contract.functions.getCurrentBlockTimestamp()
+
+    def eth_balance(self, address):
+        return self.contract.functions.getEthBalance(address)
+
+    async def aggregate(self, calls, block_identifier='latest'):
+        """Execute bound contract functions in one eth_call
+
+        Args:
+            calls: List of bound ContractFunction objects, e.g. contract.functions.mineCost()
+            block_identifier: Block to pin every call to
+
+        Returns:
+            List of decoded return values in the same order as calls
+        """
+        if not calls:
+            return []
+        if metrics.enabled:
+            for call in calls:
+                metrics.count('contract_calls', (('function', call.fn_name),))
+
+        results = await resolve(self.contract.functions.aggregate3(self.encode(calls)).call(
+            block_identifier=block_identifier
+        ))
+        return self.decode(calls, results)
+
+    def encode(self, calls):
+        return [
+            (call.address, False, call._encode_transaction_data())
+            for call in calls
+        ]
+
+    def decode(self, calls, results):
+        if len(results) != len(calls):
+            raise ValueError(f"Expected {len(calls)} results, got {len(results)}")
+
+        decoded = []
+        for call, (success, return_data) in zip(calls, results):
+            if not success:
+                raise ValueError(f"Call {call.fn_name} reverted inside multicall")
+
+            output_types = get_abi_output_types(call.abi)
+            values = self.web3.codec.decode(output_types, return_data)
+            values = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, values)
+            decoded.append(values[0] if len(values) == 1 else tuple(values))
+
+        logger.debug("Decoded %s multicall results", len(decoded))
+        return decoded
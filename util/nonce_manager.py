@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from util.alchemy_connector import resolve
+
+logger = logging.getLogger(__name__)
+
+# Node errors that mean our local nonce no longer matches the chain
+NONCE_ERROR_MARKERS = (
+    'nonce too low',
+    'nonce too high',
+    'invalid nonce',
+)
+
+# Node errors that mean a transaction with this nonce is already in the pool. The nonce
+# is not stale: sending again with a fresh one could pay for the same mines twice
+ALREADY_SENT_MARKERS = (
+    'already known',
+    'replacement transaction underpriced',
+)
+
+def is_nonce_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+def is_already_sent(error):
+    message = str(error).lower()
+    return any(marker in message for marker in ALREADY_SENT_MARKERS)
+
+def is_rejection(error):
+    """The node answered with a JSON-RPC error, so the transaction was definitely not accepted
+
+    Anything else (a timeout, a dropped connection) leaves it open whether the
+    transaction went out, and its nonce must not be handed out again.
+    """
+    return isinstance(error, ValueError) and bool(error.args) and isinstance(error.args[0], dict)
+
+class NonceManager:
+    """Allocate transaction nonces per wallet locally
+
+    The pending transaction count is read once per wallet; after that nonces are
+    handed out from memory under a per-wallet lock, so concurrent mines from the
+    same wallet never share a nonce and never wait on an RPC. The chain id is
+    read once as well.
+
+    Call resync() after a "nonce too low" error or when a transaction is dropped,
+    and release() when a signed transaction was never broadcast or the node
+    rejected it. A send that failed without an answer may still have gone out,
+    so its nonce is kept and the transaction tracked until it lands or drops.
+    """
+
+    def __init__(self, web3):
+        self.web3 = web3
+        self._next = {}  # address -> next nonce to hand out
+        self._locks = {}
+        self._chain_id = None
+
+    async def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = await resolve(self.web3.eth.chain_id)
+        return self._chain_id
+
+    async def allocate(self, address):
+        """Reserve the next nonce for address"""
+        async with self._lock(address):
+            if address not in self._next:
+                self._next[address] = await self._pending_count(address)
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    def release(self, address, nonce):
+        """Return a nonce whose transaction was never broadcast or was rejected by the node"""
+        if self._next.get(address) == nonce + 1:
+            self._next[address] = nonce
+        elif address in self._next:
+            # A later nonce is already out, so this one leaves a gap; re-read on next use
+            logger.warning("Nonce %s for %s released out of order, resyncing", nonce, address)
+            del self._next[address]
+
+    async def resync(self, address):
+        """Reset the local nonce for address to the node's pending count"""
+        async with self._lock(address):
+            pending = await self._pending_count(address)
+            previous = self._next.get(address)
+            self._next[address] = pending
+            if previous is not None and previous != pending:
+                logger.warning("Resynced nonce for %s: %s -> %s", address, previous, pending)
+            return pending
+
+    def seed(self, address, pending_count):
+        """Load a pending count read elsewhere, for a wallet not allocated from yet"""
+        if address not in self._next and not self._lock(address).locked():
+            self._next[address] = pending_count
+
+    def peek(self, address):
+        """Next nonce that allocate() would return, or None if not loaded yet"""
+        return self._next.get(address)
+
+    def _lock(self, address):
+        lock = self._locks.get(address)
+        if lock is None:
+            lock = self._locks[address] = asyncio.Lock()
+        return lock
+
+    async def _pending_count(self, address):
+        return await resolve(self.web3.eth.get_transaction_count(address, 'pending'))
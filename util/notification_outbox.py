@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from collections import namedtuple
+from python_http_client.exceptions import HTTPError
+from config.constants import NOTIFY_DIGEST_WINDOW, SENDGRID_API_KEY, SENDGRID_HOST
+from util.sendgrid_wrapper import admin_message, build_mail, get_client
+
+logger = logging.getLogger(__name__)
+
+# One queued email: its subject and the SendGrid request body
+Notification = namedtuple('Notification', ['subject', 'request_body'])
+
+def is_retryable(status_code):
+    """Rate limits and server errors may pass on a later attempt, other client errors never will"""
+    return status_code == 429 or status_code >= 500
+
+class NotificationOutbox:
+    """Emails queued from the event loop and sent to SendGrid by one background worker
+
+    send() and notify_admins() only enqueue, so nothing on the event loop waits
+    on an HTTPS round-trip. The worker posts each message in a thread with a
+    single SendGridAPIClient, and retries connection errors, 429s and 5xx with
+    exponential backoff (honouring Retry-After) for up to max_attempts; any
+    other error status drops the message with an error logged.
+
+    Admin alerts are coalesced: the first one starts a digest_window timer and
+    every alert raised before it fires goes out in the same email.
+    """
+
+    def __init__(self, api_key=SENDGRID_API_KEY, host=SENDGRID_HOST, max_attempts=5, backoff=1.0,
+                 max_backoff=60.0, digest_window=NOTIFY_DIGEST_WINDOW, maxsize=1000):
+        self.client = get_client(api_key, host)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.digest_window = digest_window
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+        self._alerts = []  # (subject, message) waiting for the digest
+        self._digest_timer = None
+        self._worker = None
+
+    def start(self):
+        """Start the worker on the running loop"""
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._run())
+        return self
+
+    async def close(self, timeout=30.0):
+        """Send pending alerts and drain the queue, for up to timeout seconds, then stop the worker"""
+        self.flush_alerts()
+        try:
+            if self._worker is not None:
+                await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Closing outbox with {self.queue.qsize()} emails unsent")
+        finally:
+            if self._worker is not None:
+                self._worker.cancel()
+                await asyncio.gather(self._worker, return_exceptions=True)
+                self._worker = None
+
+    def send(self, sender, recipients, subject, body_text, body_html, attachments=None, ccs=None,
+             bccs=None, categories=None):
+        """Queue an email, with the arguments of sendgrid_wrapper.send_message
+
+        Returns:
+            False when the queue is full and the email was dropped
+        """
+        request_body = build_mail(sender, recipients, subject, body_text, body_html,
+                                  attachments=attachments, ccs=ccs, bccs=bccs, categories=categories)
+        try:
+            self.queue.put_nowait(Notification(subject, request_body))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"Outbox full, dropping email '{subject}'")
+            return False
+
+    def notify_admins(self, message, subject=None):
+        """Queue an admin alert, sent with any others raised within digest_window seconds"""
+        self._alerts.append((subject, message))
+        if self._digest_timer is None:
+            self._digest_timer = asyncio.get_running_loop().call_later(self.digest_window, self.flush_alerts)
+
+    def flush_alerts(self):
+        """Queue the alerts collected so far, as one email"""
+        if self._digest_timer is not None:
+            self._digest_timer.cancel()
+            self._digest_timer = None
+        alerts, self._alerts = self._alerts, []
+        if not alerts:
+            return
+        if len(alerts) == 1:
+            subject, message = alerts[0]
+            self.send(**admin_message(message, subject))
+            return
+        first = alerts[0][0] or alerts[0][1]
+        text = '\n\n'.join(f"{subject}\n{message}" if subject else str(message) for subject, message in alerts)
+        html = ''.join(f"<p><b>{subject}</b><br>{message}</p>" if subject else f"<p>{message}</p>"
+                       for subject, message in alerts)
+        digest = admin_message(text, f"{len(alerts)} alerts: {first}")
+        digest['body_html'] = html
+        self.send(**digest)
+
+    async def _run(self):
+        while True:
+            notification = await self.queue.get()
+            try:
+                await self._deliver(notification)
+            except Exception as e:
+                logger.error(f"Error delivering email '{notification.subject}': {e}")
+                self.failed += 1
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, notification):
+        for attempt in range(self.max_attempts):
+            delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+            try:
+                response = await asyncio.to_thread(self._post, notification.request_body)
+                self.sent += 1
+                logger.info("Sent email '%s': %s", notification.subject, response.status_code)
+                return
+            except HTTPError as e:
+                if not is_retryable(e.status_code):
+                    self.failed += 1
+                    logger.error(f"SendGrid rejected email '{notification.subject}': {e.status_code} {e.body}")
+                    return
+                retry_after = (e.headers or {}).get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    delay = min(float(retry_after), self.max_backoff)
+                error = e.status_code
+            except OSError as e:
+                error = e
+            if attempt + 1 < self.max_attempts:
+                logger.warning("Sending email '%s' failed (%s), retrying in %.1fs", notification.subject, error, delay)
+                await asyncio.sleep(delay)
+        self.failed += 1
+        logger.error(f"Giving up on email '{notification.subject}' after {self.max_attempts} attempts: {error}")
+
+    def _post(self, request_body):
+        return self.client.client.mail.send.post(request_body=request_body)
@@ -0,0 +1,188 @@
+import json
+import logging
+import time
+import weakref
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Position of the block identifier in each cacheable method's params
+BLOCK_PARAM = {
+    'eth_call': 1,
+    'eth_getBalance': 1,
+    'eth_getCode': 1,
+    'eth_getStorageAt': 2,
+    'eth_getTransactionCount': 1,
+    'eth_getBlockByNumber': 0,
+}
+# Answers that never change for a chain
+IMMUTABLE_METHODS = {'eth_chainId'}
+# Answers that only hold for the current head
+HEAD_METHODS = {'eth_gasPrice', 'eth_maxPriorityFeePerGas'}
+
+_MISSING = object()
+
+class RPCCache:
+    """LRU cache of RPC answers, keyed by (method, params) and scoped to the chain head
+
+    Immutable entries (reads pinned to a block at least `finality_depth` below the
+    head, the chain id, or anything the caller marks immutable) are kept until the
+    LRU cap evicts them. Head-scoped entries (reads at 'latest' or at a recent,
+    still reorgable block) are dropped as soon as a newer head is seen.
+
+    The head comes from eth_blockNumber answers passing through the middleware (the
+    block watcher polls it) and from advance_head(). Head-scoped entries are only
+    served while the head has been confirmed by an uncached eth_blockNumber within
+    the last `head_ttl` seconds, so without anyone following the head they are not
+    cached at all.
+    """
+
+    def __init__(self, max_entries=10_000, finality_depth=64, head_ttl=12.0):
+        self.max_entries = max_entries
+        self.finality_depth = finality_depth
+        self.head_ttl = head_ttl
+        self.head = None
+        self._head_seen_at = 0.0
+        self._immutable = OrderedDict()
+        self._head = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        self._expire_head()
+        for entries in (self._immutable, self._head):
+            value = entries.get(key, _MISSING)
+            if value is not _MISSING:
+                entries.move_to_end(key)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value, immutable=False):
+        entries = self._immutable if immutable else self._head
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(self._immutable) + len(self._head) > self.max_entries:
+            # Head-scoped entries go first, they are about to be invalidated anyway
+            (self._head or self._immutable).popitem(last=False)
+            self.evictions += 1
+
+    def advance_head(self, block_number, confirmed=True):
+        """Report the current Ethereum head; a newer head invalidates head-scoped entries
+
+        Args:
+            confirmed: The number was read fresh from the node, so head-scoped entries
+                may be served for another head_ttl seconds. Pass False for numbers that
+                may have been answered from this cache, which must never extend it.
+        """
+        if self.head is not None and block_number < self.head:
+            return
+        if self.head is None or block_number > self.head:
+            if self._head:
+                logger.debug(f"New head {block_number}, dropping {len(self._head)} cached reads")
+            self._head.clear()
+            self.head = block_number
+        if confirmed:
+            self._head_seen_at = time.monotonic()
+
+    def is_final(self, block_number):
+        return self.head is not None and block_number <= self.head - self.finality_depth
+
+    def clear(self):
+        self._immutable.clear()
+        self._head.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'immutable_entries': len(self._immutable),
+            'head_entries': len(self._head),
+        }
+
+    def request_scope(self, method, params):
+        """How a request may be cached: 'immutable', 'head', or None for not at all"""
+        if method in IMMUTABLE_METHODS:
+            return 'immutable'
+        if method in HEAD_METHODS:
+            return 'head'
+        position = BLOCK_PARAM.get(method)
+        if position is None:
+            return None
+        block = params[position] if len(params) > position else 'latest'
+        if isinstance(block, str) and not block.startswith('0x'):
+            # Only 'latest' is a stable view of the head; pending/safe/finalized move on their own
+            return 'head' if block == 'latest' else None
+        number = int(block, 16) if isinstance(block, str) else block
+        return 'immutable' if self.is_final(number) else 'head'
+
+    def request_key(self, method, params):
+        return method, json.dumps(params, sort_keys=True, default=str)
+
+    def observe(self, method, response):
+        """Learn the head from uncached answers"""
+        if method == 'eth_blockNumber' and response.get('result') is not None:
+            self.advance_head(response['result'])
+
+    def store_response(self, key, scope, response):
+        if 'error' in response or response.get('result') is None:
+            return
+        self.put(key, response, immutable=scope == 'immutable')
+
+    def _expire_head(self):
+        if self._head and (self.head is None or time.monotonic() - self._head_seen_at > self.head_ttl):
+            # Nobody has confirmed the head lately, so these may be out of date
+            self._head.clear()
+
+def rpc_cache_middleware(cache):
+    def middleware(make_request, web3):
+        def middleware_fn(method, params):
+            scope = cache.request_scope(method, params)
+            if scope is None:
+                response = make_request(method, params)
+                cache.observe(method, response)
+                return response
+            key = cache.request_key(method, params)
+            response = cache.get(key)
+            if response is None:
+                response = make_request(method, params)
+                cache.store_response(key, scope, response)
+            return response
+        return middleware_fn
+    return middleware
+
+def async_rpc_cache_middleware(cache):
+    async def middleware(make_request, web3):
+        async def middleware_fn(method, params):
+            scope = cache.request_scope(method, params)
+            if scope is None:
+                response = await make_request(method, params)
+                cache.observe(method, response)
+                return response
+            key = cache.request_key(method, params)
+            response = cache.get(key)
+            if response is None:
+                response = await make_request(method, params)
+                cache.store_response(key, scope, response)
+            return response
+        return middleware_fn
+    return middleware
+
+_installed = weakref.WeakKeyDictionary()
+
+def install_rpc_cache(web3, cache=None):
+    """Put an RPCCache in front of a web3 client, or return the one it already has"""
+    if web3 in _installed:
+        return _installed[web3]
+    cache = cache or RPCCache()
+    # Async clients need the coroutine version of the middleware
+    is_async = getattr(web3.provider, 'is_async', False)
+    middleware = async_rpc_cache_middleware(cache) if is_async else rpc_cache_middleware(cache)
+    web3.middleware_onion.add(middleware, name='rpc_cache')
+    _installed[web3] = cache
+    return cache
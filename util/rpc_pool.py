@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from urllib.parse import urlparse
+from web3.providers.async_base import AsyncBaseProvider
+from config import constants
+
+logger = logging.getLogger(__name__)
+
+# Requests sent to every endpoint at once rather than routed to one
+BROADCAST_METHODS = {'eth_sendRawTransaction'}
+
+class EndpointStats:
+    """Rolling latency and error record for one RPC endpoint"""
+
+    def __init__(self, name, window=200, max_consecutive_errors=3, cooldown=30.0):
+        self.name = name
+        self.max_consecutive_errors = max_consecutive_errors
+        self.cooldown = cooldown
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+
+    def record(self, latency, ok):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+            self.consecutive_errors = 0
+        else:
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= self.max_consecutive_errors:
+                self.cooldown_until = time.monotonic() + self.cooldown
+                logger.warning("RPC endpoint %s failing, benched for %ss", self.name, self.cooldown)
+
+    def record_cancelled(self, latency):
+        """A request abandoned after `latency` seconds, e.g. a hedge that lost the race
+
+        The answer would have taken at least that long, so it counts as a latency
+        sample without touching the error record.
+        """
+        self.latencies.append(latency)
+
+    def percentile(self, q):
+        if not self.latencies:
+            return 0.0  # unmeasured endpoints rank first so they get measured
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    @property
+    def p50(self):
+        return self.percentile(0.5)
+
+    @property
+    def p99(self):
+        return self.percentile(0.99)
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def healthy(self):
+        # After the cooldown the endpoint is back on probation; more errors bench it again
+        return time.monotonic() >= self.cooldown_until
+
+    def summary(self):
+        return {
+            'p50': self.p50,
+            'p99': self.p99,
+            'error_rate': self.error_rate,
+            'healthy': self.healthy,
+            'requests': len(self.outcomes),
+        }
+
+class RPCPoolProvider(AsyncBaseProvider):
+    """Async provider that spreads requests over several JSON-RPC endpoints
+
+    Reads go to the healthy endpoint with the lowest rolling p50 latency. If no
+    answer has come back after `hedge_after` seconds the read is also sent to the
+    next fastest endpoint, and whichever answers first wins. Transport errors fail
+    over to the next endpoint right away. Signed transactions are sent to every
+    endpoint at once and the first acceptance is returned.
+
+    Endpoints that keep failing are benched for a cooldown and then tried again.
+    """
+
+    def __init__(self, providers, hedge_after=None, max_hedges=1):
+        super().__init__()
+        if not providers:
+            raise ValueError("RPCPoolProvider needs at least one endpoint")
+        self.providers = providers
+        self.hedge_after = constants.RPC_HEDGE_AFTER if hedge_after is None else hedge_after
+        self.max_hedges = max_hedges
+        self.stats = [EndpointStats(self._name(provider)) for provider in providers]
+        self.hedges = 0
+        self._background = set()
+
+    def _name(self, provider):
+        # Host only, the path usually carries the API key
+        uri = getattr(provider, 'endpoint_uri', None)
+        return urlparse(str(uri)).netloc if uri else type(provider).__name__
+
+    def ranked(self):
+        """Endpoint indexes, healthy ones fastest first, benched ones last"""
+        order = sorted(range(len(self.providers)), key=lambda index: self.stats[index].p50)
+        healthy = [index for index in order if self.stats[index].healthy]
+        return healthy + [index for index in order if index not in healthy]
+
+    async def make_request(self, method, params):
+        if method in BROADCAST_METHODS:
+            return await self._broadcast(lambda provider: provider.make_request(method, params))
+        return await self._route(lambda provider: provider.make_request(method, params))
+
+    async def make_batch_request(self, requests):
+        return await self._route(lambda provider: provider.make_batch_request(requests))
+
+    async def is_connected(self):
+        return any(stats.healthy for stats in self.stats)
+
+    async def close(self):
+        for task in list(self._background):
+            task.cancel()
+        for provider in self.providers:
+            if hasattr(provider, 'close'):
+                await provider.close()
+
+    def endpoint_stats(self):
+        return {stats.name: stats.summary() for stats in self.stats}
+
+    async def _timed(self, index, request):
+        started = time.monotonic()
+        try:
+            result = await request(self.providers[index])
+        except Exception:
+            self.stats[index].record(time.monotonic() - started, ok=False)
+            raise
+        self.stats[index].record(time.monotonic() - started, ok=True)
+        return result
+
+    async def _route(self, request):
+        candidates = iter(self.ranked())
+        pending = {}
+        started = {}
+        error = None
+        exhausted = False
+
+        def start(index):
+            pending[asyncio.ensure_future(self._timed(index, request))] = index
+            started[index] = time.monotonic()
+
+        start(next(candidates))
+        try:
+            while pending:
+                can_hedge = not exhausted and len(pending) <= self.max_hedges
+                done, _ = await asyncio.wait(
+                    pending, timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Over the latency budget: race the next endpoint against the slow one
+                    index = next(candidates, None)
+                    if index is None:
+                        exhausted = True
+                        continue
+                    self.hedges += 1
+                    logger.debug("Hedging read to %s", self.stats[index].name)
+                    start(index)
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        error = e
+                        logger.warning("RPC endpoint %s failed: %s", self.stats[index].name, e)
+                if not pending:
+                    index = next(candidates, None)
+                    if index is not None:
+                        start(index)
+            raise error
+        finally:
+            # Hedge losers, or every request if the caller gave up. Their time so far is recorded
+            # here rather than in the task, which only sees the cancel after the next read is routed;
+            # without a sample a slow endpoint would keep p50 0.0 and stay ranked first
+            now = time.monotonic()
+            for task, index in pending.items():
+                if not task.done():
+                    task.cancel()
+                    self.stats[index].record_cancelled(now - started[index])
+
+    async def _broadcast(self, request):
+        tasks = {asyncio.ensure_future(self._timed(index, request)): index for index in range(len(self.providers))}
+        first_response = None
+        error = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    response = task.result()
+                except Exception as e:
+                    error = e
+                    logger.warning("Broadcast to %s failed: %s", self.stats[tasks[task]].name, e)
+                    continue
+                if 'error' not in response:
+                    # Let the other endpoints finish in the background
+                    for other in pending:
+                        self._background.add(other)
+                        other.add_done_callback(self._forget)
+                    return response
+                first_response = first_response or response
+        if first_response is not None:
+            return first_response
+        raise error
+
+    def _forget(self, task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Background broadcast failed: %s", task.exception())
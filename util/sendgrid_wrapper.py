@@ -1,7 +1,11 @@
+import functools
+import logging
 import sendgrid
 import sendgrid.helpers.mail as sgh
 from config import constants
 
+logger = logging.getLogger(__name__)
+
 class Email(object):
     def __init__(self, email, name):
         self.email = email
@@ -15,30 +19,39 @@ class Attachment(object):
         self.disposition = disposition
         self.content_id = content_id
 
-def notify_admins(message, subject=None):
-    if 'localhost' in constants.HOST or 'pagekite' in constants.HOST:
-        recipients=[Email(constants.DEV_EMAIL, constants.DEV_EMAIL)]
+@functools.cache
+def get_client(api_key=None, host=None):
+    """SendGridAPIClient shared by every send with the same key and host"""
+    return sendgrid.SendGridAPIClient(api_key or constants.SENDGRID_API_KEY, host=host or constants.SENDGRID_HOST)
+
+def admin_message(message, subject=None):
+    """send_message arguments for an email to the admins"""
+    host = constants.HOST or ''
+    recipients = [Email(constants.DEV_EMAIL, constants.DEV_EMAIL)]
+    if 'localhost' in host or 'pagekite' in host:
         subject = 'DEV: ' + str(subject) if subject else str(message)
     else:
-        recipients = [Email(constants.DEV_EMAIL, constants.DEV_EMAIL)]
         subject = str(subject) if subject else str(message)
+    return {
+        'sender': Email(constants.DEV_EMAIL, constants.DEV_EMAIL),
+        'recipients': recipients,
+        'subject': subject,
+        'body_text': message,
+        'body_html': message,
+        'categories': ['my-app', 'notify_admins'],
+    }
 
-    send_message(
-		sender=Email(constants.DEV_EMAIL, constants.DEV_EMAIL),
-		recipients=recipients,
-		subject=subject,
-		body_text=message,
-		body_html=message,
-		categories=['my-app', 'notify_admins'])
+def notify_admins(message, subject=None):
+    """Email the admins right away; from the event loop use NotificationOutbox.notify_admins instead"""
+    send_message(**admin_message(message, subject))
 
-def send_message(sender, recipients, subject, body_text, body_html, 
-    attachments=None, ccs=None, bccs=None, categories=None, send=True):
-    
-    sg_api = sendgrid.SendGridAPIClient(constants.SENDGRID_API_KEY)
+def build_mail(sender, recipients, subject, body_text, body_html,
+               attachments=None, ccs=None, bccs=None, categories=None):
+    """SendGrid v3 mail/send request body"""
     mail = sgh.Mail()
     mail.from_email = sgh.Email(sender.email, sender.name)
     mail.subject = subject
-    
+
     for recipient in recipients:
         personalization = sgh.Personalization()
         personalization.add_to(sgh.Email(recipient.email, recipient.name))
@@ -66,10 +79,19 @@ def send_message(sender, recipients, subject, body_text, body_html,
     if categories:
         for category in categories:
             mail.add_category(sgh.Category(category))
-    if send:
-        response = sg_api.client.mail.send.post(request_body=mail.get())
-        print(response.status_code)
-        print(response.body)
-        print(response.headers)
-
+    return mail.get()
 
+def send_message(sender, recipients, subject, body_text, body_html,
+                 attachments=None, ccs=None, bccs=None, categories=None, send=True):
+    """Send an email through SendGrid and wait for the response"""
+    request_body = build_mail(sender, recipients, subject, body_text, body_html,
+                              attachments=attachments, ccs=ccs, bccs=bccs, categories=categories)
+    if not send:
+        return None
+    try:
+        response = get_client().client.mail.send.post(request_body=request_body)
+        logger.info(f"Sent email '{subject}': {response.status_code}")
+        return response
+    except Exception as e:
+        logger.error(f"Error sending email '{subject}': {e}")
+        raise
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from eth_account import Account
+from config.constants import SIGNING_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Accounts of the current worker process, set once by _init_worker
+_worker_accounts = {}
+
+def _init_worker(private_keys):
+    _worker_accounts.clear()
+    for name, private_key in private_keys.items():
+        _worker_accounts[name] = Account.from_key(private_key)
+
+def _sign_local(accounts, jobs):
+    return [bytes(accounts[name].sign_transaction(transaction).rawTransaction) for name, transaction in jobs]
+
+def _sign_chunk(jobs):
+    return _sign_local(_worker_accounts, jobs)
+
+class SigningService:
+    """Sign batches of transactions in parallel across a process pool
+
+    Signing is pure Python (secp256k1, RLP, keccak), so a batch for dozens of
+    wallets holds the event loop for a noticeable time. The service spreads a
+    batch over worker processes in one chunk per worker. Private keys are handed
+    to each worker once, at start-up; jobs only carry a wallet name and the
+    transaction dict.
+
+    Batches smaller than `min_parallel`, or a pool of one worker, are signed in
+    the calling process where the pool's overhead would outweigh the gain.
+    """
+
+    def __init__(self, private_keys, workers=None, min_parallel=16):
+        """
+        Args:
+            private_keys: Dict of wallet name -> private key
+            workers: Worker processes, defaults to SIGNING_WORKERS or the CPU count
+        """
+        self.private_keys = {name.lower(): key for name, key in private_keys.items()}
+        self.workers = workers or SIGNING_WORKERS or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self._accounts = {name: Account.from_key(key) for name, key in self.private_keys.items()}
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.private_keys,)
+            )
+            logger.info(f"Started signing pool with {self.workers} workers")
+        return self._pool
+
+    def sign(self, wallet_name, transaction):
+        """Sign one transaction in this process, returning the raw bytes"""
+        return bytes(self._accounts[wallet_name.lower()].sign_transaction(transaction).rawTransaction)
+
+    def sign_batch(self, jobs):
+        """Sign [(wallet name, transaction), ...], returning raw transactions in input order"""
+        try:
+            jobs = self._normalize(jobs)
+            if not self._parallel(jobs):
+                return _sign_local(self._accounts, jobs)
+            results = self.pool.map(_sign_chunk, self._chunks(jobs))
+            return [raw for chunk in results for raw in chunk]
+        except Exception as e:
+            logger.error(f"Error signing transaction batch: {e}")
+            raise
+
+    async def sign_batch_async(self, jobs):
+        """sign_batch without blocking the event loop"""
+        try:
+            jobs = self._normalize(jobs)
+            loop = asyncio.get_running_loop()
+            if not self._parallel(jobs):
+                # Small batches stay in process but still off the event loop thread
+                return await loop.run_in_executor(None, _sign_local, self._accounts, jobs)
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self.pool, _sign_chunk, chunk) for chunk in self._chunks(jobs)
+            ))
+            return [raw for chunk in results for raw in chunk]
+        except Exception as e:
+            logger.error(f"Error signing transaction batch: {e}")
+            raise
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _normalize(self, jobs):
+        normalized = []
+        for name, transaction in jobs:
+            name = name.lower()
+            if name not in self._accounts:
+                raise ValueError(f"No wallet found with name: {name}")
+            normalized.append((name, transaction))
+        return normalized
+
+    def _parallel(self, jobs):
+        return self.workers > 1 and len(jobs) >= self.min_parallel
+
+    def _chunks(self, jobs):
+        size = -(-len(jobs) // self.workers)
+        return [jobs[start:start + size] for start in range(0, len(jobs), size)]
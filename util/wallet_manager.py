@@ -1,10 +1,19 @@
+import asyncio
 import logging
+from collections import namedtuple
 from eth_account import Account
-from config.constants import WALLETS
-from util.alchemy_connector import w3
+from eth_utils import to_checksum_address
+from config import constants
+from util.alchemy_connector import batch_request, default_web3, resolve
+from util.metrics import install_metrics, metrics
+from util.multicall import Multicall
+from util.nonce_manager import NonceManager
+from util.signing_service import SigningService
 
 logger = logging.getLogger(__name__)
 
+WalletStatus = namedtuple('WalletStatus', ['name', 'address', 'balance', 'nonce', 'affordable_mines', 'eth_block'])
+
 class Transaction:
     def __init__(self, to_address, value_in_wei, gas_limit=21000, data='0x', chain_id=1):
         self.to_address = to_address
@@ -13,11 +22,34 @@ class Transaction:
         self.data = data
         self.chain_id = chain_id
 
-    def to_dict(self, web3, from_address):
-        """Convert transaction to dictionary format required by web3"""
+    def to_dict(self, web3, from_address, nonce=None, gas_price=None):
+        """Convert transaction to dictionary format required by web3
+
+        Nonce and gas price are only fetched when not passed in.
+        """
         return {
-            'nonce': web3.eth.get_transaction_count(from_address),
-            'gasPrice': web3.eth.gas_price,
+            'nonce': web3.eth.get_transaction_count(from_address) if nonce is None else nonce,
+            'gasPrice': web3.eth.gas_price if gas_price is None else gas_price,
+            'gas': self.gas_limit,
+            'to': self.to_address,
+            'value': self.value_in_wei,
+            'data': self.data,
+            'chainId': self.chain_id
+        }
+
+    async def build(self, web3, from_address, nonce_manager=None):
+        """Async counterpart of to_dict, fetching nonce and gas price concurrently
+
+        With a nonce_manager the nonce is allocated locally instead of read from the node.
+        """
+        if nonce_manager is not None:
+            nonce = nonce_manager.allocate(from_address)
+        else:
+            nonce = resolve(web3.eth.get_transaction_count(from_address))
+        nonce, gas_price = await asyncio.gather(nonce, resolve(web3.eth.gas_price))
+        return {
+            'nonce': nonce,
+            'gasPrice': gas_price,
             'gas': self.gas_limit,
             'to': self.to_address,
             'value': self.value_in_wei,
@@ -29,10 +61,12 @@ class Transaction:
         return f"Transaction(to={self.to_address}, value={self.value_in_wei} wei)"
 
 class Wallet:
+    __slots__ = ('name', 'public_key', 'private_key')
+
     def __init__(self, name, public_key, private_key):
         self.name = name
         # Convert public key to checksum address
-        self.public_key = w3.to_checksum_address(public_key)
+        self.public_key = to_checksum_address(public_key)
         self.private_key = private_key
 
     def __str__(self):
@@ -46,16 +80,37 @@ class WalletManager:
         if cls._instance is None:
             logger.info("Initializing new WalletManager instance")
             cls._instance = super(WalletManager, cls).__new__(cls)
-            cls._instance.wallets = []
-            cls._instance.web3 = w3
+            cls._instance._reset()
+            cls._instance.web3 = default_web3()
+            install_metrics(cls._instance.web3)
+            cls._instance.nonce_manager = NonceManager(cls._instance.web3)
             cls._instance._load_wallets()
         else:
             logger.debug("Using existing WalletManager instance")
         return cls._instance
 
-    def _load_wallets(self):
+    @classmethod
+    def from_config(cls, wallet_configs, web3=None):
+        """Create a standalone (non-singleton) manager for the given wallet configs"""
+        manager = super(WalletManager, cls).__new__(cls)
+        manager._reset()
+        manager.web3 = web3 or default_web3()
+        install_metrics(manager.web3)
+        manager.nonce_manager = NonceManager(manager.web3)
+        manager._load_wallets(wallet_configs)
+        return manager
+
+    def _reset(self):
+        self.wallets = []
+        # Lookup indexes, keyed by lowercased name and address
+        self._by_name = {}
+        self._by_address = {}
+        self._multicall = None
+
+    def _load_wallets(self, wallet_configs=None):
         logger.info("Loading wallets from config")
-        for wallet_data in WALLETS.values():
+        wallet_configs = constants.get_wallets() if wallet_configs is None else wallet_configs
+        for wallet_data in wallet_configs.values():
             try:
                 wallet = Wallet(
                     name=wallet_data['name'],
@@ -63,25 +118,25 @@ class WalletManager:
                     private_key=wallet_data['private_key']
                 )
                 self.wallets.append(wallet)
+                self._by_name[wallet.name.lower()] = wallet
+                self._by_address[wallet.public_key.lower()] = wallet
                 logger.info(f"Loaded wallet: {wallet.name} ({wallet.public_key})")
             except KeyError as e:
                 logger.error(f"Error loading wallet: Missing required field {e}")
 
     def get_wallet_by_name(self, name):
-        for wallet in self.wallets:
-            if wallet.name.lower() == name.lower():
-                logger.debug(f"Found wallet: {wallet}")
-                return wallet
-        logger.warning(f"No wallet found with name: {name}")
-        raise ValueError(f"No wallet found with name: {name}")
+        wallet = self._by_name.get(name.lower())
+        if wallet is None:
+            logger.warning(f"No wallet found with name: {name}")
+            raise ValueError(f"No wallet found with name: {name}")
+        return wallet
 
     def get_wallet_by_address(self, address):
-        for wallet in self.wallets:
-            if wallet.public_key.lower() == address.lower():
-                logger.debug(f"Found wallet: {wallet}")
-                return wallet
-        logger.warning(f"No wallet found with address: {address}")
-        raise ValueError(f"No wallet found with address: {address}")
+        wallet = self._by_address.get(address.lower())
+        if wallet is None:
+            logger.warning(f"No wallet found with address: {address}")
+            raise ValueError(f"No wallet found with address: {address}")
+        return wallet
 
     def sign_transaction(self, wallet_name: str, transaction: dict) -> bytes:
         """Sign a transaction with the specified wallet's private key
@@ -94,21 +149,101 @@ class WalletManager:
             Signed transaction bytes
         """
         try:
-            logger.info(f"Signing transaction with wallet: {wallet_name}")
+            logger.debug("Signing transaction with wallet: %s", wallet_name)
             wallet = self.get_wallet_by_name(wallet_name)
-            
-            # Sign the transaction
-            signed_tx = self.web3.eth.account.sign_transaction(
-                transaction,
-                private_key=wallet.private_key
-            )
-            
+
+            with metrics.span('sign'):
+                signed_tx = self.web3.eth.account.sign_transaction(
+                    transaction,
+                    private_key=wallet.private_key
+                )
+
             return signed_tx.rawTransaction
             
         except Exception as e:
             logger.error(f"Error signing transaction: {e}")
             raise
 
+    @property
+    def signing_service(self):
+        """Process-pool signer for batches, started on first use"""
+        if getattr(self, '_signing_service', None) is None:
+            self._signing_service = SigningService(
+                {wallet.name: wallet.private_key for wallet in self.wallets}
+            )
+        return self._signing_service
+
+    async def sign_transactions(self, jobs):
+        """Sign [(wallet name, transaction), ...] in parallel, returning raw bytes in input order"""
+        return await metrics.timed(self.signing_service.sign_batch_async(jobs), 'sign_batch')
+
+    async def get_balances(self):
+        """Get the balance of every wallet with all requests in flight together"""
+        balances = await asyncio.gather(*(
+            resolve(self.web3.eth.get_balance(wallet.public_key)) for wallet in self.wallets
+        ))
+        return {wallet.name: balance for wallet, balance in zip(self.wallets, balances)}
+
+    async def sweep(self, mine_cost=None, max_fee_per_gas=None, gas_intercept=0, gas_slope=0, cached_nonces=False):
+        """Balance, pending nonce and affordable mine count of every wallet in one round-trip
+
+        Balances come from one Multicall3 aggregate of getEthBalance, pinned to a
+        single block together with its number. Pending nonces come from one batched
+        eth_getTransactionCount request sent alongside it, and seed the nonce
+        manager for wallets it has not loaded yet. With cached_nonces, wallets
+        the nonce manager already tracks report its next nonce and are not read.
+
+        With mine_cost and max_fee_per_gas, affordable_mines is the largest n with
+        n * mine_cost + (gas_intercept + gas_slope * n) * max_fee_per_gas within the
+        balance; otherwise it is None.
+
+        Returns:
+            Dict of wallet name -> WalletStatus
+        """
+        try:
+            if self._multicall is None:
+                self._multicall = Multicall(self.web3)
+            addresses = [wallet.public_key for wallet in self.wallets]
+            nonces = {}
+            if cached_nonces:
+                for address in addresses:
+                    nonce = self.nonce_manager.peek(address)
+                    if nonce is not None:
+                        nonces[address] = nonce
+            unread = [address for address in addresses if address not in nonces]
+            requests = [self._multicall.aggregate(
+                [self._multicall.block_number()] + [self._multicall.eth_balance(address) for address in addresses]
+            )]
+            if unread:
+                requests.append(batch_request(
+                    self.web3, 'eth_getTransactionCount', [[address, 'pending'] for address in unread]
+                ))
+            results = await asyncio.gather(*requests)
+            eth_block, balances = results[0][0], results[0][1:]
+            for address, nonce in zip(unread, results[1] if unread else []):
+                if isinstance(nonce, Exception):
+                    logger.warning("Nonce request for %s failed: %s", address, nonce)
+                    continue
+                nonces[address] = int(nonce, 16)
+                self.nonce_manager.seed(address, nonces[address])
+
+            statuses = {}
+            for wallet, balance in zip(self.wallets, balances):
+                nonce = nonces.get(wallet.public_key)
+                affordable = None
+                if mine_cost is not None and max_fee_per_gas is not None:
+                    spendable = balance - gas_intercept * max_fee_per_gas
+                    per_mine = mine_cost + gas_slope * max_fee_per_gas
+                    affordable = max(spendable // per_mine, 0) if per_mine else None
+                statuses[wallet.name] = WalletStatus(wallet.name, wallet.public_key, balance, nonce,
+                                                     affordable, eth_block)
+            logger.debug("Swept %s wallets at block %s", len(statuses), eth_block)
+            return statuses
+
+        except Exception as e:
+            logger.error(f"Error sweeping wallets: {e}")
+            raise
+
     def get_all_addresses(self):
         addresses = [wallet.public_key for wallet in self.wallets]
         logger.debug(f"Retrieved {len(addresses)} wallet addresses")